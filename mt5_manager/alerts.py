@@ -0,0 +1,308 @@
+"""
+Alerts - Rule-based alerting on account equity, margin and instance health.
+The engine evaluates rules against the data the fleet and portfolio collectors
+already hold; nothing is polled for alerting. Rules are indexed by metric and
+instance, and a rule is only evaluated when a value it depends on changed, so
+large rule sets across many instances stay cheap. Each (rule, instance) fires
+once when breached, again only after its cooldown, and resolves when it clears.
+
+Metrics:
+    equity_drop_pct   equity below the account's peak equity, in percent
+    margin_level      margin level in percent (accounts with open margin only)
+    positions_opened  positions opened since the previous poll
+    api_unreachable   1 while the account API is failing, else 0
+    restarts          container restarts within the restart window
+    crash_loop        1 while the supervisor holds a crash-looping instance, else 0
+    cpu_percent       container CPU (only for containers whose stats are polled)
+
+Rules are read from the JSON file in MT5_ALERT_RULES (a list of Rule fields),
+alerts go to the dashboard plus MT5_ALERT_WEBHOOK and MT5_ALERT_LOG if set.
+"""
+import asyncio
+import fnmatch
+import functools
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import orjson
+
+import metrics
+from executors import executors
+from fleet_state import FleetUpdate
+
+METRICS = ("equity_drop_pct", "margin_level", "positions_opened", "api_unreachable", "restarts", "crash_loop",
+           "cpu_percent")
+RESTART_WINDOW = 600.0
+
+
+@dataclass
+class Rule:
+    name: str
+    metric: str
+    threshold: float
+    op: str = ">"  # ">" or "<"
+    instance: str = "*"  # container name or glob pattern
+    severity: str = "warning"
+    cooldown: float = 300.0
+
+    def breached(self, value: float) -> bool:
+        return value < self.threshold if self.op == "<" else value > self.threshold
+
+
+@dataclass
+class Alert:
+    rule: str
+    instance: str
+    metric: str
+    value: float
+    threshold: float
+    severity: str
+    message: str
+    time: float
+    resolved: bool = False
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+DEFAULT_RULES = [
+    Rule("equity-drawdown", "equity_drop_pct", 10.0, severity="critical"),
+    Rule("margin-level-low", "margin_level", 150.0, op="<", severity="critical"),
+    Rule("position-spike", "positions_opened", 20),
+    Rule("api-unreachable", "api_unreachable", 0.5),
+    Rule("restart-loop", "restarts", 3, severity="critical"),
+    Rule("crash-loop", "crash_loop", 0.5, severity="critical"),
+    Rule("cpu-high", "cpu_percent", 90.0, cooldown=900.0),
+]
+
+
+def load_rules(path: str) -> List[Rule]:
+    """Reads a JSON list of rule objects."""
+    with open(path, "rb") as f:
+        rules = [Rule(**raw) for raw in orjson.loads(f.read())]
+    for rule in rules:
+        if rule.metric not in METRICS:
+            raise ValueError(f"Unknown alert metric '{rule.metric}' in rule '{rule.name}'")
+    return rules
+
+
+# --- Sinks ---
+
+class UiSink:
+    """Keeps recent alerts and forwards new ones to connected dashboard clients."""
+
+    def __init__(self, size: int = 200):
+        self.recent = deque(maxlen=size)
+        self._listeners: List[Callable[[Alert], None]] = []
+
+    def subscribe(self, listener: Callable[[Alert], None]):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Alert], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def send(self, alert: Alert):
+        self.recent.append(alert)
+        for listener in list(self._listeners):
+            try:
+                listener(alert)
+            except Exception as e:
+                print(f"Error showing alert: {e}")
+
+
+class FileSink:
+    """Appends alerts to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def send(self, alert: Alert):
+        await executors.run("io", self._write, orjson.dumps(alert.to_dict()) + b"\n")
+
+    def _write(self, line: bytes):
+        with open(self.path, "ab") as f:
+            f.write(line)
+
+
+class WebhookSink:
+    """POSTs each alert as JSON to a URL."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, alert: Alert):
+        import requests
+
+        response = await executors.run("io", functools.partial(requests.post, self.url, json=alert.to_dict(), timeout=self.timeout))
+        response.raise_for_status()
+
+
+# --- Engine ---
+
+class AlertEngine:
+    """Evaluates indexed rules incrementally and delivers alerts to sinks."""
+
+    def __init__(self, rules: Iterable[Rule] = (), sinks: Iterable = ()):
+        self.sinks = list(sinks)
+        self.rules: List[Rule] = []
+        self._exact: Dict[Tuple[str, str], List[Rule]] = {}  # (metric, instance) -> rules
+        self._patterns: Dict[str, List[Rule]] = {}  # metric -> wildcard rules
+        self._values: Dict[Tuple[str, str], float] = {}  # last observed value per (metric, instance)
+        self._active: Dict[Tuple[str, str], Alert] = {}  # (rule, instance) -> firing alert
+        self._last_fired: Dict[Tuple[str, str], float] = {}
+        self._peaks: Dict[str, float] = {}  # instance -> peak equity
+        self._restarts: Dict[str, deque] = {}  # instance -> restart timestamps
+        self._restart_counts: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}  # container id -> instance name
+        self._tasks = set()
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: Rule):
+        self.rules.append(rule)
+        if any(ch in rule.instance for ch in "*?["):
+            self._patterns.setdefault(rule.metric, []).append(rule)
+        else:
+            self._exact.setdefault((rule.metric, rule.instance), []).append(rule)
+
+    def attach(self, fleet, portfolio):
+        """Subscribes to the collectors; call once at startup."""
+        fleet.subscribe(self.on_fleet)
+        self.on_fleet(FleetUpdate(added=list(fleet.containers.values())))
+        portfolio.subscribe_accounts(self.on_account)
+
+    def active(self) -> List[Alert]:
+        return list(self._active.values())
+
+    # --- Inputs ---
+
+    def on_fleet(self, update):
+        for record in update.added:
+            self._names[record["id"]] = record["name"]
+            self._restart_counts[record["name"]] = record.get("restart_count", 0)
+            if "cpu_percent" in record:
+                self.observe("cpu_percent", record["name"], record["cpu_percent"])
+        for cid, fields in update.changed.items():
+            name = self._names.get(cid)
+            if name is None:
+                continue
+            if "cpu_percent" in fields:
+                self.observe("cpu_percent", name, fields["cpu_percent"])
+            if "restart_count" in fields:
+                restarts = fields["restart_count"] - self._restart_counts.get(name, 0)
+                self._restart_counts[name] = fields["restart_count"]
+                if restarts > 0:
+                    self._restarts.setdefault(name, deque()).extend([time.time()] * restarts)
+        for cid in update.removed:
+            name = self._names.pop(cid, None)
+            if name is not None:
+                self.forget(name)
+
+        # Restarts age out of the window even when nothing changes
+        cutoff = time.time() - RESTART_WINDOW
+        for name, times in list(self._restarts.items()):
+            while times and times[0] < cutoff:
+                times.popleft()
+            self.observe("restarts", name, len(times))
+            if not times:
+                del self._restarts[name]
+
+    def on_account(self, snapshot, diff):
+        name = snapshot.instance
+        self.observe("api_unreachable", name, 1 if snapshot.error else 0)
+        if snapshot.error or not snapshot.updated:
+            return
+        first = name not in self._peaks  # the first snapshot reports every position as added
+        peak = max(self._peaks.get(name, 0.0), snapshot.equity)
+        self._peaks[name] = peak
+        if peak > 0:
+            self.observe("equity_drop_pct", name, (peak - snapshot.equity) / peak * 100)
+        if snapshot.margin_level is not None:
+            self.observe("margin_level", name, snapshot.margin_level)
+        if not first:
+            self.observe("positions_opened", name, len(diff.added))
+
+    def forget(self, instance: str):
+        """Drops all state of a removed instance; its active alerts resolve silently."""
+        self._peaks.pop(instance, None)
+        self._restarts.pop(instance, None)
+        self._restart_counts.pop(instance, None)
+        for key in [k for k in self._values if k[1] == instance]:
+            del self._values[key]
+        for key in [k for k in self._active if k[1] == instance]:
+            del self._active[key]
+
+    # --- Evaluation ---
+
+    def rules_for(self, metric: str, instance: str) -> List[Rule]:
+        rules = self._exact.get((metric, instance), [])
+        patterns = self._patterns.get(metric)
+        if patterns:
+            rules = rules + [r for r in patterns if fnmatch.fnmatchcase(instance, r.instance)]
+        return rules
+
+    def observe(self, metric: str, instance: str, value: float):
+        """Records a value and evaluates the rules that depend on it, if it changed."""
+        if value is None:
+            return  # not measured yet (e.g. stats still pending)
+        key = (metric, instance)
+        if self._values.get(key) == value:
+            return
+        self._values[key] = value
+        now = time.time()
+        for rule in self.rules_for(metric, instance):
+            alert_key = (rule.name, instance)
+            firing = self._active.get(alert_key)
+            if rule.breached(value):
+                if firing is not None:
+                    continue  # already reported
+                if now - self._last_fired.get(alert_key, 0.0) < rule.cooldown:
+                    self._values.pop(key, None)  # evaluate again next time, even if unchanged
+                    continue
+                alert = Alert(rule.name, instance, metric, value, rule.threshold, rule.severity,
+                              f"{instance}: {metric} {value:g} {rule.op} {rule.threshold:g}", now)
+                self._active[alert_key] = alert
+                self._last_fired[alert_key] = now
+                metrics.ALERTS_FIRED.labels(rule.severity).inc()
+                self._deliver(alert)
+            elif firing is not None:
+                del self._active[alert_key]
+                self._deliver(Alert(rule.name, instance, metric, value, rule.threshold, rule.severity,
+                                    f"{instance}: {metric} back to {value:g}", now, resolved=True))
+
+    def _deliver(self, alert: Alert):
+        for sink in self.sinks:
+            task = asyncio.get_running_loop().create_task(self._send(sink, alert))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, sink, alert: Alert):
+        try:
+            await sink.send(alert)
+        except Exception as e:
+            print(f"Error delivering alert via {type(sink).__name__}: {e}")
+
+
+def _engine_from_env() -> AlertEngine:
+    path = os.environ.get("MT5_ALERT_RULES")
+    rules = DEFAULT_RULES
+    if path:
+        try:
+            rules = load_rules(path)
+        except Exception as e:
+            print(f"Error loading alert rules from {path}: {e}; using defaults")
+    sinks = [ui_sink]
+    if os.environ.get("MT5_ALERT_LOG"):
+        sinks.append(FileSink(os.environ["MT5_ALERT_LOG"]))
+    if os.environ.get("MT5_ALERT_WEBHOOK"):
+        sinks.append(WebhookSink(os.environ["MT5_ALERT_WEBHOOK"]))
+    return AlertEngine(rules, sinks)
+
+
+ui_sink = UiSink()
+alert_engine = _engine_from_env()
@@ -0,0 +1,652 @@
+"""
+Async Docker - asyncio-native Docker Engine API client for the dashboard.
+Talks HTTP to the daemon socket (unix:// or tcp://, TLS via DOCKER_TLS_VERIFY
+and DOCKER_CERT_PATH) over one pooled aiohttp session, so hundreds of
+concurrent list/inspect/stats/exec calls cost sockets instead of threads.
+
+Inspect data is cached per container and dropped when the daemon's event
+stream reports a change, so refreshes only inspect what changed.
+
+AsyncDockerService has the same methods and results as DockerService, only
+awaitable; callers that accept either go through executors.run(). See
+hosts.py for which engines use which service.
+"""
+import asyncio
+import contextlib
+import os
+import queue
+import shlex
+import struct
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import orjson
+
+from docker_service import (
+    CONFIG_DIR, JOURNAL_TAIL_LINES, LOG_DIRS, MQL5_DIR, UPLOAD_CHUNK, HandleCache, MT5_ENVIRONMENT, MT5_IMAGE, MT5_NETWORK,
+    RESTART_POLICY, STOPPED_STATS, BundleEntry, ChunkReader, archive_file, bundle_entries, container_record, decode_log,
+    format_uptime, journal_files, limits_host_config, log_files, next_free_ports, stats_error, tail_lines, tar_stream,
+    usage_stats,
+)
+from executors import executors
+
+DEFAULT_HOST = "unix:///var/run/docker.sock"
+
+
+class DockerError(Exception):
+    """Error response from the Docker daemon."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}")
+        self.status = status
+
+
+class AsyncDockerClient:
+    """Minimal Docker Engine API client on a shared keep-alive connection pool."""
+
+    def __init__(self, host: Optional[str] = None, max_connections: int = 100, timeout: float = 60.0,
+                 cert_path: Optional[str] = None):
+        self.host = host or os.environ.get("DOCKER_HOST") or DEFAULT_HOST
+        self.cert_path = cert_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+        self._base_url = None
+
+    @staticmethod
+    def supports(host: Optional[str]) -> bool:
+        return urlparse(host or DEFAULT_HOST).scheme in ("unix", "tcp", "http", "https")
+
+    def _open(self):
+        # aiohttp is already loaded by nicegui; imported here to keep this module cheap for the CLI
+        import aiohttp
+
+        url = urlparse(self.host)
+        if url.scheme == "unix":
+            connector = aiohttp.UnixConnector(path=url.path, limit=self.max_connections)
+            self._base_url = "http://docker"
+        else:
+            ssl = False
+            scheme = "http"
+            if url.scheme == "https" or self.cert_path or os.environ.get("DOCKER_TLS_VERIFY"):
+                import ssl as ssl_module
+
+                cert_path = self.cert_path or os.environ.get("DOCKER_CERT_PATH", os.path.expanduser("~/.docker"))
+                ssl = ssl_module.create_default_context(cafile=os.path.join(cert_path, "ca.pem"))
+                ssl.load_cert_chain(os.path.join(cert_path, "cert.pem"), os.path.join(cert_path, "key.pem"))
+                scheme = "https"
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ssl=ssl)
+            self._base_url = f"{scheme}://{url.netloc}"
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None, json=None,
+                      data=None, headers: Optional[Dict] = None,
+                      timeout: Optional[float] = None, raw: bool = False):
+        """Sends one API request; returns the decoded JSON body (or bytes with raw=True)."""
+        if self._session is None or self._session.closed:
+            self._open()
+        kwargs = {}
+        if timeout is not None:
+            import aiohttp
+
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        async with self._session.request(method, self._base_url + path, params=params, json=json, data=data,
+                                         headers=headers, **kwargs) as response:
+            body = await response.read()
+            if response.status >= 400:
+                message = body.decode("utf-8", errors="replace")
+                if response.content_type == "application/json":
+                    message = (await response.json()).get("message", message)
+                raise DockerError(response.status, message)
+            if raw:
+                return body
+            if response.content_type == "application/json" and body:
+                return await response.json()
+            return None
+
+    async def close(self):
+        """Closes the pooled connections (on the loop that opened them)."""
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+
+    # --- Endpoints ---
+
+    async def ping(self):
+        await self.request("GET", "/_ping", raw=True)
+
+    async def info(self) -> Dict:
+        return await self.request("GET", "/info")
+
+    async def list_containers(self, all: bool = True, name: Optional[str] = None) -> List[Dict]:
+        params = {"all": "1" if all else "0"}
+        if name:
+            params["filters"] = orjson.dumps({"name": [name]}).decode()
+        return await self.request("GET", "/containers/json", params=params)
+
+    async def inspect(self, container_id: str) -> Dict:
+        return await self.request("GET", f"/containers/{container_id}/json")
+
+    async def stats(self, container_id: str) -> Dict:
+        return await self.request("GET", f"/containers/{container_id}/stats", params={"stream": "0"})
+
+    async def action(self, container_id: str, action: str, params: Optional[Dict] = None,
+                     timeout: Optional[float] = None):
+        """start, stop, restart, kill, pause or unpause."""
+        await self.request("POST", f"/containers/{container_id}/{action}", params=params, timeout=timeout)
+
+    async def update(self, container_id: str, host_config: Dict):
+        """Changes resource limits of a container (docker update)."""
+        await self.request("POST", f"/containers/{container_id}/update", json=host_config)
+
+    async def remove(self, container_id: str, force: bool = False):
+        await self.request("DELETE", f"/containers/{container_id}", params={"force": "1" if force else "0"})
+
+    async def create(self, name: str, config: Dict) -> str:
+        """Creates a container, pulling its image first if it is missing locally."""
+        try:
+            result = await self.request("POST", "/containers/create", params={"name": name}, json=config)
+        except DockerError as e:
+            if e.status != 404:
+                raise
+            await self.pull(config["Image"])
+            result = await self.request("POST", "/containers/create", params={"name": name}, json=config)
+        return result["Id"]
+
+    async def pull(self, image: str):
+        repository, _, tag = image.rpartition(":") if ":" in image.split("/")[-1] else (image, "", "latest")
+        # The pull progress is streamed; reading it to the end waits for the pull
+        await self.request("POST", "/images/create", params={"fromImage": repository, "tag": tag},
+                           timeout=1800, raw=True)
+
+    async def exec_run(self, container_id: str, cmd, user: str = "", timeout: Optional[float] = None) -> tuple:
+        """Runs a command in a container; returns (exit_code, stdout+stderr bytes)."""
+        if isinstance(cmd, str):
+            cmd = shlex.split(cmd)
+        created = await self.request("POST", f"/containers/{container_id}/exec",
+                                     json={"Cmd": cmd, "User": user, "AttachStdout": True, "AttachStderr": True,
+                                           "Tty": False})
+        raw = await self.request("POST", f"/exec/{created['Id']}/start", json={"Detach": False, "Tty": False},
+                                 timeout=timeout, raw=True)
+        info = await self.request("GET", f"/exec/{created['Id']}/json")
+        return info.get("ExitCode"), demux(raw)
+
+    @contextlib.asynccontextmanager
+    async def events(self, filters: Dict[str, List[str]]):
+        """Opens the event stream; yields an async iterator of decoded events."""
+        if self._session is None or self._session.closed:
+            self._open()
+        import aiohttp
+
+        async with self._session.get(self._base_url + "/events", params={"filters": orjson.dumps(filters).decode()},
+                                     timeout=aiohttp.ClientTimeout(total=None)) as response:
+            if response.status >= 400:
+                raise DockerError(response.status, (await response.read()).decode("utf-8", errors="replace"))
+
+            async def decoded():
+                async for line in response.content:
+                    if line.strip():
+                        yield orjson.loads(line)
+
+            yield decoded()
+
+    @contextlib.asynccontextmanager
+    async def archive_stream(self, container_id: str, path: str, chunk_size: int = UPLOAD_CHUNK):
+        """Opens a tar of path in the container; yields an async iterator of its chunks."""
+        if self._session is None or self._session.closed:
+            self._open()
+        import aiohttp
+
+        async with self._session.get(self._base_url + f"/containers/{container_id}/archive", params={"path": path},
+                                     timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout)) as response:
+            if response.status >= 400:
+                raise DockerError(response.status, (await response.read()).decode("utf-8", errors="replace"))
+            yield response.content.iter_chunked(chunk_size)
+
+    async def get_archive(self, container_id: str, path: str) -> bytes:
+        return await self.request("GET", f"/containers/{container_id}/archive", params={"path": path}, raw=True)
+
+    async def put_archive(self, container_id: str, path: str, data):
+        """Extracts a tar into the container; data is bytes or an async iterator of chunks (sent chunked)."""
+        await self.request("PUT", f"/containers/{container_id}/archive", params={"path": path}, data=data,
+                           headers={"Content-Type": "application/x-tar"}, timeout=1800)
+
+
+async def _iterate_in_pool(chunks):
+    """Pulls a blocking iterator's items in the io pool, so file reads stay off the event loop."""
+    try:
+        while (chunk := await executors.run("io", next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        chunks.close()
+
+
+async def _consume_in_pool(chunks, consume: Callable, depth: int = 8):
+    """Runs consume(file object) in the caller's pool (see executors.call) over an async
+    iterator of chunks. The event loop reads ahead of the consumer by at most depth chunks."""
+    loop = asyncio.get_running_loop()
+    pending = queue.Queue(depth)
+    space = asyncio.Event()
+
+    def received():
+        while (chunk := pending.get()) is not None:
+            loop.call_soon_threadsafe(space.set)
+            yield chunk
+
+    consumer = asyncio.ensure_future(executors.call(consume, ChunkReader(received())))
+    consumer.add_done_callback(lambda _: space.set())
+
+    async def put(chunk):
+        while pending.full() and not consumer.done():
+            space.clear()
+            await space.wait()
+        if not consumer.done():
+            pending.put_nowait(chunk)
+
+    try:
+        async for chunk in chunks:
+            if consumer.done():
+                break  # it failed, or stopped reading early
+            await put(chunk)
+    finally:
+        await put(None)  # end of data; a truncated tar fails in the consumer
+    return await consumer
+
+
+def unreachable(error: Exception) -> bool:
+    """Whether an error means the daemon could not be reached, rather than that it answered with one."""
+    import aiohttp
+
+    return isinstance(error, (OSError, asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
+def demux(raw: bytes) -> bytes:
+    """Joins the payloads of Docker's multiplexed stdout/stderr frames."""
+    chunks = []
+    offset = 0
+    while offset + 8 <= len(raw):
+        stream, length = struct.unpack_from(">BxxxL", raw, offset)
+        if stream > 2:
+            return raw  # not framed (TTY output)
+        chunks.append(raw[offset + 8:offset + 8 + length])
+        offset += 8 + length
+    return b"".join(chunks)
+
+
+class AsyncDockerService:
+    """DockerService on the asyncio client: same methods and results, awaitable."""
+
+    def __init__(self, host: Optional[str] = None, retry_interval: float = 10.0, cert_path: Optional[str] = None,
+                 name: str = "local", address: str = "localhost"):
+        self.docker = AsyncDockerClient(host, cert_path=cert_path)
+        self.retry_interval = retry_interval
+        self.name = name
+        self.address = address
+        self.connected = False
+        self.handles = HandleCache()  # inspect data by short id
+        self._last_attempt: Optional[float] = None
+        self._connect_lock = asyncio.Lock()
+        self._events_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> bool:
+        """Pings the daemon; failed attempts are retried at most every retry_interval seconds."""
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            if self._last_attempt is not None and time.monotonic() - self._last_attempt < self.retry_interval:
+                return False
+            self._last_attempt = time.monotonic()
+            try:
+                await self.docker.ping()
+                self.connected = True
+                self._events_task = asyncio.get_running_loop().create_task(self._watch_events())
+            except Exception as e:
+                print(f"Error connecting to Docker ({self.name}): {e}")
+            return self.connected
+
+    async def close(self):
+        self._disconnect()
+        await self.docker.close()
+
+    def _disconnect(self):
+        """Marks the daemon unreachable; the next connect() pings it again."""
+        self.connected = False
+        if self._events_task is not None:
+            self._events_task.cancel()
+            self._events_task = None
+
+    async def _watch_events(self):
+        """Drops cached handles of containers Docker reports changes for; reconnects after errors."""
+        while True:
+            try:
+                async with self.docker.events({"type": ["container"]}) as events:
+                    # Changes before the stream opened were not seen
+                    self.handles.clear()
+                    self.handles.live = True
+                    async for event in events:
+                        self.handles.on_event(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Docker event stream failed: {e}")
+            finally:
+                self.handles.live = False
+            await asyncio.sleep(self.retry_interval)
+
+    async def _inspect(self, container_id: str) -> Dict:
+        """Inspect data, from the handle cache while the event stream keeps it valid."""
+        attrs = self.handles.get(container_id) if self.handles.live else None
+        if attrs is None:
+            version = self.handles.version(container_id)
+            attrs = await self.docker.inspect(container_id)
+            self.handles.put(container_id, attrs, version)
+        return attrs
+
+    async def _lifecycle(self, container_id: str, action: str, params: Optional[Dict] = None,
+                         timeout: Optional[float] = None):
+        try:
+            await self.docker.action(container_id, action, params, timeout=timeout)
+        finally:
+            self.handles.invalidate(container_id)
+
+    async def list_mt5_containers(self) -> Optional[List[Dict]]:
+        """Lists all containers with names starting with 'trading_mt5_'. None if they could
+        not be listed, so callers can tell an unreachable daemon from an empty fleet."""
+        if not self.connected:
+            return None
+
+        try:
+            summaries = [s for s in await self.docker.list_containers(all=True, name="trading_mt5_")
+                         if any(name.lstrip("/").startswith("trading_mt5_") for name in s.get("Names") or ())]
+            self.handles.retain(s["Id"] for s in summaries)
+            # Inspect (for restart counts and uptime) only containers without a valid cached handle
+            stale = []
+            for summary in summaries:
+                attrs = self.handles.get(summary["Id"]) if self.handles.live else None
+                if attrs is None or attrs["State"]["Status"] != summary["State"]:
+                    stale.append(summary["Id"])
+            versions = [self.handles.version(cid) for cid in stale]
+            details = await asyncio.gather(*(self.docker.inspect(cid) for cid in stale), return_exceptions=True)
+            for cid, version, attrs in zip(stale, versions, details):
+                if isinstance(attrs, Exception):
+                    self.handles.invalidate(cid)
+                else:
+                    self.handles.put(cid, attrs, version)
+            fresh = dict(zip(stale, details))
+            records = []
+            for summary in summaries:
+                attrs = fresh.get(summary["Id"]) or self.handles.get(summary["Id"])
+                if attrs is not None and not isinstance(attrs, Exception):
+                    records.append(container_record(attrs, self.name, self.address))
+            return records
+        except Exception as e:
+            print(f"Error listing containers: {e}")
+            if unreachable(e):
+                self._disconnect()
+            return None
+
+    async def create_mt5_container(self, account_name: str, vnc_port: int, api_port: int, password: str = "trading",
+                                   limits: Optional[Dict] = None, labels: Optional[Dict[str, str]] = None,
+                                   config_archive: Optional[Callable[[], Iterator[bytes]]] = None) -> Optional[str]:
+        """Creates and starts a new MT5 container, with the scheduler's CPU and memory limits if given.
+        config_archive returns the chunks of a /config tar to restore before the first start."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        container_name = f"trading_mt5_{account_name}"
+        volume_name = f"mt5_config_{account_name}"
+        config = {
+            "Image": MT5_IMAGE,
+            "Env": [f"{key}={value}" for key, value in MT5_ENVIRONMENT.items()],
+            "ExposedPorts": {"3000/tcp": {}, "8001/tcp": {}},
+            "Labels": labels or {},
+            "HostConfig": {
+                "PortBindings": {
+                    "3000/tcp": [{"HostPort": str(vnc_port)}],
+                    "8001/tcp": [{"HostPort": str(api_port)}],
+                },
+                "Binds": [f"{volume_name}:{CONFIG_DIR}:rw"],
+                "RestartPolicy": RESTART_POLICY,
+                "NetworkMode": MT5_NETWORK,
+                **limits_host_config(limits),
+            },
+        }
+        try:
+            container_id = await self.docker.create(container_name, config)
+            if config_archive is not None:
+                # Restored while the container is still stopped, before MT5 first starts
+                try:
+                    await self.docker.put_archive(container_id, "/", _iterate_in_pool(config_archive()))
+                except Exception:
+                    await self.docker.remove(container_id, force=True)
+                    raise
+            await self._lifecycle(container_id, "start")
+            return None
+        except DockerError as e:
+            return f"Docker API Error: {e}"
+        except Exception as e:
+            return f"Error creating container: {e}"
+
+    async def upload_expert(self, container_id: str, file_path: str) -> Optional[str]:
+        """Uploads an .ex5 or .mq5 file to the container's Expert folder."""
+        try:
+            return await self.upload_bundle(container_id, await executors.run("io", bundle_entries, [file_path]))
+        except Exception as e:
+            return f"Error uploading file: {e}"
+
+    async def upload_bundle(self, container_id: str, entries: List[BundleEntry]) -> Optional[str]:
+        """Uploads the files of a bundle (see bundle_entries) below the MQL5 folder. File reads
+        run in the io pool, one chunk at a time, while the tar streams to Docker."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self.docker.put_archive(container_id, MQL5_DIR, _iterate_in_pool(tar_stream(entries)))
+            return None
+        except Exception as e:
+            return f"Error uploading file: {e}"
+
+    async def remove_container(self, container_id: str) -> Optional[str]:
+        """Stops and removes a container."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self._lifecycle(container_id, "stop", timeout=self.docker.timeout + 10)
+            await self.docker.remove(container_id)
+            return None
+        except Exception as e:
+            return f"Error removing container: {e}"
+
+    async def kill_all_mt5_containers(self) -> List[str]:
+        """Stops ALL MT5 containers immediately. Returns list of errors if any."""
+        if not self.connected:
+            return ["Docker client not connected"]
+
+        containers = await self.list_mt5_containers() or []
+        results = await asyncio.gather(*(self._lifecycle(c["id"], "kill") for c in containers),
+                                       return_exceptions=True)
+        return [f"Failed to kill {c['name']}: {result}"
+                for c, result in zip(containers, results) if isinstance(result, Exception)]
+
+    async def stop_container(self, container_id: str) -> Optional[str]:
+        """Stops a running container gracefully."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self._lifecycle(container_id, "stop", {"t": "30"}, timeout=self.docker.timeout + 30)
+            return None
+        except Exception as e:
+            return f"Error stopping container: {e}"
+
+    async def start_container(self, container_id: str) -> Optional[str]:
+        """Starts a stopped container."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self._lifecycle(container_id, "start")
+            return None
+        except Exception as e:
+            return f"Error starting container: {e}"
+
+    async def pause_container(self, container_id: str) -> Optional[str]:
+        """Freezes a running container's processes; memory stays allocated."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self._lifecycle(container_id, "pause")
+            return None
+        except Exception as e:
+            return f"Error pausing container: {e}"
+
+    async def unpause_container(self, container_id: str) -> Optional[str]:
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self._lifecycle(container_id, "unpause")
+            return None
+        except Exception as e:
+            return f"Error unpausing container: {e}"
+
+    async def restart_container(self, container_id: str) -> Optional[str]:
+        """Restarts a container."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self._lifecycle(container_id, "restart", {"t": "30"}, timeout=self.docker.timeout + 30)
+            return None
+        except Exception as e:
+            return f"Error restarting container: {e}"
+
+    async def update_container_limits(self, container_id: str, limits: Dict) -> Optional[str]:
+        """Changes the CPU and memory limits of a container in place (no restart)."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        try:
+            await self.docker.update(container_id, limits_host_config(limits))
+            return None
+        except Exception as e:
+            return f"Error updating limits: {e}"
+        finally:
+            self.handles.invalidate(container_id)
+
+    async def get_container_stats(self, container_id: str) -> Dict:
+        """Returns CPU%, Memory usage, and Uptime for a container."""
+        if not self.connected:
+            return {"error": "Docker client not connected"}
+
+        try:
+            attrs = await self._inspect(container_id)
+            if attrs["State"]["Status"] != "running":
+                return dict(STOPPED_STATS)
+            return usage_stats(await self.docker.stats(container_id), format_uptime(attrs))
+        except Exception as e:
+            return stats_error(e)
+
+    async def get_log_list(self, container_id: str, log_type: str) -> List[str]:
+        """
+        Lists log files for a given type.
+        log_type: 'experts' or 'journal'
+        """
+        if not self.connected:
+            return []
+
+        path = LOG_DIRS.get(log_type)
+        if path is None:
+            return []
+        try:
+            exit_code, output = await self.docker.exec_run(container_id, f"ls -1 {path}")
+            if exit_code != 0:
+                print(f"Error listing logs: {output.decode('utf-8')}")
+                return []
+            return log_files(output)
+        except Exception as e:
+            print(f"Error getting log list: {e}")
+            return []
+
+    async def read_log_content(self, container_id: str, log_type: str, filename: str) -> Optional[str]:
+        """Reads the content of a specific log file."""
+        if not self.connected:
+            return "Docker client not connected"
+
+        if log_type not in LOG_DIRS:
+            return "Invalid log type"
+        try:
+            exit_code, output = await self.docker.exec_run(container_id, f"cat {LOG_DIRS[log_type]}{filename}")
+            if exit_code != 0:
+                return f"Error reading file: {output.decode('utf-8', errors='ignore')}"
+            return decode_log(output)
+        except Exception as e:
+            return f"Error reading log content: {e}"
+
+    async def read_journal_tail(self, container_id: str, lines: int = JOURNAL_TAIL_LINES) -> str:
+        """Last lines of the newest Journal log, read through the archive API (works when stopped)."""
+        if not self.connected:
+            return "Docker client not connected"
+        try:
+            for name in journal_files():
+                try:
+                    data = await self.docker.get_archive(container_id, LOG_DIRS["journal"] + name)
+                except DockerError as e:
+                    if e.status == 404:
+                        continue
+                    raise
+                return tail_lines(decode_log(archive_file(data)), lines)
+            return "No Journal log found"
+        except Exception as e:
+            return f"Error reading journal: {e}"
+
+    async def exec_command(self, container_id: str, cmd: List[str], user: str = "") -> Dict:
+        """Runs a command in a running container: {"exit_code", "output"} or {"error"}."""
+        if not self.connected:
+            return {"error": "Docker client not connected"}
+        try:
+            exit_code, output = await self.docker.exec_run(container_id, cmd, user=user, timeout=1800)
+            return {"exit_code": exit_code, "output": output}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def download_file(self, container_id: str, path: str) -> Dict:
+        """Reads one file through the archive API: {"data"} or {"error"}."""
+        if not self.connected:
+            return {"error": "Docker client not connected"}
+        try:
+            return {"data": archive_file(await self.docker.get_archive(container_id, path))}
+        except DockerError as e:
+            return {"error": f"{path} not found" if e.status == 404 else str(e)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def export_config(self, container_id: str, consume: Callable) -> Dict:
+        """Streams a tar of the /config volume into consume(file object), which runs in the
+        caller's pool. Returns {"result": what consume returned} or {"error"}."""
+        if not self.connected:
+            return {"error": "Docker client not connected"}
+        try:
+            async with self.docker.archive_stream(container_id, CONFIG_DIR) as chunks:
+                return {"result": await _consume_in_pool(chunks, consume)}
+        except Exception as e:
+            return {"error": f"Error exporting {CONFIG_DIR}: {e}"}
+
+    async def get_host_info(self) -> Dict:
+        """CPUs and memory of the Docker host."""
+        if not self.connected:
+            return {"error": "Docker client not connected"}
+        try:
+            info = await self.docker.info()
+            return {"cpus": info.get("NCPU", 0), "memory_bytes": info.get("MemTotal", 0)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_next_available_ports(self, start_vnc=3000, start_api=8001, reserved=()) -> tuple[int, int]:
+        """Calculates the next available ports based on existing containers and reserved (vnc, api) pairs."""
+        return next_free_ports(await self.list_mt5_containers() or [], start_vnc, start_api, reserved)
+
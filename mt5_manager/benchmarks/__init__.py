@@ -0,0 +1,7 @@
+"""
+Benchmarks - Local stand-ins for the Docker daemon and the MT5 REST API,
+plus scenarios measuring the manager's hot paths against them.
+
+Run from the mt5_manager directory:
+    python -m benchmarks.run --sizes 10 100 500
+"""
@@ -0,0 +1,516 @@
+"""
+Fake Docker - A local stand-in for the Docker Engine API.
+Serves the subset of endpoints docker-py uses for MT5 containers: list,
+inspect, stats, lifecycle, exec, archives and the container event stream,
+with configurable container count, latency and stats payload size.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import secrets
+import struct
+import tarfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from benchmarks.fake_http import FakeHttpServer, Request, Response, split_route
+
+API_VERSION = "1.43"
+LIMIT_FIELDS = ("CpusetCpus", "CpuPeriod", "CpuQuota", "CpuShares", "NanoCpus", "Memory", "MemorySwap")
+MT5_DIR = "/config/.wine/drive_c/Program Files/MetaTrader 5"
+INSTALL_MTIME = 1767225600  # files of the fake MT5 install never change
+
+
+def _tar(path: str, data: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo(path.rsplit("/", 1)[-1])
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _install_file(index: int, size: int) -> bytes:
+    """Content of one file of the fake MT5 install: the same in every volume."""
+    block = hashlib.sha256(f"mt5-install-{index}".encode()).digest()
+    return (block * (size // len(block) + 1))[:size]
+
+
+def _unix_path(path: str) -> str:
+    """Z:\\config\\x -> /config/x (Wine maps Z: to /)."""
+    return path.strip('"')[2:].replace("\\", "/") if path.strip('"')[:2].upper() == "Z:" else path.strip('"')
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+
+
+class FakeContainer:
+    def __init__(self, name: str, vnc_port: Optional[int], api_port: Optional[int], status: str = "running",
+                 labels: Optional[Dict[str, str]] = None, image: str = "gmag11/metatrader5_vnc:latest"):
+        self.id = secrets.token_hex(32)
+        self.name = name
+        self.vnc_port = vnc_port
+        self.api_port = api_port
+        self.status = status
+        self.labels = labels or {}
+        self.image = image
+        self.created = time.time() - 86400
+        self.started_at = time.time() - 3600 if status == "running" else 0
+        self.restart_count = 0
+        self.cpu_total = 0
+        self.archive_bytes = 0
+        self.files: Dict[str, int] = {}  # uploaded path -> size
+        self.blobs: Dict[str, bytes] = {}  # contents of small uploaded files and build outputs
+        self.cpu_load = 0.25  # busy cores while running
+        self.memory_mb = 650
+        self.limits: Dict = {}  # HostConfig resource fields from create and update
+        self.exit_code = 0
+        self.oom_killed = False
+        self.crashing = False  # exits with code 1 shortly after every start
+        self.volume = f"mt5_config_{name[len('trading_mt5_'):]}"  # mounted at /config
+
+    def ports_map(self) -> Dict:
+        ports = {"3000/tcp": None, "8001/tcp": None}
+        if self.vnc_port:
+            ports["3000/tcp"] = [{"HostIp": "0.0.0.0", "HostPort": str(self.vnc_port)}]
+        if self.api_port:
+            ports["8001/tcp"] = [{"HostIp": "0.0.0.0", "HostPort": str(self.api_port)}]
+        return ports
+
+    def summary(self) -> Dict:
+        ports = []
+        for private, public in ((3000, self.vnc_port), (8001, self.api_port)):
+            if public and self.status == "running":
+                ports.append({"IP": "0.0.0.0", "PrivatePort": private, "PublicPort": public, "Type": "tcp"})
+        return {
+            "Id": self.id,
+            "Names": [f"/{self.name}"],
+            "Image": self.image,
+            "Command": "/init",
+            "Created": int(self.created),
+            "State": self.status,
+            "Status": "Up 1 hour" if self.status == "running" else f"Exited ({self.exit_code}) 1 minute ago",
+            "Ports": ports,
+            "Labels": self.labels,
+        }
+
+    def inspect(self) -> Dict:
+        running = self.status == "running"
+        return {
+            "Id": self.id,
+            "Created": _iso(self.created),
+            "Name": f"/{self.name}",
+            "Image": "sha256:" + "0" * 64,
+            "RestartCount": self.restart_count,
+            "State": {
+                "Status": self.status,
+                "Running": running,
+                "Paused": self.status == "paused",
+                "Restarting": False,
+                "ExitCode": self.exit_code,
+                "OOMKilled": self.oom_killed,
+                "StartedAt": _iso(self.started_at) if self.started_at else "0001-01-01T00:00:00Z",
+                "FinishedAt": "0001-01-01T00:00:00Z",
+            },
+            "Config": {
+                "Image": self.image,
+                "Labels": self.labels,
+                "Env": ["CUSTOM_USER=trader", "VNC_DISABLE_AUTH=true"],
+                "ExposedPorts": {"3000/tcp": {}, "8001/tcp": {}},
+            },
+            "HostConfig": {
+                "RestartPolicy": {"Name": "unless-stopped", "MaximumRetryCount": 0},
+                "NetworkMode": "trading_network",
+                "Memory": 0,
+                "NanoCpus": 0,
+                "CpusetCpus": "",
+                "CpuPeriod": 0,
+                "CpuQuota": 0,
+                "CpuShares": 0,
+                **self.limits,
+            },
+            "Mounts": [{"Type": "volume", "Name": self.volume,
+                        "Destination": "/config", "RW": True}],
+            "NetworkSettings": {"Ports": self.ports_map() if running else {}},
+        }
+
+
+class FakeDockerDaemon:
+    """Holds the fake fleet and answers Docker Engine API requests for it."""
+
+    def __init__(self, containers: int = 10, running_ratio: float = 1.0, latency: float = 0.0,
+                 stats_latency: float = 0.0, exec_latency: float = 0.0, percpu: int = 8,
+                 log_files: int = 5, log_size: int = 64 * 1024, vnc_base: int = 13000, api_base: int = 18001,
+                 config_files: int = 200, config_file_size: int = 32 * 1024):
+        self.latency = latency
+        self.stats_latency = stats_latency
+        self.exec_latency = exec_latency
+        self.percpu = percpu
+        self.log_files = log_files
+        self.log_size = log_size
+        self.config_files = config_files
+        self.config_file_size = config_file_size
+        self.volumes: Dict[str, Dict[str, tuple]] = {}  # volume -> path -> (content, mtime)
+        self.containers: Dict[str, FakeContainer] = {}
+        self.mt5_fleet = None  # optional FakeMT5Fleet whose counters are reported alongside
+        self.execs: Dict[str, Dict] = {}
+        self.subscribers: List[asyncio.Queue] = []  # open event streams
+        self.server = FakeHttpServer(self.handle)
+        running = int(containers * running_ratio)
+        for i in range(containers):
+            status = "running" if i < running else "exited"
+            c = FakeContainer(f"trading_mt5_bench{i:04d}", vnc_base + i, api_base + i, status,
+                              labels={"mt5.group": f"group{i % 4}"})
+            self.containers[c.id] = c
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    async def start(self, port: int = 0) -> str:
+        port = await self.server.listen(port)
+        return f"tcp://127.0.0.1:{port}"
+
+    async def close(self):
+        await self.server.close()
+
+    def emit(self, c: FakeContainer, action: str):
+        """Publishes a container event to open event streams."""
+        now = time.time()
+        event = {"Type": "container", "Action": action, "status": action, "id": c.id, "from": c.image,
+                 "Actor": {"ID": c.id, "Attributes": {"name": c.name, "image": c.image}},
+                 "scope": "local", "time": int(now), "timeNano": int(now * 1e9)}
+        line = json.dumps(event).encode() + b"\n"
+        for queue in self.subscribers:
+            queue.put_nowait(line)
+
+    async def _events(self):
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers.remove(queue)
+
+    def find(self, ref: str) -> Optional[FakeContainer]:
+        if ref in self.containers:
+            return self.containers[ref]
+        for c in self.containers.values():
+            if c.name == ref or c.id.startswith(ref):
+                return c
+        return None
+
+    async def handle(self, request: Request) -> Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        parts = split_route(request.path)
+        method = request.method
+
+        if parts and parts[0] == "_fake":
+            return self._control(parts[1:], request)
+        if parts in (("_ping",),):
+            return Response(200, b"OK", "text/plain")
+        if parts == ("version",):
+            return Response(200, {"ApiVersion": API_VERSION, "MinAPIVersion": "1.12", "Version": "24.0.0",
+                                  "Os": "linux", "Arch": "amd64"})
+        if parts == ("info",):
+            return Response(200, {"NCPU": self.percpu, "MemTotal": 32 * 1024 ** 3,
+                                  "Containers": len(self.containers), "Name": "fake-docker"})
+        if parts == ("events",):
+            return Response(200, content_type="application/json", stream=self._events())
+        if parts == ("containers", "json"):
+            show_all = request.query.get("all") in ("1", "true", "True")
+            return Response(200, [c.summary() for c in self.containers.values()
+                                  if show_all or c.status == "running"])
+        if parts == ("containers", "create") and method == "POST":
+            return self._create(request)
+        if len(parts) >= 2 and parts[0] == "containers":
+            container = self.find(parts[1])
+            if container is None:
+                return Response(404, {"message": f"No such container: {parts[1]}"})
+            return await self._container_action(container, parts[2] if len(parts) > 2 else "", request)
+        if len(parts) == 3 and parts[0] == "exec":
+            return await self._exec_action(parts[1], parts[2])
+        return Response(404, {"message": f"page not found: {request.path}"})
+
+    def _control(self, parts, request: Request) -> Response:
+        """Benchmark control endpoints: request counters and fleet mutations."""
+        if parts == ("requests",):
+            counters = {"docker": dict(self.requests)}
+            if self.mt5_fleet is not None:
+                counters["mt5"] = dict(self.mt5_fleet.requests)
+            return Response(200, counters)
+        if parts == ("reset",):
+            self.requests.clear()
+            if self.mt5_fleet is not None:
+                self.mt5_fleet.reset()
+            return Response(204)
+        if len(parts) == 2 and parts[0] == "containers":
+            container = self.find(parts[1])
+            if request.method == "DELETE":
+                if container is not None:
+                    del self.containers[container.id]
+                    self.emit(container, "destroy")
+                return Response(204)
+            if container is None:
+                # Adds a port-less container, e.g. as a probe for UI update latency
+                container = FakeContainer(parts[1], None, None, "exited")
+                self.containers[container.id] = container
+                self.emit(container, "create")
+            if "cpu" in request.query:
+                container.cpu_load = float(request.query["cpu"])
+            if "memory_mb" in request.query:
+                container.memory_mb = int(request.query["memory_mb"])
+            if "exit_code" in request.query:
+                container.exit_code = int(request.query["exit_code"])
+            if "oom" in request.query:
+                container.oom_killed = request.query["oom"] == "1"
+            if "crashing" in request.query:
+                container.crashing = request.query["crashing"] == "1"
+            if "api" in request.query and self.mt5_fleet is not None:
+                self.mt5_fleet.set_down(container.api_port, request.query["api"] == "down")
+            if "restarts" in request.query:
+                # Restarts by Docker's restart policy
+                container.restart_count += int(request.query["restarts"])
+                container.started_at = time.time()
+                self.emit(container, "restart")
+            status = request.query.get("status", container.status)
+            if status != container.status:
+                container.status = status
+                if status == "running":
+                    container.started_at = time.time()
+                self.emit(container, "start" if status == "running" else "die")
+            return Response(204)
+        return Response(404, {"message": "unknown control endpoint"})
+
+    def _create(self, request: Request) -> Response:
+        body = request.json() or {}
+        bindings = body.get("HostConfig", {}).get("PortBindings", {}) or {}
+
+        def host_port(key):
+            binding = bindings.get(key)
+            return int(binding[0]["HostPort"]) if binding else None
+
+        name = request.query.get("name") or f"container_{secrets.token_hex(4)}"
+        if any(c.name == name for c in self.containers.values()):
+            return Response(409, {"message": f"Conflict. The container name \"/{name}\" is already in use"})
+        c = FakeContainer(name, host_port("3000/tcp"), host_port("8001/tcp"), "created",
+                          labels=body.get("Labels") or {}, image=body.get("Image", ""))
+        c.limits = {key: value for key, value in body.get("HostConfig", {}).items() if key in LIMIT_FIELDS}
+        for bind in body.get("HostConfig", {}).get("Binds") or ():
+            volume, _, target = bind.partition(":")
+            if target.split(":")[0] == "/config":
+                c.volume = volume
+                self.volumes.setdefault(volume, {})  # a new volume starts empty
+        self.containers[c.id] = c
+        self.emit(c, "create")
+        return Response(201, {"Id": c.id, "Warnings": []})
+
+    async def _container_action(self, c: FakeContainer, action: str, request: Request) -> Response:
+        method = request.method
+        if method == "DELETE" and action == "":
+            del self.containers[c.id]
+            self.emit(c, "destroy")
+            return Response(204)
+        if action == "json":
+            return Response(200, c.inspect())
+        if action == "stats":
+            if self.stats_latency:
+                await asyncio.sleep(self.stats_latency)
+            return Response(200, self._stats(c))
+        if action in ("start", "restart", "unpause"):
+            c.status = "running"
+            c.started_at = time.time()
+            if action == "restart":
+                c.restart_count += 1
+            if action != "unpause":
+                c.exit_code = 0
+                c.oom_killed = False
+                if self.mt5_fleet is not None:
+                    self.mt5_fleet.set_down(c.api_port, False)  # a fresh terminal answers again
+                if c.crashing:
+                    asyncio.get_running_loop().call_later(1.0, self._crash, c)
+            self.emit(c, action)
+            return Response(204)
+        if action in ("stop", "kill"):
+            c.status = "exited"
+            self.emit(c, action)
+            self.emit(c, "die")
+            return Response(204)
+        if action == "pause":
+            c.status = "paused"
+            self.emit(c, action)
+            return Response(204)
+        if action == "update":
+            c.limits.update({key: value for key, value in (request.json() or {}).items() if key in LIMIT_FIELDS})
+            self.emit(c, action)
+            return Response(200, {"Warnings": []})
+        if action == "archive" and method == "GET":
+            path = request.query.get("path", "")
+            if path.rstrip("/") == "/config":
+                return Response(200, content_type="application/x-tar", stream=self._volume_tar(c))
+            if path in c.blobs:
+                return Response(200, _tar(path, c.blobs[path]), "application/x-tar")
+            if path.startswith("/config/Logs/"):
+                return Response(200, self._archive(path), "application/x-tar")
+            return Response(404, {"message": f"Could not find the file {path} in container {c.name}"})
+        if action == "archive" and method == "PUT":
+            c.archive_bytes += len(request.body)
+            try:
+                with tarfile.open(fileobj=io.BytesIO(request.body)) as tar:
+                    for m in tar:
+                        if m.isfile():
+                            path = request.query.get("path", "") + m.name
+                            data = tar.extractfile(m).read()
+                            c.files[path] = m.size
+                            if m.size <= 1024 * 1024:
+                                c.blobs[path] = data
+                            if path.startswith("/config/"):
+                                self._volume(c.volume)[path] = (data, int(m.mtime))
+            except tarfile.TarError as e:
+                return Response(400, {"message": f"invalid tar: {e}"})
+            return Response(200)
+        if action == "exec" and method == "POST":
+            exec_id = secrets.token_hex(32)
+            self.execs[exec_id] = {"container": c, "cmd": (request.json() or {}).get("Cmd", []), "exit_code": None}
+            return Response(201, {"Id": exec_id})
+        return Response(404, {"message": f"unsupported: {action}"})
+
+    async def _exec_action(self, exec_id: str, action: str) -> Response:
+        exec_ = self.execs.get(exec_id)
+        if exec_ is None:
+            return Response(404, {"message": "No such exec instance"})
+        if action == "json":
+            return Response(200, {"ID": exec_id, "Running": False, "ExitCode": exec_["exit_code"] or 0})
+        if action == "start":
+            if self.exec_latency:
+                await asyncio.sleep(self.exec_latency)
+            exit_code, output = self._run(exec_["container"], exec_["cmd"])
+            exec_["exit_code"] = exit_code
+            return Response(200, _frame(output), "application/vnd.docker.raw-stream", raw=True)
+        return Response(404, {"message": f"unsupported: {action}"})
+
+    def _run(self, c: FakeContainer, cmd) -> tuple:
+        """Emulates the few shell commands the manager runs inside MT5 containers."""
+        if cmd[:2] == ["rm", "-f"]:
+            for path in cmd[2:]:
+                c.blobs.pop(path, None)
+            return 0, b""
+        if cmd[:1] == ["wine"]:
+            return self._compile(c, cmd)
+        if cmd[:2] == ["ls", "-1"]:
+            names = [f"202601{day:02d}.log" for day in range(1, self.log_files + 1)]
+            return 0, ("\n".join(names) + "\n").encode()
+        if cmd[:1] == ["cat"]:
+            line = "CS\t0\t12:00:00.000\tTerminal\tfake log line for benchmarking\r\n"
+            text = line * max(1, self.log_size // (len(line) * 2))
+            return 0, text.encode("utf-16")
+        return 0, b""
+
+    def _compile(self, c: FakeContainer, cmd) -> tuple:
+        """MetaEditor's /compile: sources containing COMPILE_ERROR fail, others get an .ex5."""
+        args = {arg.split(":", 1)[0]: _unix_path(arg.split(":", 1)[1]) for arg in cmd[2:] if ":" in arg}
+        source, log = args.get("/compile", ""), args.get("/log", "")
+        name = source.rsplit("/", 1)[-1]
+        if source not in c.blobs:
+            lines, errors = [f"{name} : error 101: file not found"], 1
+        elif b"COMPILE_ERROR" in c.blobs[source]:
+            lines, errors = [f"{name}(3,5) : error 256: 'COMPILE_ERROR' - undeclared identifier"], 1
+        else:
+            lines, errors = [f"{name} : information: compiling '{name}'"], 0
+            c.blobs[source[:-4] + ".ex5"] = b"EX5\0" + c.blobs[source]
+        lines.append(f"Result: {errors} errors, 0 warnings, 41 msec elapsed")
+        c.blobs[log] = "\r\n".join(lines).encode("utf-16")
+        return errors, b""
+
+    def _crash(self, c: FakeContainer):
+        if c.crashing and c.status == "running" and c.id in self.containers:
+            c.status = "exited"
+            c.exit_code = 1
+            self.emit(c, "die")
+
+    def _archive(self, path: str) -> bytes:
+        """A tar with one short Journal log for any requested log file."""
+        text = "".join(f"CS\t0\t12:00:{second:02d}.000\tTerminal\tfake journal line {second}\r\n" for second in range(60))
+        return _tar(path, text.encode("utf-16"))
+
+    def _volume(self, name: str) -> Dict[str, tuple]:
+        """Files of a volume. Volumes of the initial fleet hold a fake MT5 install (the same
+        files everywhere) plus one account's settings, logs and price history."""
+        files = self.volumes.get(name)
+        if files is None:
+            files = {f"{MT5_DIR}/lib/module{i:04d}.dll": (_install_file(i, self.config_file_size), INSTALL_MTIME)
+                     for i in range(self.config_files)}
+            now = int(time.time())
+            files.update({
+                f"{MT5_DIR}/Config/common.ini": (f"[Common]\nLogin={name}\n".encode(), now),
+                f"{MT5_DIR}/Config/accounts.dat": (secrets.token_bytes(4096), now),
+                f"{MT5_DIR}/MQL5/Profiles/Templates/default.tpl": (b"<chart>\n</chart>\n", INSTALL_MTIME),
+                f"{MT5_DIR}/Logs/20260101.log": (secrets.token_bytes(8192), now),
+                f"{MT5_DIR}/Bases/Demo/history/EURUSD/2026.hcc": (secrets.token_bytes(65536), now),
+            })
+            self.volumes[name] = files
+        return files
+
+    async def _volume_tar(self, c: FakeContainer):
+        """A tar of /config, streamed file by file like the daemon does."""
+        files = self._volume(c.volume)
+        folders = {"/".join(path.split("/")[:depth]) for path in files for depth in range(2, path.count("/") + 1)}
+        for path in sorted(folders | set(files)):
+            info = tarfile.TarInfo(path[1:])
+            info.uid = info.gid = 911  # abc, the image's user
+            if path in folders:
+                info.type, info.mode, info.mtime = tarfile.DIRTYPE, 0o755, INSTALL_MTIME
+                yield info.tobuf()
+                continue
+            data, info.mtime = files[path]
+            info.size, info.mode = len(data), 0o644
+            padding = tarfile.NUL * (-len(data) % tarfile.BLOCKSIZE)
+            yield info.tobuf() + data + padding
+            await asyncio.sleep(0)
+        yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+    def _stats(self, c: FakeContainer) -> Dict:
+        # Busy cores, capped by the CPU quota and cpuset like the kernel would
+        busy = c.cpu_load
+        if c.limits.get("CpuQuota", 0) > 0:
+            busy = min(busy, c.limits["CpuQuota"] / (c.limits.get("CpuPeriod") or 100_000))
+        if c.limits.get("CpusetCpus"):
+            busy = min(busy, len(c.limits["CpusetCpus"].split(",")))
+        used = int(busy * 1e9)
+        c.cpu_total += used
+        percpu = [c.cpu_total // self.percpu] * self.percpu
+        return {
+            "read": _iso(time.time()),
+            "preread": _iso(time.time() - 1),
+            "cpu_stats": {
+                "cpu_usage": {"total_usage": c.cpu_total, "percpu_usage": percpu,
+                              "usage_in_kernelmode": 0, "usage_in_usermode": c.cpu_total},
+                "system_cpu_usage": int(time.time() * 1e9) * self.percpu,
+                "online_cpus": self.percpu,
+                "throttling_data": {"periods": 0, "throttled_periods": 0, "throttled_time": 0},
+            },
+            "precpu_stats": {
+                "cpu_usage": {"total_usage": c.cpu_total - used, "percpu_usage": percpu,
+                              "usage_in_kernelmode": 0, "usage_in_usermode": c.cpu_total},
+                "system_cpu_usage": int((time.time() - 1) * 1e9) * self.percpu,
+                "online_cpus": self.percpu,
+                "throttling_data": {"periods": 0, "throttled_periods": 0, "throttled_time": 0},
+            },
+            "memory_stats": {"usage": c.memory_mb * 1024 * 1024, "limit": c.limits.get("Memory") or 32 * 1024 ** 3,
+                             "stats": {"cache": 0, "rss": c.memory_mb * 1024 * 1024}},
+            "networks": {"eth0": {"rx_bytes": 1024, "tx_bytes": 2048, "rx_packets": 10, "tx_packets": 20}},
+            "blkio_stats": {"io_service_bytes_recursive": []},
+            "pids_stats": {"current": 42},
+            "name": f"/{c.name}",
+            "id": c.id,
+        }
+
+
+def _frame(data: bytes, stream: int = 1) -> bytes:
+    """Wraps output in Docker's multiplexed stream framing."""
+    return struct.pack(">BxxxL", stream, len(data)) + data if data else b""
@@ -0,0 +1,154 @@
+"""
+Fake HTTP - Minimal asyncio HTTP/1.1 server shared by the fake Docker daemon
+and the fake MT5 API. Supports keep-alive, Content-Length and chunked bodies,
+raw "hijacked" responses (used by Docker exec) and endless chunked streams
+(Docker events).
+"""
+import asyncio
+import json
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified",
+           404: "Not Found", 409: "Conflict", 500: "Internal Server Error"}
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class Response:
+    """A regular response, a raw stream written before the connection is closed, or a
+    chunked stream of the byte strings an async iterator yields."""
+    __slots__ = ("status", "body", "content_type", "raw", "stream")
+
+    def __init__(self, status: int = 200, body=b"", content_type: str = "application/json", raw: bool = False,
+                 stream: Optional[AsyncIterator[bytes]] = None):
+        self.status = status
+        if not isinstance(body, (bytes, bytearray)):
+            body = json.dumps(body).encode()
+        self.body = body
+        self.content_type = content_type
+        self.raw = raw
+        self.stream = stream
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class FakeHttpServer:
+    """Serves one handler on one or more TCP ports and counts requests per route."""
+
+    def __init__(self, handler: Handler, host: str = "127.0.0.1"):
+        self.handler = handler
+        self.host = host
+        self.servers = []
+        self.requests = Counter()
+
+    async def listen(self, port: int = 0) -> int:
+        server = await asyncio.start_server(self._serve, self.host, port, limit=2 ** 20)
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+        for server in self.servers:
+            await server.wait_closed()
+        self.servers.clear()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                response = await self.handler(request)
+                if not request.path.startswith("/_fake"):
+                    self.requests[f"{request.method} {_route(request.path)}"] += 1
+                head = (
+                    f"HTTP/1.1 {response.status} {REASONS.get(response.status, 'OK')}\r\n"
+                    f"Content-Type: {response.content_type}\r\n"
+                )
+                if response.stream is not None:
+                    writer.write(head.encode() + b"Transfer-Encoding: chunked\r\n\r\n")
+                    await writer.drain()
+                    async for chunk in response.stream:
+                        writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                        await writer.drain()
+                    writer.write(b"0\r\n\r\n")
+                    await writer.drain()
+                    break
+                if response.raw:
+                    # Like the real daemon, flush the headers before the stream: docker-py reads
+                    # the stream straight from the socket and misses bytes buffered with the headers
+                    writer.write(head.encode() + b"Connection: close\r\n\r\n")
+                    await writer.drain()
+                    await asyncio.sleep(0.005)
+                    writer.write(response.body)
+                    await writer.drain()
+                    break
+                writer.write(head.encode() + f"Content-Length: {len(response.body)}\r\n\r\n".encode() + response.body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _route(path: str) -> str:
+    # Collapse ids so counters group by endpoint: /containers/abc/json -> /containers/{id}/json
+    parts = list(split_route(path))
+    if len(parts) >= 3 and parts[0] in ("containers", "exec"):
+        parts[1] = "{id}"
+    return "/" + "/".join(parts)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    return Request(method, url.path, query, headers, body)
+
+
+def split_route(path: str) -> Tuple[str, ...]:
+    """Splits a request path into segments, dropping a Docker /v1.xx prefix."""
+    parts = tuple(p for p in path.split("/") if p)
+    if parts and parts[0].startswith("v1."):
+        parts = parts[1:]
+    return parts
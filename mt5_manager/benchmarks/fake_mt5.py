@@ -0,0 +1,133 @@
+"""
+Fake MT5 - A local stand-in for the MT5 REST API exposed by each instance on port 8001.
+One asyncio server listens on every instance port; each port gets its own
+synthetic account with drifting prices, open positions, orders and deal history.
+"""
+import asyncio
+import random
+import time
+from typing import Dict, Iterable, List
+
+from benchmarks.fake_http import FakeHttpServer, Request, Response, split_route
+
+SYMBOLS = ("EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "US30", "NAS100", "BTCUSD", "AUDUSD")
+
+
+class FakeAccount:
+    def __init__(self, port: int, positions: int, orders: int, deals_per_day: int):
+        self.rng = random.Random(port)
+        self.port = port
+        self.balance = round(self.rng.uniform(1_000, 100_000), 2)
+        self.deals_per_day = deals_per_day
+        self.positions = [self._position(1_000_000 + i) for i in range(positions)]
+        self.orders = [self._order(2_000_000 + i) for i in range(orders)]
+        self.down = False  # the terminal hangs: every endpoint fails
+
+    def _position(self, ticket: int) -> Dict:
+        price = round(self.rng.uniform(1, 2000), 5)
+        return {
+            "ticket": ticket, "symbol": self.rng.choice(SYMBOLS), "type": self.rng.randint(0, 1),
+            "volume": round(self.rng.choice((0.01, 0.1, 0.5, 1.0)), 2), "price_open": price,
+            "price_current": price, "profit": 0.0, "swap": 0.0, "sl": 0.0, "tp": 0.0,
+            "time": int(time.time()) - self.rng.randint(60, 86400), "magic": 0, "comment": "",
+        }
+
+    def _order(self, ticket: int) -> Dict:
+        return {
+            "ticket": ticket, "symbol": self.rng.choice(SYMBOLS), "type": self.rng.randint(2, 5),
+            "volume_current": 0.1, "price_open": round(self.rng.uniform(1, 2000), 5),
+            "price_current": 0.0, "sl": 0.0, "tp": 0.0, "time_setup": int(time.time()),
+        }
+
+    def tick(self):
+        """Moves prices so consecutive polls see changing P/L."""
+        for pos in self.positions:
+            pos["price_current"] = round(pos["price_current"] * (1 + self.rng.uniform(-0.0005, 0.0005)), 5)
+            direction = 1 if pos["type"] == 0 else -1
+            pos["profit"] = round((pos["price_current"] - pos["price_open"]) * direction * pos["volume"] * 100, 2)
+
+    def account_info(self) -> Dict:
+        profit = round(sum(p["profit"] for p in self.positions), 2)
+        margin = round(sum(p["volume"] for p in self.positions) * 1000, 2)
+        return {
+            "login": self.port, "name": f"Bench {self.port}", "server": "Fake-Server",
+            "company": "Fake Broker", "currency": "USD", "leverage": 100,
+            "balance": self.balance, "equity": round(self.balance + profit, 2), "profit": profit,
+            "margin": margin, "free_margin": round(self.balance + profit - margin, 2),
+        }
+
+    def history(self, days: int) -> List[Dict]:
+        rng = random.Random(self.port * 31 + days)
+        now = int(time.time())
+        deals = []
+        for i in range(days * self.deals_per_day):
+            deals.append({
+                "ticket": 3_000_000 + i, "order": 4_000_000 + i, "position_id": 5_000_000 + i // 2,
+                "symbol": rng.choice(SYMBOLS), "type": rng.randint(0, 1), "entry": i % 2,
+                "volume": 0.1, "price": round(rng.uniform(1, 2000), 5),
+                "profit": round(rng.uniform(-50, 60), 2) if i % 2 else 0.0,
+                "commission": -0.7, "swap": 0.0, "time": now - i * 60, "comment": "",
+            })
+        return deals
+
+
+class FakeMT5Fleet:
+    """Answers the MT5 REST API on one port per instance."""
+
+    def __init__(self, positions: int = 20, orders: int = 5, deals_per_day: int = 50, latency: float = 0.0):
+        self.positions = positions
+        self.orders = orders
+        self.deals_per_day = deals_per_day
+        self.latency = latency
+        self.accounts: Dict[int, FakeAccount] = {}
+        self.servers: Dict[int, FakeHttpServer] = {}
+
+    @property
+    def requests(self):
+        total = None
+        for server in self.servers.values():
+            total = server.requests.copy() if total is None else total + server.requests
+        return total or {}
+
+    def reset(self):
+        for server in self.servers.values():
+            server.requests.clear()
+
+    def set_down(self, port, down: bool):
+        account = self.accounts.get(port)
+        if account is not None:
+            account.down = down
+
+    async def start(self, ports: Iterable[int]):
+        for port in ports:
+            account = FakeAccount(port, self.positions, self.orders, self.deals_per_day)
+            server = FakeHttpServer(lambda request, account=account: self.handle(account, request), host="localhost")
+            await server.listen(port)
+            self.accounts[port] = account
+            self.servers[port] = server
+
+    async def close(self):
+        for server in self.servers.values():
+            await server.close()
+        self.servers.clear()
+
+    async def handle(self, account: FakeAccount, request: Request) -> Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if account.down:
+            return Response(503, {"error": "terminal not responding"})
+        parts = split_route(request.path)
+        endpoint = parts[0] if parts else ""
+        if endpoint == "ping":
+            return Response(200, {"status": "ok"})
+        if endpoint == "account_info":
+            account.tick()
+            return Response(200, account.account_info())
+        if endpoint == "positions":
+            account.tick()
+            return Response(200, account.positions)
+        if endpoint == "orders":
+            return Response(200, account.orders)
+        if endpoint == "history":
+            return Response(200, account.history(int(request.query.get("days", 7))))
+        return Response(404, {"error": f"unknown endpoint {request.path}"})
@@ -0,0 +1,60 @@
+"""
+Fakes - Runs the fake Docker daemon and the fake MT5 API fleet together.
+Prints {"docker_host": ...} as the first stdout line once both are listening,
+so other tools can point DOCKER_HOST at it.
+
+    python -m benchmarks.fakes --containers 100 --docker-port 2375
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.fake_docker import FakeDockerDaemon
+from benchmarks.fake_mt5 import FakeMT5Fleet
+
+
+def add_arguments(parser: argparse.ArgumentParser, fleet_size: bool = True):
+    if fleet_size:
+        parser.add_argument("--containers", type=int, default=10)
+    parser.add_argument("--running-ratio", type=float, default=1.0)
+    parser.add_argument("--docker-latency", type=float, default=0.0, help="Seconds added to every Docker API call")
+    parser.add_argument("--stats-latency", type=float, default=0.0, help="Extra seconds for stats (real Docker: ~1-2s)")
+    parser.add_argument("--exec-latency", type=float, default=0.0)
+    parser.add_argument("--log-size", type=int, default=64 * 1024)
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Seconds added to every MT5 API call")
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=5)
+    parser.add_argument("--deals-per-day", type=int, default=50)
+    parser.add_argument("--vnc-base", type=int, default=13000)
+    parser.add_argument("--api-base", type=int, default=18001)
+
+
+async def start_fakes(args, docker_port: int = 0):
+    """Starts both fakes from parsed arguments. Returns (daemon, fleet, docker_host)."""
+    daemon = FakeDockerDaemon(
+        containers=args.containers, running_ratio=args.running_ratio, latency=args.docker_latency,
+        stats_latency=args.stats_latency, exec_latency=args.exec_latency, log_size=args.log_size,
+        vnc_base=args.vnc_base, api_base=args.api_base,
+    )
+    fleet = FakeMT5Fleet(positions=args.positions, orders=args.orders,
+                         deals_per_day=args.deals_per_day, latency=args.api_latency)
+    await fleet.start(c.api_port for c in daemon.containers.values())
+    daemon.mt5_fleet = fleet
+    docker_host = await daemon.start(docker_port)
+    return daemon, fleet, docker_host
+
+
+async def main(args):
+    _, _, docker_host = await start_fakes(args, args.docker_port)
+    print(json.dumps({"docker_host": docker_host}), flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Docker daemon and MT5 API fleet")
+    add_arguments(parser)
+    parser.add_argument("--docker-port", type=int, default=0)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
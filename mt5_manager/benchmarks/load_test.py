@@ -0,0 +1,282 @@
+"""
+Load test - Drives N simulated browser clients against the NiceGUI dashboard.
+Each client loads the page and holds the NiceGUI socket.io connection like a
+browser tab. The dashboard runs against the fake Docker/MT5 stack and we
+measure websocket message volume, server CPU, HTTP probe latency (event-loop
+responsiveness), the dashboard's own event-loop lag metric and time-to-update
+per client.
+
+    python -m benchmarks.load_test --instances 10 100 --clients 1 5 20 --duration 30
+
+Requires python-socketio with aiohttp (both come with NiceGUI).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks import fakes
+from benchmarks.run import FakeStack
+
+MT5_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT_ID = re.compile(r"[\"']client_id[\"']:\s*[\"']([0-9a-f-]+)[\"']")
+
+
+class SimulatedClient:
+    """A headless browser tab: page load, socket.io handshake and message accounting."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.messages = 0
+        self.bytes = 0
+        self.received: List[tuple] = []  # (monotonic time, payload text) for probe matching
+        self.connect_seconds = None
+        self.sio = None
+
+    async def connect(self):
+        import socketio
+
+        start = time.perf_counter()
+        html = await asyncio.to_thread(_http_get, self.base_url + "/")
+        client_id = CLIENT_ID.search(html).group(1)
+
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on("*", self._on_message)
+        await self.sio.connect(f"{self.base_url}?client_id={client_id}", transports=["websocket"],
+                               socketio_path="/_nicegui_ws/socket.io")
+        ok = await self.sio.call("handshake", {"client_id": client_id, "tab_id": str(uuid.uuid4())})
+        if not ok:
+            raise RuntimeError(f"handshake rejected for client {client_id}")
+        self.connect_seconds = time.perf_counter() - start
+
+    async def _on_message(self, event, data=None):
+        text = json.dumps(data, separators=(",", ":"), default=str)
+        self.messages += 1
+        self.bytes += len(text)
+        self.received.append((time.monotonic(), text))
+
+    def first_seen(self, marker: str, since: float) -> Optional[float]:
+        for ts, text in self.received:
+            if ts >= since and marker in text:
+                return ts - since
+        return None
+
+    def reset(self):
+        self.messages = 0
+        self.bytes = 0
+        self.received.clear()
+
+    async def close(self):
+        if self.sio is not None:
+            await self.sio.disconnect()
+
+
+class CpuSampler:
+    """Process CPU time from /proc (Linux) or psutil when available."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+        except ImportError:
+            self._process = None
+
+    def cpu_seconds(self) -> Optional[float]:
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, IndexError, ValueError):
+            return None
+
+
+def _http_get(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read().decode()
+
+
+def _control(docker_host: str, path: str, method: str):
+    url = docker_host.replace("tcp://", "http://") + f"/_fake/{path}"
+    urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=10).read()
+
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(values)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+    }
+
+
+async def _probe_latency(base_url: str, stop: asyncio.Event, samples: List[float]):
+    # A tiny HTTP request is served by the same event loop as the UI, so its
+    # latency tracks how long the loop is busy with refreshes and websocket pushes
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(_http_get, base_url + "/metrics")
+            samples.append(time.perf_counter() - start)
+        except OSError:
+            pass
+        await asyncio.sleep(0.5)
+
+
+def _scrape(base_url: str) -> Dict[str, float]:
+    """Unlabelled samples from the dashboard's /metrics endpoint."""
+    samples = {}
+    for line in _http_get(base_url + "/metrics").splitlines():
+        if line and not line.startswith("#") and "{" not in line:
+            name, _, value = line.partition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def _loop_stats(before: Dict[str, float], after: Dict[str, float]) -> Dict:
+    # The dashboard's own lag probe, diffed over the round
+    lag = "mt5_manager_event_loop_lag_seconds"
+    count = after.get(f"{lag}_count", 0) - before.get(f"{lag}_count", 0)
+    total = after.get(f"{lag}_sum", 0) - before.get(f"{lag}_sum", 0)
+    return {
+        "lag_mean_seconds": total / count if count else None,
+        "lag_max_seconds": after.get("mt5_manager_event_loop_lag_max_seconds"),
+        "blocked": after.get("mt5_manager_event_loop_blocked_total", 0)
+                   - before.get("mt5_manager_event_loop_blocked_total", 0),
+    }
+
+
+async def run_round(args, base_url: str, docker_host: str, cpu: Optional[CpuSampler],
+                    instances: int, n_clients: int) -> Dict:
+    clients = [SimulatedClient(base_url) for _ in range(n_clients)]
+    await asyncio.gather(*(c.connect() for c in clients))
+    for c in clients:
+        c.reset()
+
+    stop = asyncio.Event()
+    probe_samples: List[float] = []
+    prober = asyncio.create_task(_probe_latency(base_url, stop, probe_samples))
+
+    cpu_start = cpu.cpu_seconds() if cpu else None
+    metrics_start = await asyncio.to_thread(_scrape, base_url)
+    start = time.monotonic()
+    probes = []
+    while time.monotonic() - start < args.duration:
+        # Add a uniquely named container and watch for it to reach every client
+        name = f"trading_mt5_probe{uuid.uuid4().hex[:8]}"
+        created = time.monotonic()
+        await asyncio.to_thread(_control, docker_host, f"containers/{name}?status=running", "POST")
+        probes.append((name, created))
+        await asyncio.sleep(min(args.probe_interval, max(0.0, args.duration - (time.monotonic() - start))))
+        await asyncio.to_thread(_control, docker_host, f"containers/{name}", "DELETE")
+    await asyncio.sleep(args.settle)
+    elapsed = time.monotonic() - start
+
+    stop.set()
+    await prober
+    cpu_end = cpu.cpu_seconds() if cpu else None
+    loop = _loop_stats(metrics_start, await asyncio.to_thread(_scrape, base_url))
+
+    update_latencies = []
+    missed = 0
+    for client in clients:
+        for name, created in probes:
+            seen = client.first_seen(name, created)
+            if seen is None:
+                missed += 1
+            else:
+                update_latencies.append(seen)
+
+    await asyncio.gather(*(c.close() for c in clients))
+
+    total_messages = sum(c.messages for c in clients)
+    total_bytes = sum(c.bytes for c in clients)
+    result = {
+        "instances": instances,
+        "clients": n_clients,
+        "duration": elapsed,
+        "connect_seconds": _percentiles([c.connect_seconds for c in clients]),
+        "ws_messages_per_second": total_messages / elapsed,
+        "ws_bytes_per_second": total_bytes / elapsed,
+        "ws_bytes_per_client_per_second": total_bytes / elapsed / n_clients,
+        "server_cpu_percent": (cpu_end - cpu_start) / elapsed * 100 if cpu_start is not None and cpu_end is not None else None,
+        "probe_latency_seconds": _percentiles(probe_samples),
+        "event_loop": loop,
+        "time_to_update_seconds": _percentiles(update_latencies),
+        "probes": len(probes),
+        "missed_updates": missed,
+    }
+    print(f"instances={instances:<4} clients={n_clients:<3} "
+          f"ws={result['ws_bytes_per_second'] / 1024:8.1f} KiB/s  "
+          f"cpu={result['server_cpu_percent'] or 0:5.1f}%  "
+          f"probe_p95={(result['probe_latency_seconds']['p95'] or 0) * 1000:7.1f} ms  "
+          f"lag_mean={(loop['lag_mean_seconds'] or 0) * 1000:6.1f} ms  blocked={loop['blocked']:.0f}  "
+          f"update_p50={(result['time_to_update_seconds']['p50'] or 0):5.2f} s  missed={missed}")
+    return result
+
+
+def _start_dashboard(docker_host: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DOCKER_HOST=docker_host, MT5_MANAGER_PORT=str(port))
+    process = subprocess.Popen([sys.executable, "dashboard.py"], cwd=MT5_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            _http_get(f"http://127.0.0.1:{port}/metrics")
+            return process
+        except OSError:
+            time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError("dashboard did not start within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-viewer load test for the dashboard")
+    fakes.add_arguments(parser, fleet_size=False)
+    parser.add_argument("--instances", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per round")
+    parser.add_argument("--probe-interval", type=float, default=12.0, help="Seconds between update probes")
+    parser.add_argument("--settle", type=float, default=12.0, help="Seconds to wait for the last probe")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", default="bench_results_load.json")
+    args = parser.parse_args()
+
+    results = []
+    for instances in args.instances:
+        with FakeStack(args, instances) as stack:
+            dashboard = _start_dashboard(stack.docker_host, args.port)
+            try:
+                cpu = CpuSampler(dashboard.pid)
+                base_url = f"http://127.0.0.1:{args.port}"
+                for n_clients in args.clients:
+                    results.append(asyncio.run(run_round(args, base_url, stack.docker_host, cpu, instances, n_clients)))
+            finally:
+                dashboard.terminate()
+                dashboard.wait()
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "cpus": os.cpu_count(),
+                     "args": {k: v for k, v in vars(args).items() if k != "output"}},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
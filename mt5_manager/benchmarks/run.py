@@ -0,0 +1,227 @@
+"""
+Benchmark runner - Measures the manager's hot paths against the fake Docker
+daemon and fake MT5 API at several fleet sizes and saves the results as JSON.
+
+    python -m benchmarks.run --sizes 10 100 500 --output bench.json
+    python -m benchmarks.run --sizes 100 --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+from executors import executors
+from benchmarks import fakes
+
+
+class FakeStack:
+    """Runs benchmarks.fakes in a subprocess so the fakes don't compete for our GIL."""
+
+    def __init__(self, args, containers: int):
+        self.args = args
+        self.containers = containers
+        self.process = None
+        self.docker_host = None
+
+    def __enter__(self):
+        cmd = [sys.executable, "-m", "benchmarks.fakes", "--containers", str(self.containers)]
+        for name in ("docker_latency", "stats_latency", "exec_latency", "api_latency",
+                     "positions", "orders", "deals_per_day", "log_size", "running_ratio"):
+            cmd += [f"--{name.replace('_', '-')}", str(getattr(self.args, name))]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True,
+                                        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.docker_host = json.loads(self.process.stdout.readline())["docker_host"]
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+
+    def _control(self, path: str, method: str = "GET"):
+        url = self.docker_host.replace("tcp://", "http://") + f"/_fake/{path}"
+        with urllib.request.urlopen(urllib.request.Request(url, method=method)) as response:
+            body = response.read()
+        return json.loads(body) if body else None
+
+    def reset_counters(self):
+        self._control("reset", "POST")
+
+    def counters(self):
+        return self._control("requests")
+
+
+# --- Scenarios ---
+# Each scenario receives the shared context and is timed end-to-end.
+
+async def scenario_list_containers(ctx):
+    await executors.run("stats", ctx["docker"].list_mt5_containers)
+
+
+async def scenario_container_stats(ctx):
+    docker_service = ctx["docker"]
+    await asyncio.gather(*(executors.run("stats", docker_service.get_container_stats, c["id"])
+                           for c in ctx["running"]))
+
+
+async def scenario_api_fanout(ctx):
+    api = ctx["api"]
+    calls = []
+    for c in ctx["running"]:
+        calls.append(executors.run("api", api.get_account_info, "localhost", c["api_port"]))
+        calls.append(executors.run("api", api.get_positions, "localhost", c["api_port"]))
+    await asyncio.gather(*calls)
+
+
+async def scenario_log_reads(ctx):
+    docker_service = ctx["docker"]
+
+    async def read_latest(c):
+        files = await executors.run("interactive", docker_service.get_log_list, c["id"], "journal")
+        if files:
+            await executors.run("interactive", docker_service.read_log_content, c["id"], "journal", files[0])
+
+    await asyncio.gather(*(read_latest(c) for c in ctx["running"]))
+
+
+async def scenario_dashboard_refresh(ctx):
+    # One shared fleet refresh: list, then one stats call per running container
+    await ctx["fleet"].refresh()
+
+
+SCENARIOS = {
+    "list_mt5_containers": scenario_list_containers,
+    "container_stats": scenario_container_stats,
+    "api_fanout": scenario_api_fanout,
+    "log_reads": scenario_log_reads,
+    "dashboard_refresh": scenario_dashboard_refresh,
+}
+
+
+async def _run_once(func, ctx) -> float:
+    start = time.perf_counter()
+    if asyncio.iscoroutinefunction(func):
+        await func(ctx)
+    else:
+        func(ctx)
+    return time.perf_counter() - start
+
+
+def _summarize(samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": p95,
+        "max": ordered[-1],
+        "runs": samples,
+    }
+
+
+def run_size(args, size: int):
+    with FakeStack(args, size) as stack:
+        # One event loop per size, so the default thread pool stays warm like in the dashboard
+        return asyncio.run(_run_scenarios(args, size, stack))
+
+
+async def _run_scenarios(args, size: int, stack: FakeStack):
+    results = []
+    os.environ["DOCKER_HOST"] = stack.docker_host
+    # Imported late so the services pick up DOCKER_HOST
+    from async_docker import AsyncDockerService
+    from docker_service import DockerService
+    from mt5_api_service import MT5ApiService
+    from fleet_state import FleetState
+
+    docker_service = AsyncDockerService() if args.docker_client == "async" else DockerService()
+    try:
+        await executors.run("stats", docker_service.connect)
+        containers = await executors.run("stats", docker_service.list_mt5_containers) or []
+        ctx = {"docker": docker_service, "api": MT5ApiService()}
+        ctx["running"] = [c for c in containers if c["status"] == "running"]
+        ctx["fleet"] = FleetState(docker_service, ctx["api"])
+        # One open tab showing the first page of cards
+        ctx["fleet"].watch("bench", [c["id"] for c in containers[:24]])
+
+        for name, func in SCENARIOS.items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            await _run_once(func, ctx)  # warm-up
+            stack.reset_counters()
+            samples = [await _run_once(func, ctx) for _ in range(args.repeat)]
+            counters = stack.counters()
+            result = {"scenario": name, "instances": size, **_summarize(samples)}
+            result["docker_requests"] = {k: v / args.repeat for k, v in sorted(counters["docker"].items())}
+            result["docker_requests_total"] = sum(counters["docker"].values()) / args.repeat
+            result["mt5_requests_total"] = sum(counters.get("mt5", {}).values()) / args.repeat
+            results.append(result)
+            print(f"{name:<22} n={size:<4} median={result['median'] * 1000:9.1f} ms  "
+                  f"p95={result['p95'] * 1000:9.1f} ms  docker_calls={result['docker_requests_total']:.0f}")
+    finally:
+        await executors.run("stats", docker_service.close)
+    return results
+
+
+def compare(results, baseline_path: str, threshold: float) -> bool:
+    """Prints median ratios against a saved baseline. Returns False on regression."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["instances"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\n{'scenario':<22} {'n':>4} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for r in results:
+        base = baseline.get((r["scenario"], r["instances"]))
+        if not base:
+            continue
+        ratio = r["median"] / base["median"] if base["median"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        ok = ok and not flag
+        print(f"{r['scenario']:<22} {r['instances']:>4} {base['median'] * 1000:>8.1f}ms "
+              f"{r['median'] * 1000:>8.1f}ms {ratio:>6.2f}x{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MT5 Manager benchmarks")
+    fakes.add_arguments(parser, fleet_size=False)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS))
+    parser.add_argument("--docker-client", choices=("async", "sync"), default="async",
+                        help="AsyncDockerService (the dashboard default) or the docker-py DockerService")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline JSON to compare medians against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Median ratio treated as a regression")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(args, size))
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Startup profile - Import time and time-to-usable for the dashboard.
+Starts dashboard.py under `python -X importtime` against the fake Docker/MT5
+stack and records:
+
+    import_seconds   time spent importing, with the slowest top-level modules
+    shell_seconds    until the page is served (UI shell, before any Docker data)
+    fleet_seconds    until the served page lists the fake containers
+
+Each run is done cold (empty state store) and warm (store saved by the cold
+run), so the effect of restoring saved state is visible.
+
+    python -m benchmarks.startup --instances 100
+    python -m benchmarks.startup --imports manager_gui   # import profile only
+
+Requires the fake stack from benchmarks.fakes.
+"""
+import argparse
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks import fakes
+from benchmarks.run import FakeStack
+
+MT5_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str, top: int = 15) -> Dict:
+    """Total import time and the slowest top-level imports from -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:  # depth 0: imported by the entry point itself
+            modules.append((match.group(4), int(match.group(2)) / 1e6))
+    modules.sort(key=lambda m: m[1], reverse=True)
+    return {
+        "import_seconds": sum(seconds for _, seconds in modules),
+        "slowest": [{"module": name, "seconds": seconds} for name, seconds in modules[:top]],
+    }
+
+
+def profile_imports(module: str) -> Dict:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=MT5_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def _http_get(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read().decode()
+
+
+def _wait_for_page(url: str, marker: str, deadline: float) -> tuple:
+    """Polls the page; returns when it was first served and when it first contained marker."""
+    served = None
+    while time.monotonic() < deadline:
+        try:
+            page = _http_get(url)
+            now = time.monotonic()
+            served = served or now
+            if marker in page:
+                return served, now
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"'{marker}' not served at {url} in time")
+
+
+def start_once(docker_host: str, port: int, state_db: str, timeout: float = 60.0) -> Dict:
+    env = dict(os.environ, DOCKER_HOST=docker_host, MT5_MANAGER_PORT=str(port), MT5_STATE_DB=state_db)
+    with tempfile.TemporaryFile("w+") as stderr:  # a pipe would fill up with importtime output
+        start = time.monotonic()
+        process = subprocess.Popen([sys.executable, "-X", "importtime", "dashboard.py"], cwd=MT5_DIR, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=stderr, text=True)
+        try:
+            url = f"http://127.0.0.1:{port}/"
+            deadline = start + timeout
+            shell, fleet = _wait_for_page(url, "trading_mt5_", deadline)
+        finally:
+            process.send_signal(signal.SIGINT)  # graceful: the state store saves on shutdown
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        stderr.seek(0)
+        imports = parse_importtime(stderr.read(), top=10)
+    return {"shell_seconds": shell - start, "fleet_seconds": fleet - start, **imports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup profile for the dashboard")
+    fakes.add_arguments(parser, fleet_size=False)
+    parser.add_argument("--instances", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--imports", nargs="*", metavar="MODULE",
+                        help="Only profile importing these modules (e.g. manager_gui mt5_api_service)")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--output", default="bench_results_startup.json")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    if args.imports:
+        for module in args.imports:
+            result = {"module": module, **profile_imports(module)}
+            results.append(result)
+            print(f"{module:<20} imports={result['import_seconds'] * 1000:7.1f} ms  slowest: "
+                  + ", ".join(f"{m['module']} {m['seconds'] * 1000:.0f}" for m in result["slowest"][:5]))
+    else:
+        with FakeStack(args, args.instances) as stack, tempfile.TemporaryDirectory() as tmp:
+            state_db = os.path.join(tmp, "state.db")
+            for i in range(args.repeat):
+                for mode in ("cold", "warm"):
+                    if mode == "cold":
+                        for suffix in ("", "-wal", "-shm"):
+                            if os.path.exists(state_db + suffix):
+                                os.remove(state_db + suffix)
+                    result = {"mode": mode, "instances": args.instances,
+                              **start_once(stack.docker_host, args.port, state_db)}
+                    results.append(result)
+                    print(f"{mode:<5} instances={args.instances:<4} imports={result['import_seconds'] * 1000:7.1f} ms  "
+                          f"shell={result['shell_seconds'] * 1000:7.1f} ms  fleet={result['fleet_seconds'] * 1000:7.1f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "cpus": os.cpu_count(),
+                     "args": {k: v for k, v in vars(args).items() if k != "output"}},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
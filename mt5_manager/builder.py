@@ -0,0 +1,246 @@
+"""
+Builder - Compiles MQL5 sources once and fans the binaries out to the fleet.
+Uploading a .mq5 used to leave every instance to compile it on its own. Now
+the .mq5 files of an upload bundle are compiled by MetaEditor (under Wine) in
+one builder container, and the fleet receives the .ex5 files in their place,
+next to the bundle's libraries and presets.
+
+Builds are cached by content: the key hashes the source plus every include it
+pulls from the bundle (#include "..." and <...>, followed recursively), so an
+unchanged source with unchanged includes comes from the cache in
+MT5_BUILD_CACHE (default ~/.mt5_manager/builds) without touching the builder.
+Includes the bundle does not carry belong to the terminal's standard library;
+only their names go into the key.
+
+The builder is the container named by MT5_BUILDER, else the first running
+instance labelled mt5.builder=true, else the first running instance.
+MetaEditor is run from MT5_METAEDITOR as MT5_BUILDER_USER.
+"""
+import asyncio
+import hashlib
+import os
+import posixpath
+import re
+import time
+import zipfile
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+import metrics
+from docker_service import MQL5_DIR, BundleEntry, decode_log
+from executors import executors
+
+BUILDER_LABEL = "mt5.builder"
+METAEDITOR = "/config/.wine/drive_c/Program Files/MetaTrader 5/MetaEditor64.exe"
+SOURCE_EXTENSIONS = (".mq5", ".mqh")
+CACHE_VERSION = b"mql5-build-1"  # bump to invalidate every cached build
+INCLUDE = re.compile(r'^[ \t]*#include\s*([<"])([^>"]+)[>"]', re.MULTILINE)
+ERROR_LINE = re.compile(r"\berror \d+:")
+RESULT = re.compile(r"Result:\s*(\d+) errors?,\s*(\d+) warnings?")
+
+
+@dataclass
+class BuildResult:
+    source: str  # bundle name, e.g. Experts/Grid/Grid.mq5
+    key: str = ""
+    binary: Optional[str] = None  # the cached .ex5 once built
+    cached: bool = False
+    errors: List[str] = field(default_factory=list)
+    warnings: int = 0
+    log: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.binary is not None
+
+    @property
+    def target(self) -> str:
+        """Bundle name of the compiled binary."""
+        return self.source[:-4] + ".ex5"
+
+
+def read_entry(entry: BundleEntry) -> bytes:
+    _, source, member, _ = entry
+    if member is None:
+        with open(source, "rb") as f:
+            return f.read()
+    with zipfile.ZipFile(source) as bundle:
+        return bundle.read(member)
+
+
+def decode_source(data: bytes) -> str:
+    """MQL5 sources are UTF-16 with a BOM (MetaEditor's default) or UTF-8."""
+    if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return data.decode("utf-16", errors="replace")
+    return data.decode("utf-8-sig", errors="replace")
+
+
+def resolve_include(including: str, kind: str, path: str, names) -> Optional[str]:
+    """The bundle file an #include refers to: "..." looks next to the including file
+    first, then in Include; <...> only in Include."""
+    path = path.strip().replace("\\", "/")
+    candidates = [posixpath.normpath(f"Include/{path}")]
+    if kind == '"':
+        candidates.insert(0, posixpath.normpath(posixpath.join(posixpath.dirname(including), path)))
+    return next((name for name in candidates if name in names), None)
+
+
+def build_key(source: str, files: Dict[str, bytes]) -> str:
+    """Content hash of a source and the bundle includes it pulls in, recursively,
+    plus the names of the standard includes it uses."""
+    seen, standard = set(), set()
+    pending = [source]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for kind, path in INCLUDE.findall(decode_source(files[name])):
+            found = resolve_include(name, kind, path, files)
+            if found is None:
+                standard.add(path.strip().replace("\\", "/"))
+            else:
+                pending.append(found)
+    digest = hashlib.sha256(CACHE_VERSION)
+    for name in sorted(seen):
+        digest.update(name.encode() + b"\0" + hashlib.sha256(files[name]).digest())
+    for path in sorted(standard):
+        digest.update(b"<std>\0" + path.encode())
+    return digest.hexdigest()
+
+
+def parse_log(text: str) -> Tuple[List[str], int]:
+    """Error lines and the warning count of a MetaEditor compile log."""
+    errors = [line.strip() for line in text.splitlines() if ERROR_LINE.search(line)]
+    result = RESULT.search(text)
+    if result is None:
+        return errors or ["MetaEditor wrote no result; is MT5_METAEDITOR right?"], 0
+    if int(result.group(1)) and not errors:
+        errors = [result.group(0)]
+    return errors, int(result.group(2))
+
+
+def wine_path(path: str) -> str:
+    """Windows path of a container path (Wine maps Z: to /)."""
+    return "Z:" + path.replace("/", "\\")
+
+
+class Builder:
+    """Compiles bundle sources in a builder container, caching the binaries by content."""
+
+    def __init__(self, cache_dir: str, builder: Optional[str] = None, metaeditor: str = METAEDITOR,
+                 user: str = "abc"):
+        self.cache_dir = cache_dir
+        self.builder = builder  # container name, short name or id
+        self.metaeditor = metaeditor
+        self.user = user  # Wine refuses a prefix that belongs to another user
+        self._lock = asyncio.Lock()  # one MetaEditor at a time
+
+    def pick_builder(self, records: Iterable[Dict]) -> Optional[Dict]:
+        running = sorted((r for r in records if "running" in r["status"].lower()), key=lambda r: r["name"])
+        if self.builder:
+            return next((r for r in running if self.builder in (r["id"], r["name"], r["name"].removeprefix("trading_mt5_"))), None)
+        labelled = [r for r in running if (r.get("labels") or {}).get(BUILDER_LABEL) == "true"]
+        return (labelled or running or [None])[0]
+
+    async def build(self, fleet, entries: List[BundleEntry]) -> Tuple[List[BuildResult], Optional[List[BundleEntry]]]:
+        """Compiles the bundle's .mq5 files. Returns the results and the entries to deploy:
+        the bundle without sources, plus the compiled binaries. None if a build failed."""
+        sources = [e for e in entries if e[0].lower().endswith(SOURCE_EXTENSIONS)]
+        targets = sorted(e[0] for e in sources if e[0].lower().endswith(".mq5"))
+        if not targets:
+            return [], entries
+        files = await executors.run("io", lambda: {e[0]: read_entry(e) for e in sources})
+        results = [await self._build(fleet, name, files, sources) for name in targets]
+        if not all(r.ok for r in results):
+            return results, None
+        binaries = {r.target: (r.target, r.binary, None, os.path.getsize(r.binary)) for r in results}
+        deploy = [e for e in entries if e not in sources and e[0] not in binaries]
+        return results, deploy + list(binaries.values())
+
+    async def _build(self, fleet, name: str, files: Dict[str, bytes], sources: List[BundleEntry]) -> BuildResult:
+        key = build_key(name, files)
+        cached = await executors.run("io", self._cached, name, key)
+        if cached is None:
+            async with self._lock:
+                # An identical build may have finished while this one waited
+                cached = await executors.run("io", self._cached, name, key)
+                if cached is None:
+                    return await self._compile(fleet, name, key, sources)
+        metrics.BUILDS.labels("cached").inc()
+        return cached
+
+    def _cached(self, name: str, key: str) -> Optional[BuildResult]:
+        binary = os.path.join(self.cache_dir, key + ".ex5")
+        if not os.path.exists(binary):
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, key + ".json"), "rb") as f:
+                meta = orjson.loads(f.read())
+        except (OSError, ValueError):
+            meta = {}
+        return BuildResult(name, key, binary, cached=True, warnings=meta.get("warnings", 0), log=meta.get("log", ""))
+
+    async def _compile(self, fleet, name: str, key: str, sources: List[BundleEntry]) -> BuildResult:
+        started = time.perf_counter()
+        result = BuildResult(name, key)
+        target = self.pick_builder(fleet.containers.values())
+        if target is None:
+            result.errors = ["No running instance to compile on"]
+            return result
+        docker_service = fleet.docker_service
+        cid = target["id"]
+        source_path = MQL5_DIR + name
+        binary_path = source_path[:-4] + ".ex5"
+        log_path = f"/tmp/mt5_build_{key[:16]}.log"
+
+        # The sources land in the builder's own MQL5 folder, so standard includes resolve
+        err = await executors.run("io", docker_service.upload_bundle, cid, sources)
+        if err:
+            result.errors = [f"Uploading sources to {target['name']}: {err}"]
+            return result
+        await executors.run("interactive", docker_service.exec_command, cid, ["rm", "-f", binary_path, log_path])
+        run = await executors.run("interactive", docker_service.exec_command, cid, [
+            "wine", self.metaeditor, f"/compile:{wine_path(source_path)}", f"/log:{wine_path(log_path)}",
+            f"/inc:{wine_path(MQL5_DIR.rstrip('/'))}"], self.user)
+        if "error" in run:
+            result.errors = [f"Running MetaEditor on {target['name']}: {run['error']}"]
+            return result
+        log = await executors.run("interactive", docker_service.download_file, cid, log_path)
+        result.log = decode_log(log["data"]) if "data" in log else log["error"]
+        result.errors, result.warnings = parse_log(result.log)
+        binary = await executors.run("interactive", docker_service.download_file, cid, binary_path)
+        result.seconds = time.perf_counter() - started
+        metrics.BUILD_SECONDS.observe(result.seconds)
+        if result.errors or "data" not in binary:
+            result.errors = result.errors or [f"No binary: {binary['error']}"]
+            metrics.BUILDS.labels("failed").inc()
+            print(f"Build of {name} failed on {target['name']}: {result.errors[0]}")
+            return result
+        result.binary = await executors.run("io", self._store, key, binary["data"], result)
+        metrics.BUILDS.labels("compiled").inc()
+        print(f"Compiled {name} on {target['name']} in {result.seconds:.1f}s")
+        return result
+
+    def _store(self, key: str, data: bytes, result: BuildResult) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        binary = os.path.join(self.cache_dir, key + ".ex5")
+        with open(os.path.join(self.cache_dir, key + ".json"), "wb") as f:
+            f.write(orjson.dumps({"source": result.source, "warnings": result.warnings, "log": result.log,
+                                  "built": time.time()}))
+        # Written under a temporary name first: a half-written binary must never look cached
+        with open(binary + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(binary + ".tmp", binary)
+        return binary
+
+
+builder = Builder(
+    os.environ.get("MT5_BUILD_CACHE", os.path.expanduser("~/.mt5_manager/builds")),
+    builder=os.environ.get("MT5_BUILDER"),
+    metaeditor=os.environ.get("MT5_METAEDITOR", METAEDITOR),
+    user=os.environ.get("MT5_BUILDER_USER", "abc"),
+)
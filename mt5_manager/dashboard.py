@@ -1,22 +1,46 @@
 from nicegui import ui, app
-from docker_service import DockerService
+from hosts import FleetDockerService, hosts_from_env
+from docker_service import BUNDLE_FOLDERS, bundle_entries, next_free_ports
 from mt5_api_service import mt5_api
+from fleet_state import FleetState, FleetUpdate
+from portfolio import PortfolioState
+from position_stream import PositionDiff, PositionStreams
+from snapshot_diff import SnapshotDiff
+from search import parse_query, matches
+import metrics
+from tracing import tracer
+from loop_monitor import loop_monitor
+from alerts import alert_engine, ui_sink
+from state_store import state_store
+from executors import executors
+from scheduler import scheduler
+from hibernation import hibernator, POLICY_LABEL, SESSIONS_LABEL, parse_sessions
+from supervisor import supervisor
+from builder import builder
+from snapshots import snapshot_store
 import asyncio
-from datetime import datetime
-
-# --- Configuration ---
-ui.dark_mode().enable()
+import os
+import shutil
+import tempfile
+import time
+import zipfile
 
 # --- Services ---
-docker_service = DockerService()
+docker_service = metrics.instrument(FleetDockerService(hosts_from_env()), metrics.DOCKER_CALL_SECONDS)
+# The host column, filter and picker only show when several Docker hosts are configured
+MULTI_HOST = len(docker_service.hosts) > 1
+metrics.instrument(mt5_api, metrics.MT5_API_CALL_SECONDS)
+tracer.instrument(docker_service, "docker")
+tracer.instrument(mt5_api, "mt5_api")
 
 # --- State ---
-containers = []
-is_loading = False
-docker_connected = docker_service.client is not None
+# Shared by every open tab: one Docker fetch per tick regardless of viewer count
+fleet = FleetState(docker_service, mt5_api, interval=10.0)
+portfolio = PortfolioState(fleet, mt5_api, interval=5.0)
+position_streams = PositionStreams(mt5_api)
 
 # --- Custom Styles ---
-ui.add_head_html('''
+CUSTOM_STYLES = '''
 <style>
     .glass-card {
         background: rgba(30, 41, 59, 0.6);
@@ -87,49 +111,229 @@ ui.add_head_html('''
         background: rgba(148, 163, 184, 0.6);
     }
 </style>
-''')
+'''
 
 # --- UI Functions ---
 
-async def refresh_containers():
-    """Fetches container list and updates the grid."""
-    global containers, is_loading, docker_connected
-    is_loading = True
+# Cards/rows rendered per page, so page load cost stays flat as the fleet grows
+PAGE_SIZES = {"cards": 24, "table": 50}
+# Cap on the staggered slide-in so later cards don't wait on earlier ones
+MAX_STAGGER = 8
+
+TABLE_COLUMNS = [
+    {"name": "name", "label": "Name", "field": "name", "align": "left", "sortable": True},
+    {"name": "status", "label": "Status", "field": "status", "align": "left", "sortable": True},
+    {"name": "host", "label": "Host", "field": "host", "align": "left", "sortable": True},
+    {"name": "vnc_port", "label": "VNC", "field": "vnc_port", "align": "left"},
+    {"name": "api_port", "label": "API", "field": "api_port", "align": "left"},
+    {"name": "cpu", "label": "CPU", "field": "cpu", "align": "right"},
+    {"name": "memory", "label": "Memory", "field": "memory", "align": "right"},
+    {"name": "uptime", "label": "Uptime", "field": "uptime", "align": "right"},
+    {"name": "limits", "label": "Limits", "field": "limits", "align": "left"},
+    {"name": "server", "label": "Server", "field": "server", "align": "left"},
+]
+
+def table_row(c):
+    """Compact-view row for a container record."""
+    has_stats = c.get('cpu_percent') is not None
+    return {
+        "id": c['id'],
+        "name": c['name'],
+        "status": c['status'],
+        "host": c['host'],
+        "address": c['address'],
+        "vnc_port": c['vnc_port'],
+        "api_port": c['api_port'],
+        "cpu": f"{c['cpu_percent']}%" if has_stats else "--",
+        "memory": f"{int(c.get('memory_mb') or 0)}MB" if has_stats else "--",
+        "uptime": c.get('uptime') or "--",
+        "limits": scheduler.describe(c),
+        "server": c.get('server') or "",
+    }
+
+class FleetView:
+    """Per-tab view of the shared fleet state, updated in place from FleetUpdates.
+    Only the current page is rendered, and only its containers are watched for stats."""
     
-    # Re-check Docker connection
-    docker_connected = docker_service.client is not None
+    def __init__(self, stats_container, content, last_updated_label, log_drawer, trading_drawer):
+        self.stats_container = stats_container
+        self.content = content
+        self.last_updated_label = last_updated_label
+        self.log_drawer = log_drawer
+        self.trading_drawer = trading_drawer
+        self.mode = "cards"
+        self.page = 1
+        self.query = ()
+        self.query_text = ""
+        self.host = None
+        self.shown = []
+        self.cards = {}
+        self.grid = None
+        self.table = None
+        self.pager = None
+        self.no_match = None
+        self.stat_labels = {}
     
-    if not docker_connected:
-        is_loading = False
-        container_grid.clear()
-        with container_grid:
-            create_docker_error_state()
-        update_stats()
-        return
+    @tracer.traced("dashboard.apply_update")
+    def apply(self, update):
+        """Applies a FleetUpdate, touching only the cards and fields that changed."""
+        if self.content.is_deleted:
+            # Client was pruned without a disconnect (e.g. the page never connected)
+            self.close()
+            return
+        self.update_stats()
+        if fleet.last_updated:
+            suffix = " (saved state, reconnecting...)" if fleet.restored else ""
+            self.last_updated_label.set_text(f"Last updated: {fleet.last_updated.strftime('%H:%M:%S')}{suffix}")
+        if not update:
+            return
+        
+        if update.connection_changed or self.pager is None or not fleet.containers:
+            self.render()
+            return
+        
+        for cid, changed in update.changed.items():
+            card = self.cards.get(cid)
+            if card:
+                card.update(fleet.containers[cid], changed)
+        self.show_page(update.changed)
     
-    try:
-        containers = await asyncio.to_thread(docker_service.list_mt5_containers)
-    except Exception as e:
-        ui.notify(f"Error fetching containers: {e}", type='negative', position='top')
-        containers = []
-        docker_connected = False
-    finally:
-        is_loading = False
+    @tracer.traced("dashboard.render")
+    def render(self):
+        """Rebuilds the view (first load, connection change, view mode change)."""
+        self.content.clear()
+        self.cards = {}
+        self.shown = []
+        self.grid = self.table = self.pager = self.no_match = None
+        
+        with self.content:
+            if not fleet.docker_connected:
+                create_docker_error_state()
+            elif fleet.last_updated is None:
+                create_loading_state()
+            elif not fleet.containers:
+                create_empty_state()
+            else:
+                with ui.column().classes("w-full items-center py-10") as self.no_match:
+                    ui.icon("search_off").classes("text-slate-500 text-4xl mb-2")
+                    self.no_match_label = ui.label(f"No instances matching '{self.query_text}'").classes("text-slate-400")
+                
+                if self.mode == "table":
+                    columns = TABLE_COLUMNS if MULTI_HOST else [col for col in TABLE_COLUMNS if col["name"] != "host"]
+                    self.table = ui.table(columns=columns, rows=[], row_key="id").props("dense flat dark").classes("glass-card w-full")
+                    self.table.on("rowClick", self.open_row)
+                else:
+                    self.grid = ui.grid(columns=1).classes("w-full gap-5 sm:grid-cols-2 xl:grid-cols-3")
+                
+                with ui.row().classes("w-full justify-center"):
+                    self.pager = ui.pagination(1, 1, direction_links=True, value=self.page, on_change=lambda e: self.set_page(e.value)).props("dark color=cyan")
+        
+        if self.pager is None:
+            fleet.unwatch(self)
+            return
+        self.show_page()
     
-    # Update stats
-    update_stats()
+    @tracer.traced("dashboard.show_page")
+    def show_page(self, changed=()):
+        """Shows the current page of matching containers, reusing cards that stay on it."""
+        ids = [cid for cid, c in fleet.containers.items()
+               if matches(c, self.query) and (self.host is None or c['host'] == self.host)]
+        size = PAGE_SIZES[self.mode]
+        pages = max(1, -(-len(ids) // size))
+        self.page = min(self.page, pages)
+        if self.pager.max != pages:
+            self.pager.max = pages
+        if self.pager.value != self.page:
+            self.pager.value = self.page
+        if self.pager.visible != (pages > 1):
+            self.pager.set_visibility(pages > 1)
+        if self.no_match.visible != (not ids):
+            self.no_match.set_visibility(not ids)
+        
+        page_ids = ids[(self.page - 1) * size:self.page * size]
+        if self.table is not None:
+            if page_ids != self.shown or any(cid in changed for cid in page_ids):
+                self.table.rows = [table_row(fleet.containers[cid]) for cid in page_ids]
+        elif page_ids != self.shown:
+            self.place_cards(page_ids)
+        self.shown = page_ids
+        fleet.watch(self, page_ids)
     
-    # Update grid
-    container_grid.clear()
+    def place_cards(self, page_ids):
+        for cid in [cid for cid in self.cards if cid not in page_ids]:
+            self.cards.pop(cid).delete()
+        with self.grid:
+            for i, cid in enumerate(page_ids):
+                if cid not in self.cards:
+                    self.cards[cid] = ContainerCard(self, fleet.containers[cid], i)
+        
+        order = [self.cards[cid].card for cid in page_ids]
+        if self.grid.default_slot.children != order:
+            for i, card in enumerate(order):
+                card.move(self.grid, target_index=i)
     
-    if not containers:
-        with container_grid:
-            create_empty_state()
-        return
-
-    with container_grid:
-        for i, c in enumerate(containers):
-            create_container_card(c, i)
+    def close(self):
+        fleet.unsubscribe(self.apply)
+        fleet.unwatch(self)
+    
+    def set_page(self, page):
+        if page != self.page and self.pager is not None:
+            self.page = page
+            self.show_page()
+    
+    def set_mode(self, mode):
+        """Switches between the card grid and the compact table."""
+        if mode != self.mode:
+            self.mode = mode
+            self.page = 1
+            self.render()
+    
+    def filter(self, text):
+        """Filters instances by a search query (see search.py). No Docker calls are made."""
+        query = parse_query(text or "")
+        if query == self.query:
+            return
+        self.query = query
+        self.query_text = (text or "").strip()
+        self.page = 1
+        if self.pager is not None:
+            self.no_match_label.set_text(f"No instances matching '{self.query_text}'")
+            self.show_page()
+    
+    def set_host(self, host):
+        """Shows only the instances on one Docker host (None: all hosts)."""
+        if host != self.host:
+            self.host = host
+            self.page = 1
+            if self.pager is not None:
+                self.show_page()
+    
+    async def open_row(self, e):
+        """Table row click opens the trading drawer (or logs when the API port is unmapped)."""
+        row = e.args[1]
+        if row['api_port'] != "N/A":
+            await open_trading(self.trading_drawer, row['id'], row['name'], row['api_port'], row['address'])
+        else:
+            await open_logs(self.log_drawer, row['id'], row['name'])
+    
+    def update_stats(self):
+        """Update statistics cards."""
+        total = len(fleet.containers)
+        running = len(fleet.running())
+        values = {"total": total, "running": running, "stopped": total - running}
+        
+        if not self.stat_labels:
+            self.stats_container.clear()
+            with self.stats_container:
+                with ui.row().classes("w-full gap-4"):
+                    self.stat_labels["total"] = create_stat_card("Total Instances", total, "deployed_code", "blue")
+                    self.stat_labels["running"] = create_stat_card("Running", running, "play_circle", "green")
+                    self.stat_labels["stopped"] = create_stat_card("Stopped", total - running, "stop_circle", "red")
+                    create_stat_card("Uptime", "99.9%", "trending_up", "cyan")
+            return
+        
+        for key, value in values.items():
+            self.stat_labels[key].set_text(str(value))
 
 def create_docker_error_state():
     """Creates an error state UI when Docker is not connected."""
@@ -145,24 +349,16 @@ def create_docker_error_state():
                 ui.label("• Verify Docker socket is accessible")
                 ui.label("• Restart the MT5 Manager container")
         
-        ui.button("Retry Connection", icon="refresh", on_click=refresh_containers).props("color=blue size=lg")
+        ui.button("Retry Connection", icon="refresh", on_click=fleet.refresh).props("color=blue size=lg")
 
-def update_stats():
-    """Update statistics cards."""
-    stats_container.clear()
-    
-    running = sum(1 for c in containers if "running" in c['status'].lower())
-    stopped = len(containers) - running
-    
-    with stats_container:
-        with ui.row().classes("w-full gap-4"):
-            create_stat_card("Total Instances", len(containers), "deployed_code", "blue")
-            create_stat_card("Running", running, "play_circle", "green")
-            create_stat_card("Stopped", stopped, "stop_circle", "red")
-            create_stat_card("Uptime", "99.9%", "trending_up", "cyan")
+def create_loading_state():
+    """Shown until the first fleet refresh completes."""
+    with ui.column().classes("w-full items-center justify-center py-20 col-span-full"):
+        ui.spinner(size="xl").classes("text-cyan-400 mb-4")
+        ui.label("Loading instances...").classes("text-slate-400")
 
 def create_stat_card(title, value, icon, color):
-    """Creates a statistics card."""
+    """Creates a statistics card. Returns the value label."""
     color_classes = {
         "blue": "from-blue-500/20 to-blue-600/10 border-blue-500/30",
         "green": "from-green-500/20 to-green-600/10 border-green-500/30",
@@ -181,8 +377,9 @@ def create_stat_card(title, value, icon, color):
         with ui.row().classes("w-full items-center justify-between"):
             with ui.column().classes("gap-1"):
                 ui.label(title).classes("text-sm text-slate-400 font-medium")
-                ui.label(str(value)).classes(f"text-3xl font-bold {icon_colors[color]}")
+                value_label = ui.label(str(value)).classes(f"text-3xl font-bold {icon_colors[color]}")
             ui.icon(icon).classes(f"{icon_colors[color]} text-4xl opacity-50")
+    return value_label
 
 def create_empty_state():
     """Creates an empty state UI."""
@@ -192,23 +389,75 @@ def create_empty_state():
         ui.label("Get started by creating your first trading instance").classes("text-slate-500 mb-6")
         ui.button("Create Instance", icon="add", on_click=create_instance_dialog).props("color=green size=lg")
 
-def create_container_card(c, index):
-    """Creates an enhanced card for a single container."""
-    is_running = "running" in c['status'].lower()
+# Fields whose change alters the card layout (badge, links, buttons) rather than just a stat value
+CARD_LAYOUT_FIELDS = {"name", "status", "vnc_port", "api_port", "cpu_limit", "cpuset", "memory_limit_mb", "restart_count"}
+
+class ContainerCard:
+    """Card for a single container. Stat changes update labels in place; layout changes rebuild the card."""
     
-    # Status configuration
-    if is_running:
-        status_color = "text-green-400"
-        status_bg = "bg-green-500/20"
-        status_border = "border-green-500/30"
-        status_text = "Running"
-    else:
-        status_color = "text-red-400"
-        status_bg = "bg-red-500/20"
-        status_border = "border-red-500/30"
-        status_text = "Stopped"
+    def __init__(self, view, c, index):
+        self.view = view
+        with ui.card().classes(f"glass-card card-hover animate-slide-in w-full").style(f"animation-delay: {min(index, MAX_STAGGER) * 0.05}s") as self.card:
+            self.build(c)
+    
+    def update(self, c, changed):
+        if CARD_LAYOUT_FIELDS & changed.keys():
+            self.card.clear()
+            with self.card:
+                self.build(c)
+        else:
+            self.set_stats(c)
     
-    with ui.card().classes(f"glass-card card-hover animate-slide-in w-full").style(f"animation-delay: {index * 0.05}s"):
+    def delete(self):
+        self.card.delete()
+    
+    def set_stats(self, c):
+        if "running" not in c['status'].lower():
+            self.cpu_label.set_text("0.0%")
+            self.mem_label.set_text("0MB")
+            self.uptime_label.set_text("Stopped")
+        elif c.get('cpu_percent') is not None:
+            self.cpu_label.set_text(f"{c['cpu_percent']}%")
+            self.mem_label.set_text(f"{int(c.get('memory_mb') or 0)}MB")
+            self.uptime_label.set_text(c.get('uptime') or 'N/A')
+    
+    def build(self, c):
+        is_running = "running" in c['status'].lower()
+        recovery = supervisor.state(c['id'])
+        view = self.view
+        
+        # Status configuration
+        if is_running:
+            status_color = "text-green-400"
+            status_bg = "bg-green-500/20"
+            status_border = "border-green-500/30"
+            status_text = "Running"
+        elif hibernator.is_sleeping(c['id']):
+            status_color = "text-indigo-300"
+            status_bg = "bg-indigo-500/20"
+            status_border = "border-indigo-500/30"
+            status_text = "Hibernating"
+        elif recovery is not None and recovery.state in ("crash-loop", "gave-up"):
+            status_color = "text-rose-400"
+            status_bg = "bg-rose-500/20"
+            status_border = "border-rose-500/30"
+            status_text = "Crash Loop" if recovery.state == "crash-loop" else "Failed"
+        elif recovery is not None and recovery.state == "backoff":
+            status_color = "text-orange-400"
+            status_bg = "bg-orange-500/20"
+            status_border = "border-orange-500/30"
+            status_text = "Restarting"
+        elif "paused" in c['status'].lower():
+            status_color = "text-amber-400"
+            status_bg = "bg-amber-500/20"
+            status_border = "border-amber-500/30"
+            status_text = "Paused"
+        else:
+            status_color = "text-red-400"
+            status_bg = "bg-red-500/20"
+            status_border = "border-red-500/30"
+            status_text = "Stopped"
+        
         # Header with gradient
         with ui.row().classes("w-full items-center justify-between mb-3"):
             with ui.row().classes("items-center gap-3"):
@@ -216,7 +465,7 @@ def create_container_card(c, index):
                 ui.icon("dns").classes("text-slate-300 text-2xl bg-slate-700/50 p-2 rounded-lg")
                 with ui.column().classes("gap-0"):
                     ui.label(c['name']).classes("text-lg font-bold text-slate-100")
-                    ui.label(f"ID: {c['id'][:12]}").classes("text-xs text-slate-500 font-mono")
+                    ui.label(f"ID: {c['id'][:12]}" + (f" · {c['host']}" if MULTI_HOST else "")).classes("text-xs text-slate-500 font-mono")
             
             # Status badge
             with ui.row().classes(f"{status_bg} {status_border} border rounded-full px-3 py-1 items-center gap-2"):
@@ -233,7 +482,7 @@ def create_container_card(c, index):
                     ui.icon("monitor").classes("text-blue-400 text-sm")
                     ui.label("VNC Port").classes("text-xs text-slate-400 font-medium uppercase tracking-wide")
                 if c['vnc_port'] != "N/A":
-                    ui.link(c['vnc_port'], f"http://localhost:{c['vnc_port']}", new_tab=True).classes("text-blue-400 hover:text-blue-300 font-mono text-sm font-semibold transition-colors")
+                    ui.link(c['vnc_port'], f"http://{c['address']}:{c['vnc_port']}", new_tab=True).classes("text-blue-400 hover:text-blue-300 font-mono text-sm font-semibold transition-colors")
                 else:
                     ui.label("Not Available").classes("text-slate-600 text-sm")
             
@@ -244,32 +493,23 @@ def create_container_card(c, index):
                     ui.label("API Port").classes("text-xs text-slate-400 font-medium uppercase tracking-wide")
                 ui.label(c['api_port']).classes("text-purple-400 font-mono text-sm font-semibold")
 
-        # Quick Stats - Will be updated asynchronously
-        with ui.row().classes("w-full gap-2 mb-4") as stats_row:
+        # Quick Stats - filled from the shared fleet state
+        with ui.row().classes("w-full gap-2 mb-4"):
             with ui.card().classes("bg-slate-700/30 flex-1 p-2 border border-slate-600/30"):
                 ui.label("CPU").classes("text-xs text-slate-400")
-                cpu_label = ui.label("--").classes("text-sm text-cyan-400 font-semibold")
+                self.cpu_label = ui.label("--").classes("text-sm text-cyan-400 font-semibold")
             
             with ui.card().classes("bg-slate-700/30 flex-1 p-2 border border-slate-600/30"):
                 ui.label("Memory").classes("text-xs text-slate-400")
-                mem_label = ui.label("--").classes("text-sm text-green-400 font-semibold")
+                self.mem_label = ui.label("--").classes("text-sm text-green-400 font-semibold")
             
             with ui.card().classes("bg-slate-700/30 flex-1 p-2 border border-slate-600/30"):
                 ui.label("Uptime").classes("text-xs text-slate-400")
-                uptime_label = ui.label("--").classes("text-sm text-blue-400 font-semibold")
-        
-        # Async stats loader
-        async def load_stats():
-            try:
-                stats = await asyncio.to_thread(docker_service.get_container_stats, c['id'])
-                cpu_label.set_text(f"{stats.get('cpu_percent', 0)}%")
-                mem_label.set_text(f"{int(stats.get('memory_mb', 0))}MB")
-                uptime_label.set_text(stats.get('uptime', 'N/A'))
-            except:
-                pass
-        
-        # Trigger async load after render
-        ui.timer(0.1, load_stats, once=True)
+                self.uptime_label = ui.label("--").classes("text-sm text-blue-400 font-semibold")
+        self.set_stats(c)
+        with ui.row().classes("items-center gap-1 -mt-2 mb-2"):
+            ui.icon("tune").classes("text-slate-500 text-xs")
+            ui.label(scheduler.describe(c)).classes("text-xs text-slate-500 font-mono")
 
         ui.separator().classes("bg-slate-700/50 my-3")
 
@@ -277,16 +517,21 @@ def create_container_card(c, index):
         with ui.row().classes("w-full justify-between items-center"):
             # Left actions
             with ui.row().classes("gap-1"):
-                ui.button(icon="description", on_click=lambda cid=c['id'], name=c['name']: open_logs(cid, name)).props("round flat size=sm").classes("text-slate-400 hover:text-blue-400 hover:bg-blue-500/10 transition-all").tooltip("View Logs")
+                ui.button(icon="description", on_click=lambda cid=c['id'], name=c['name']: open_logs(view.log_drawer, cid, name)).props("round flat size=sm").classes("text-slate-400 hover:text-blue-400 hover:bg-blue-500/10 transition-all").tooltip("View Logs")
                 
                 # Trading button - opens trading drawer
                 if c['api_port'] != "N/A":
-                    ui.button(icon="candlestick_chart", on_click=lambda cid=c['id'], name=c['name'], port=c['api_port']: open_trading(cid, name, port)).props("round flat size=sm").classes("text-slate-400 hover:text-yellow-400 hover:bg-yellow-500/10 transition-all").tooltip("Trading Info")
+                    ui.button(icon="candlestick_chart", on_click=lambda cid=c['id'], name=c['name'], port=c['api_port'], address=c['address']: open_trading(view.trading_drawer, cid, name, port, address)).props("round flat size=sm").classes("text-slate-400 hover:text-yellow-400 hover:bg-yellow-500/10 transition-all").tooltip("Trading Info")
                 
                 if c['vnc_port'] != "N/A":
-                    ui.button(icon="monitor", on_click=lambda p=c['vnc_port']: ui.open(f"http://localhost:{p}", new_tab=True)).props("round flat size=sm").classes("text-slate-400 hover:text-green-400 hover:bg-green-500/10 transition-all").tooltip("Open VNC")
+                    ui.button(icon="monitor", on_click=lambda p=c['vnc_port'], address=c['address']: ui.open(f"http://{address}:{p}", new_tab=True)).props("round flat size=sm").classes("text-slate-400 hover:text-green-400 hover:bg-green-500/10 transition-all").tooltip("Open VNC")
                 
                 ui.button(icon="restart_alt", on_click=lambda cid=c['id']: restart_instance(cid)).props("round flat size=sm").classes("text-slate-400 hover:text-yellow-400 hover:bg-yellow-500/10 transition-all").tooltip("Restart")
+                
+                ui.button(icon="photo_camera", on_click=lambda cid=c['id']: snapshot_instance(cid)).props("round flat size=sm").classes("text-slate-400 hover:text-cyan-400 hover:bg-cyan-500/10 transition-all").tooltip("Snapshot Config")
+                
+                if recovery is not None:
+                    ui.button(icon="report", on_click=lambda cid=c['id']: failure_dialog(cid)).props("round flat size=sm").classes("text-rose-400 hover:bg-rose-500/10 transition-all").tooltip("Failure Details")
             
             # Right actions
             with ui.row().classes("gap-1"):
@@ -299,7 +544,8 @@ def create_container_card(c, index):
 
 # --- Actions ---
 
-async def create_instance_dialog():
+async def create_instance_dialog(snapshot_id=None):
+    snapshots = await executors.run("io", snapshot_store.list)
     with ui.dialog() as dialog, ui.card().classes("glass-card min-w-[500px] p-6"):
         # Header
         with ui.row().classes("w-full items-center gap-3 mb-6"):
@@ -310,9 +556,21 @@ async def create_instance_dialog():
         
         # Form
         name_input = ui.input("Account Name").props("outlined dark").classes("w-full mb-4").style("color: white")
+        host_select = None
+        if MULTI_HOST:
+            host_select = ui.select({"": "Least loaded host"} | {name: name for name in docker_service.hosts},
+                                    value="", label="Docker Host").props("outlined dark").classes("w-full mb-4")
+        snapshot_select = ui.select({"": "Fresh install"} | {s["id"]: f"Clone of {s['id']} · {s['bytes'] / 2**20:.0f} MB" for s in snapshots},
+                                    value=snapshot_id or "", label="Start From").props("outlined dark").classes("w-full mb-4")
         
         with ui.expansion("Advanced Settings", icon="settings").classes("w-full mb-4 bg-slate-700/30 rounded-lg").props("dark"):
-            ui.label("Coming soon: Custom port mapping, resource limits, etc.").classes("text-slate-400 text-sm p-4")
+            profile_select = ui.select(
+                {p.name: f"{p.name.capitalize()} · {p.cpus:g} CPU · {p.memory_mb} MB" for p in scheduler.profiles.values()},
+                value=scheduler.default, label="Resource Profile").props("outlined dark").classes("w-full p-4")
+            sessions_input = ui.input("Trading Sessions", placeholder="mon-fri 07:00-21:00").props("outlined dark").classes("w-full px-4")
+            hibernate_select = ui.select({"": "Default", "sessions": "Sleep outside sessions when idle",
+                                          "idle": "Sleep whenever idle", "off": "Never sleep"},
+                                         value="", label="Hibernation").props("outlined dark").classes("w-full p-4")
         
         async def create():
             name = name_input.value.strip()
@@ -320,20 +578,45 @@ async def create_instance_dialog():
                 ui.notify("Please enter an instance name", type='warning', position='top')
                 return
             
+            labels = {}
+            if sessions_input.value.strip():
+                try:
+                    parse_sessions(sessions_input.value)
+                except (ValueError, IndexError):
+                    ui.notify("Trading sessions look like: mon-fri 07:00-21:00; sat 08:00-12:00", type='warning', position='top')
+                    return
+                labels[SESSIONS_LABEL] = sessions_input.value.strip()
+            if hibernate_select.value:
+                labels[POLICY_LABEL] = hibernate_select.value
+            
             dialog.close()
-            ui.notify(f"Creating instance '{name}'...", type='info', position='top', spinner=True, timeout=0, close_button=True)
+            snapshot = snapshot_select.value
+            ui.notify(f"Cloning '{snapshot}' into '{name}'..." if snapshot else f"Creating instance '{name}'...", type='info', position='top', spinner=True, timeout=0, close_button=True)
             
             try:
-                vnc, api = await asyncio.to_thread(docker_service.get_next_available_ports)
-                err = await asyncio.to_thread(docker_service.create_mt5_container, name, vnc, api)
+                profile = profile_select.value
+                host = (host_select.value if host_select else "") or await executors.run("interactive", docker_service.pick_host, profile)
+                if host is None:
+                    raise RuntimeError(f"No reachable Docker host has room for a {profile} instance")
+                # Ports only need to be free on the host the instance goes to
+                containers = [c for c in await executors.run("interactive", docker_service.list_mt5_containers) if c['host'] == host]
+                vnc, api = await executors.run("interactive", state_store.reserve_ports, name,
+                                                   lambda reserved: next_free_ports(containers, reserved=reserved))
+                try:
+                    if snapshot:
+                        err = await snapshot_store.clone(docker_service, snapshot, name, vnc, api, host, profile, labels)
+                    else:
+                        err = await executors.run("interactive", docker_service.create_mt5_container, name, vnc, api, "trading", host, profile, labels)
+                finally:
+                    await executors.run("interactive", state_store.release_ports, name)
                 
                 ui.notify(None)  # Clear spinner
                 
                 if err:
                     ui.notify(f"Failed to create instance: {err}", type='negative', position='top', timeout=5000)
                 else:
-                    ui.notify(f"Instance '{name}' created successfully!", type='positive', position='top', timeout=3000)
-                    await refresh_containers()
+                    ui.notify(f"Instance '{name}' created on {host}!" if MULTI_HOST else f"Instance '{name}' created successfully!", type='positive', position='top', timeout=3000)
+                    await fleet.refresh()
             except Exception as e:
                 ui.notify(None)  # Clear spinner
                 ui.notify(f"Error: {str(e)}", type='negative', position='top', timeout=5000)
@@ -344,6 +627,147 @@ async def create_instance_dialog():
     
     dialog.open()
 
+async def rebalance_dialog():
+    """Shows the scheduler's proposed limit changes; only the ones the operator keeps are applied."""
+    with ui.dialog() as dialog, ui.card().classes("glass-card border-2 border-cyan-500/30 min-w-[640px] p-6"):
+        with ui.row().classes("w-full items-center gap-3 mb-4"):
+            ui.icon("balance").classes("text-cyan-400 text-3xl")
+            ui.label("Rebalance Resources").classes("text-2xl font-bold text-slate-100")
+        ui.separator().classes("bg-slate-700/50 mb-4")
+        body = ui.column().classes("w-full gap-2")
+        with body:
+            with ui.row().classes("w-full justify-center py-6"):
+                ui.spinner(size="lg", color="cyan")
+        actions = ui.row().classes("w-full justify-end gap-2 mt-4")
+    dialog.open()
+    
+    proposals = await executors.run("interactive", docker_service.plan_rebalance)
+    selected = {p["container_id"]: True for p in proposals}
+    body.clear()
+    with body:
+        if not proposals:
+            ui.label("No hot spots: every instance has limits and fits its cores.").classes("text-slate-400")
+        for p in proposals:
+            with ui.card().classes("bg-slate-700/30 border border-slate-600/30 w-full p-3"):
+                with ui.row().classes("w-full items-center gap-3 no-wrap"):
+                    ui.checkbox(value=True, on_change=lambda e, cid=p["container_id"]: selected.update({cid: e.value}))
+                    with ui.column().classes("gap-0 flex-1"):
+                        ui.label(p["name"] + (f" · {p['host']}" if MULTI_HOST else "")).classes("text-white font-mono font-semibold")
+                        ui.label(p["reason"]).classes("text-xs text-amber-400")
+                        ui.label(f"{p['current']}  →  {p['proposed']}").classes("text-xs text-slate-400 font-mono")
+    
+    async def apply():
+        dialog.close()
+        chosen = [p for p in proposals if selected[p["container_id"]]]
+        ui.notify(f"Applying {len(chosen)} limit changes...", type='info', position='top', spinner=True, timeout=0)
+        errors = await asyncio.gather(*(executors.run("interactive", docker_service.update_container_limits, p["container_id"], p["limits"])
+                                        for p in chosen))
+        ui.notify(None)
+        failed = [f"{p['name']}: {err}" for p, err in zip(chosen, errors) if err]
+        if failed:
+            ui.notify("Some changes failed: " + "; ".join(failed), type='negative', position='top', timeout=8000, multi_line=True)
+        else:
+            ui.notify(f"Applied {len(chosen)} limit changes", type='positive', position='top', timeout=3000)
+        await fleet.refresh()
+    
+    with actions:
+        ui.button("Cancel", icon="close", on_click=dialog.close).props("flat").classes("text-slate-400")
+        if proposals:
+            ui.button("Apply Selected", icon="done_all", on_click=apply).props("color=cyan")
+
+def failure_dialog(container_id):
+    """Shows why the supervisor is recovering an instance and the Journal tail captured at the failure."""
+    entry = supervisor.instances.get(container_id)
+    if entry is None:
+        return
+    with ui.dialog() as dialog, ui.card().classes("glass-card border-2 border-rose-500/30 min-w-[720px] p-6"):
+        with ui.row().classes("w-full items-center gap-3 mb-4"):
+            ui.icon("report").classes("text-rose-400 text-3xl")
+            with ui.column().classes("gap-0"):
+                ui.label(entry.name).classes("text-2xl font-bold text-slate-100")
+                ui.label(entry.error).classes("text-sm text-rose-300")
+        ui.separator().classes("bg-slate-700/50 mb-4")
+        if entry.retry_at is not None:
+            plan = f"Next restart in {max(0, entry.retry_at - time.time()):.0f}s"
+        elif entry.state == "gave-up":
+            plan = "Gave up; start the instance to try again"
+        else:
+            plan = "Waiting for the MT5 API to answer"
+        ui.label(f"{len(entry.failures)} failures in the last {supervisor.failure_window / 60:.0f} min · "
+                 f"{entry.attempts} supervised restarts · {plan}").classes("text-sm text-slate-400 mb-2")
+        ui.label("Journal at the failure").classes("text-xs text-slate-400 font-medium uppercase tracking-wide")
+        ui.code(entry.journal or "Not captured yet", language='text').classes('w-full max-h-[50vh] overflow-auto bg-slate-950/50 p-4 rounded text-xs font-mono text-slate-300')
+        with ui.row().classes("w-full justify-end mt-4"):
+            ui.button("Close", icon="close", on_click=dialog.close).props("flat").classes("text-slate-400")
+    dialog.open()
+
+async def snapshot_instance(container_id):
+    record = fleet.containers.get(container_id)
+    if record is None:
+        return
+    ui.notify(f"Snapshotting {record['name']}...", type='info', position='top', spinner=True, timeout=0)
+    result = await snapshot_store.take(docker_service, record)
+    ui.notify(None)
+    if "error" in result:
+        ui.notify(f"Snapshot failed: {result['error']}", type='negative', position='top', timeout=5000)
+    else:
+        ui.notify(f"Snapshot {result['id']}: {result['files']} files, {result['bytes'] / 2**20:.1f} MB "
+                  f"({result['new_bytes'] / 2**20:.1f} MB new)", type='positive', position='top', timeout=4000)
+
+async def snapshots_dialog():
+    with ui.dialog() as dialog, ui.card().classes("glass-card min-w-[760px] p-6"):
+        with ui.row().classes("w-full items-center gap-3 mb-2"):
+            ui.icon("inventory_2").classes("text-cyan-400 text-3xl")
+            ui.label("Config Snapshots").classes("text-2xl font-bold text-slate-100")
+        usage_label = ui.label("").classes("text-slate-400 mb-2")
+        ui.separator().classes("bg-slate-700/50 mb-2")
+        rows = ui.column().classes("w-full gap-1")
+
+        async def clone(snapshot_id):
+            dialog.close()
+            await create_instance_dialog(snapshot_id)
+
+        async def delete(snapshot_id):
+            freed = await executors.run("io", snapshot_store.delete, snapshot_id)
+            ui.notify(f"Deleted {snapshot_id}, freed {freed / 2**20:.1f} MB", type='info', position='top', timeout=3000)
+            await render()
+
+        async def render():
+            snapshots = await executors.run("io", snapshot_store.list)
+            usage = await executors.run("io", snapshot_store.usage)
+            usage_label.set_text(f"{usage['snapshots']} snapshots · {usage['logical'] / 2**20:.0f} MB of files, "
+                                 f"{usage['stored'] / 2**20:.0f} MB stored after deduplication")
+            rows.clear()
+            with rows:
+                if not snapshots:
+                    ui.label("No snapshots yet. Snapshot an instance to clone it.").classes("text-slate-500 p-2")
+                for s in snapshots:
+                    with ui.row().classes("w-full items-center gap-3 px-2 py-1 bg-slate-700/20 rounded"):
+                        ui.label(s["id"]).classes("font-mono text-sm text-slate-200 flex-1")
+                        ui.label(time.strftime("%Y-%m-%d %H:%M", time.localtime(s["created"]))).classes("text-xs text-slate-400")
+                        ui.label(f"{s['files']} files · {s['bytes'] / 2**20:.1f} MB").classes("text-xs text-slate-400 w-36")
+                        ui.button(icon="content_copy", on_click=lambda sid=s["id"]: clone(sid)).props("round flat size=sm").classes("text-slate-400 hover:text-green-400").tooltip("Clone into a new instance")
+                        ui.button(icon="delete", on_click=lambda sid=s["id"]: delete(sid)).props("round flat size=sm").classes("text-slate-400 hover:text-red-400").tooltip("Delete")
+
+        async def snapshot_all():
+            records = list(fleet.containers.values())
+            ui.notify(f"Snapshotting {len(records)} instances...", type='info', position='top', spinner=True, timeout=0)
+            results = await snapshot_store.take_many(docker_service, records)
+            ui.notify(None)
+            failed = [f"{r['name']}: {result['error']}" for r, result in zip(records, results) if "error" in result]
+            if failed:
+                ui.notify(f"Snapshotted {len(records) - len(failed)}/{len(records)} instances. " + "; ".join(failed[:3]), type='warning', position='top', timeout=8000, multi_line=True)
+            else:
+                ui.notify(f"Snapshotted {len(records)} instances", type='positive', position='top', timeout=3000)
+            await render()
+
+        with ui.row().classes("w-full justify-end gap-2 mt-4"):
+            ui.button("Close", icon="close", on_click=dialog.close).props("flat").classes("text-slate-400")
+            ui.button("Snapshot All", icon="photo_library", on_click=snapshot_all).props("color=cyan")
+    
+    dialog.open()
+    await render()
+
 async def delete_instance(container_id, container_name):
     with ui.dialog() as dialog, ui.card().classes("glass-card border-2 border-red-500/30 min-w-[450px] p-6"):
         # Warning Icon
@@ -363,14 +787,14 @@ async def delete_instance(container_id, container_name):
             dialog.close()
             ui.notify(f"Deleting {container_name}...", type='info', position='top', spinner=True, timeout=0)
             
-            err = await asyncio.to_thread(docker_service.remove_container, container_id)
+            err = await executors.run("interactive", docker_service.remove_container, container_id)
             ui.notify(None)  # Clear spinner
             
             if err:
                 ui.notify(f"Error: {err}", type='negative', position='top', timeout=5000)
             else:
                 ui.notify(f"Instance deleted successfully", type='positive', position='top', timeout=3000)
-                await refresh_containers()
+                await fleet.refresh()
         
         with ui.row().classes("w-full justify-center gap-3"):
             ui.button("Cancel", icon="close", on_click=dialog.close).props("size=lg flat").classes("text-slate-400")
@@ -380,37 +804,65 @@ async def delete_instance(container_id, container_name):
 
 async def stop_instance(container_id):
     ui.notify("Stopping instance...", type='info', position='top', spinner=True, timeout=0)
-    err = await asyncio.to_thread(docker_service.stop_container, container_id)
+    err = await executors.run("interactive", docker_service.stop_container, container_id)
     ui.notify(None)
     if err:
         ui.notify(f"Error: {err}", type='negative', position='top', timeout=5000)
     else:
         ui.notify("Instance stopped", type='positive', position='top', timeout=3000)
-    await refresh_containers()
+    await fleet.refresh()
 
 async def start_instance(container_id):
+    if hibernator.is_sleeping(container_id):
+        # Waking waits for the MT5 login, which can take a while after a stop
+        hibernator.wake(container_id)
+        ui.notify("Waking instance; it will be back once MT5 has logged in", type='info', position='top', timeout=4000)
+        return
     ui.notify("Starting instance...", type='info', position='top', spinner=True, timeout=0)
-    err = await asyncio.to_thread(docker_service.start_container, container_id)
+    record = fleet.containers.get(container_id)
+    action = docker_service.unpause_container if record and "paused" in record['status'].lower() else docker_service.start_container
+    err = await executors.run("interactive", action, container_id)
     ui.notify(None)
     if err:
         ui.notify(f"Error: {err}", type='negative', position='top', timeout=5000)
     else:
         ui.notify("Instance started", type='positive', position='top', timeout=3000)
-    await refresh_containers()
+    await fleet.refresh()
 
 async def restart_instance(container_id):
     ui.notify("Restarting instance...", type='info', position='top', spinner=True, timeout=0)
-    err = await asyncio.to_thread(docker_service.restart_container, container_id)
+    err = await executors.run("interactive", docker_service.restart_container, container_id)
     ui.notify(None)
     if err:
         ui.notify(f"Error: {err}", type='negative', position='top', timeout=5000)
     else:
         ui.notify("Instance restarted", type='positive', position='top', timeout=3000)
-    await refresh_containers()
+    await fleet.refresh()
 
-async def open_logs(container_id, container_name):
+def show_drawer(drawer):
+    """Opens a drawer through its model value, so the open state is known server-side immediately."""
+    set_drawer(drawer, True)
+
+def hide_drawer(drawer):
+    set_drawer(drawer, False)
+
+def set_drawer(drawer, value):
+    """Sets a drawer's model value on both sides: the browser only closes it once the prop changes."""
+    drawer.props["model-value"] = value
+    drawer.update()
+    if not value:
+        release_drawer(drawer)
+
+def release_drawer(drawer):
+    """Stops what the drawer's content was showing live (it closed, or is reused)."""
+    for handler in drawer.close_handlers:
+        handler()
+    drawer.close_handlers.clear()
+
+async def open_logs(log_drawer, container_id, container_name):
+    release_drawer(log_drawer)
     log_drawer.clear()
-    log_drawer.open()
+    show_drawer(log_drawer)
     
     with log_drawer:
         # Header
@@ -420,7 +872,7 @@ async def open_logs(container_id, container_name):
                 with ui.column().classes("gap-0"):
                     ui.label("Container Logs").classes("text-xl font-bold text-slate-100")
                     ui.label(container_name).classes("text-sm text-slate-400")
-            ui.button(icon="close", on_click=log_drawer.close).props("flat round").classes("text-slate-400")
+            ui.button(icon="close", on_click=lambda: hide_drawer(log_drawer)).props("flat round").classes("text-slate-400")
         
         ui.separator().classes("bg-slate-700 mb-4")
         
@@ -430,7 +882,7 @@ async def open_logs(container_id, container_name):
             file_select = ui.select([], label="Select File").props("outlined dense dark").classes("flex-1")
             
             async def refresh_files():
-                files = await asyncio.to_thread(docker_service.get_log_list, container_id, log_type.value.lower())
+                files = await executors.run("interactive", docker_service.get_log_list, container_id, log_type.value.lower())
                 file_select.options = files
                 if files:
                     file_select.value = files[0]
@@ -449,7 +901,7 @@ async def open_logs(container_id, container_name):
                 return
             
             content_area.content = "Reading log file..."
-            content = await asyncio.to_thread(docker_service.read_log_content, container_id, log_type.value.lower(), file_select.value)
+            content = await executors.run("interactive", docker_service.read_log_content, container_id, log_type.value.lower(), file_select.value)
             content_area.content = content or "Log file is empty."
 
         log_type.on_value_change(refresh_files)
@@ -457,10 +909,152 @@ async def open_logs(container_id, container_name):
         
         await refresh_files()
 
-async def open_trading(container_id, container_name, api_port):
+class PositionRow:
+    """One open position; price, volume and P/L labels update in place."""
+    
+    def __init__(self, pos):
+        type_color = "text-blue-400" if pos.type == "BUY" else "text-red-400"
+        self.profit_color = ""
+        with ui.card().classes("glass-card w-full p-3") as self.card:
+            with ui.row().classes("w-full justify-between items-center"):
+                with ui.row().classes("items-center gap-3"):
+                    ui.label(pos.symbol).classes("font-bold text-slate-100")
+                    ui.label(pos.type).classes(f"text-sm font-medium {type_color}")
+                    self.volume_label = ui.label().classes("text-xs text-slate-400")
+                    self.price_label = ui.label().classes("text-xs text-slate-500 font-mono")
+                self.profit_label = ui.label().classes("font-bold")
+        self.update(pos)
+    
+    def update(self, pos, fields=None):
+        """Refreshes the labels for the changed fields (all of them when fields is None)."""
+        if fields is None or "volume" in fields:
+            self.volume_label.set_text(f"{pos.volume} lots")
+        if fields is None or "price_current" in fields:
+            self.price_label.set_text(f"@ {pos.price_current}")
+        if fields is None or "profit" in fields:
+            self.profit_label.set_text(f"${pos.profit:,.2f}")
+            color = "text-green-400" if pos.profit >= 0 else "text-red-400"
+            if color != self.profit_color:
+                self.profit_label.classes(add=color, remove=self.profit_color)
+                self.profit_color = color
+
+class OrderRow:
+    """One pending order; volume and prices update in place."""
+    
+    def __init__(self, order):
+        with ui.row().classes("w-full justify-between items-center px-3 py-1 border-b border-slate-700/50") as self.card:
+            with ui.row().classes("items-center gap-3"):
+                ui.label(order.symbol).classes("font-medium text-slate-200")
+                ui.label(order.type).classes("text-xs text-amber-400")
+                self.volume_label = ui.label().classes("text-xs text-slate-400")
+            self.price_label = ui.label().classes("text-xs text-slate-400 font-mono")
+        self.update(order)
+    
+    def update(self, order, fields=None):
+        if fields is None or "volume" in fields:
+            self.volume_label.set_text(f"{order.volume} lots")
+        if fields is None or fields & {"price_open", "price_current", "sl", "tp"}:
+            self.price_label.set_text(f"@ {order.price_open} (now {order.price_current}) SL {order.sl} TP {order.tp}")
+
+def apply_rows(rows, container, diff, row_type):
+    """Adds, removes and updates the ticket-keyed rows named in a snapshot diff."""
+    for record in diff.removed:
+        row = rows.pop(record.ticket, None)
+        if row:
+            row.card.delete()
+    for change in diff.modified:
+        row = rows.get(change.current.ticket)
+        if row:
+            row.update(change.current, change.fields)
+    with container:
+        for record in diff.added:
+            rows[record.ticket] = row_type(record)
+
+class PositionsPanel:
+    """Positions tab of the trading drawer, fed by the instance's shared PositionStream."""
+    
+    def __init__(self, drawer, container_name, api_port, address="localhost"):
+        self.drawer = drawer
+        self.container_name = container_name
+        self.stream = position_streams.get(api_port, address)
+        self.rows = {}
+        self.order_rows = {}
+        
+        with ui.column().classes("w-full gap-4") as self.content:
+            with ui.row().classes("w-full items-center justify-between"):
+                self.live_switch = ui.switch("Live updates", value=True, on_change=lambda e: self.set_live(e.value)).classes("text-slate-300")
+                ui.button(icon="refresh", on_click=self.refresh).props("flat round color=blue").tooltip("Refresh Positions")
+            
+            # Summary
+            with ui.card().classes("glass-card w-full p-4 mb-4"):
+                with ui.row().classes("w-full justify-between items-center"):
+                    self.count_label = ui.label("Loading positions...").classes("text-slate-300 font-medium")
+                    self.total_label = ui.label().classes("font-bold")
+            self.error_label = ui.label().classes("text-red-400")
+            self.error_label.set_visibility(False)
+            with ui.column().classes("w-full items-center py-10") as self.empty:
+                ui.icon("inbox").classes("text-slate-500 text-4xl mb-2")
+                ui.label("No open positions").classes("text-slate-400")
+            self.empty.set_visibility(False)
+            self.list = ui.column().classes("w-full gap-2")
+            
+            # Pending orders
+            self.orders_label = ui.label().classes("text-sm text-slate-400 uppercase mt-2")
+            self.orders_label.set_visibility(False)
+            self.order_list = ui.column().classes("w-full gap-0")
+        
+        if self.stream.loaded:
+            self.apply(PositionDiff(
+                positions=SnapshotDiff(added=list(self.stream.positions.values())),
+                orders=SnapshotDiff(added=list(self.stream.orders.values())),
+            ))
+        self.set_live(True)
+        drawer.close_handlers.append(lambda: self.set_live(False))
+    
+    @tracer.traced("dashboard.apply_positions")
+    def apply(self, diff):
+        """Adds, removes and updates only the rows in the diff."""
+        if self.content.is_deleted or not self.drawer.props.get("model-value"):
+            # Drawer closed or reused for another instance (release_drawer normally stopped it already)
+            self.set_live(False)
+            return
+        
+        self.error_label.set_visibility(bool(self.stream.error))
+        if self.stream.error:
+            self.error_label.set_text(f"Failed to load positions: {self.stream.error}")
+            return
+        
+        apply_rows(self.rows, self.list, diff.positions, PositionRow)
+        if diff.orders:
+            apply_rows(self.order_rows, self.order_list, diff.orders, OrderRow)
+            orders = len(self.stream.orders)
+            self.orders_label.set_text(f"{orders} Pending Orders")
+            self.orders_label.set_visibility(orders > 0)
+        
+        count = len(self.stream.positions)
+        total_profit = self.stream.total_profit
+        self.count_label.set_text(f"{count} Open Positions")
+        self.total_label.set_text(f"Total: ${total_profit:,.2f}")
+        self.total_label.classes(replace="font-bold " + ("text-green-400" if total_profit >= 0 else "text-red-400"))
+        self.empty.set_visibility(count == 0)
+        metrics.record_positions(self.container_name, {"success": True, "count": count})
+    
+    def set_live(self, live):
+        if live:
+            self.stream.subscribe(self.apply)
+        else:
+            self.stream.unsubscribe(self.apply)
+    
+    async def refresh(self):
+        diff = await self.stream.refresh()
+        if not self.live_switch.value:
+            self.apply(diff)
+
+async def open_trading(trading_drawer, container_id, container_name, api_port, address="localhost"):
     """Opens trading drawer with account info, positions, and history."""
+    release_drawer(trading_drawer)
     trading_drawer.clear()
-    trading_drawer.open()
+    show_drawer(trading_drawer)
     
     with trading_drawer:
         # Header
@@ -470,7 +1064,7 @@ async def open_trading(container_id, container_name, api_port):
                 with ui.column().classes("gap-0"):
                     ui.label("Trading Dashboard").classes("text-xl font-bold text-slate-100")
                     ui.label(container_name).classes("text-sm text-slate-400")
-            ui.button(icon="close", on_click=trading_drawer.close).props("flat round").classes("text-slate-400")
+            ui.button(icon="close", on_click=lambda: hide_drawer(trading_drawer)).props("flat round").classes("text-slate-400")
         
         ui.separator().classes("bg-slate-700 mb-4")
         
@@ -485,12 +1079,14 @@ async def open_trading(container_id, container_name, api_port):
             with ui.tab_panel(account_tab):
                 account_content = ui.column().classes("w-full gap-4")
                 
+                @tracer.traced("dashboard.load_account")
                 async def load_account():
                     account_content.clear()
                     with account_content:
                         ui.label("Loading account info...").classes("text-slate-400")
                     
-                    result = await asyncio.to_thread(mt5_api.get_account_info, "localhost", api_port)
+                    result = await executors.run("interactive", mt5_api.get_account_info, address, api_port)
+                    metrics.record_account(container_name, result)
                     
                     account_content.clear()
                     with account_content:
@@ -534,63 +1130,20 @@ async def open_trading(container_id, container_name, api_port):
             
             # Positions Tab
             with ui.tab_panel(positions_tab):
-                positions_content = ui.column().classes("w-full gap-4")
-                
-                async def load_positions():
-                    positions_content.clear()
-                    with positions_content:
-                        ui.label("Loading positions...").classes("text-slate-400")
-                    
-                    result = await asyncio.to_thread(mt5_api.get_positions, "localhost", api_port)
-                    
-                    positions_content.clear()
-                    with positions_content:
-                        if not result.get("success"):
-                            ui.label("Failed to load positions").classes("text-red-400")
-                            return
-                        
-                        positions = result.get("positions", [])
-                        
-                        if not positions:
-                            with ui.column().classes("w-full items-center py-10"):
-                                ui.icon("inbox").classes("text-slate-500 text-4xl mb-2")
-                                ui.label("No open positions").classes("text-slate-400")
-                            return
-                        
-                        # Summary
-                        total_profit = result.get("total_profit", 0)
-                        color = "text-green-400" if total_profit >= 0 else "text-red-400"
-                        with ui.card().classes("glass-card w-full p-4 mb-4"):
-                            with ui.row().classes("w-full justify-between items-center"):
-                                ui.label(f"{len(positions)} Open Positions").classes("text-slate-300 font-medium")
-                                ui.label(f"Total: ${total_profit:,.2f}").classes(f"font-bold {color}")
-                        
-                        # Positions Table
-                        for pos in positions:
-                            profit = pos.get("profit", 0)
-                            profit_color = "text-green-400" if profit >= 0 else "text-red-400"
-                            type_color = "text-blue-400" if pos.get("type") == "BUY" else "text-red-400"
-                            
-                            with ui.card().classes("glass-card w-full p-3"):
-                                with ui.row().classes("w-full justify-between items-center"):
-                                    with ui.row().classes("items-center gap-3"):
-                                        ui.label(pos.get("symbol", "")).classes("font-bold text-slate-100")
-                                        ui.label(pos.get("type", "")).classes(f"text-sm font-medium {type_color}")
-                                        ui.label(f"{pos.get('volume', 0)} lots").classes("text-xs text-slate-400")
-                                    ui.label(f"${profit:,.2f}").classes(f"font-bold {profit_color}")
-                
-                ui.timer(0.1, load_positions, once=True)
+                positions_panel = PositionsPanel(trading_drawer, container_name, api_port, address)
+                ui.context.client.on_disconnect(lambda: positions_panel.set_live(False))
             
             # History Tab
             with ui.tab_panel(history_tab):
                 history_content = ui.column().classes("w-full gap-4")
                 
+                @tracer.traced("dashboard.load_history")
                 async def load_history():
                     history_content.clear()
                     with history_content:
                         ui.label("Loading history...").classes("text-slate-400")
                     
-                    result = await asyncio.to_thread(mt5_api.get_history, "localhost", api_port, 7)
+                    result = await executors.run("interactive", mt5_api.get_history, address, api_port, 7)
                     
                     history_content.clear()
                     with history_content:
@@ -627,6 +1180,36 @@ async def open_trading(container_id, container_name, api_port):
                 
                 ui.timer(0.1, load_history, once=True)
 
+def save_uploads(contents, names):
+    """Copies uploaded files into a new temp directory under their own names (chunk by chunk).
+    Returns the directory and the file paths."""
+    folder = tempfile.mkdtemp(prefix="mt5_upload_")
+    paths = []
+    for content, name in zip(contents, names):
+        path = os.path.join(folder, os.path.basename(name))
+        with open(path, "wb") as f:
+            shutil.copyfileobj(content, f)
+        paths.append(path)
+    return folder, paths
+
+def build_errors_dialog(results):
+    """Shows the compile errors of a failed build; nothing was deployed."""
+    with ui.dialog() as dialog, ui.card().classes("glass-card min-w-[700px] p-6"):
+        with ui.row().classes("w-full items-center gap-3 mb-4"):
+            ui.icon("build").classes("text-rose-400 text-3xl")
+            ui.label("Build failed").classes("text-2xl font-bold text-slate-100")
+        ui.label("Nothing was uploaded. Fix the errors and upload the bundle again.").classes("text-slate-400 mb-2")
+        for result in results:
+            status = "from cache" if result.cached else ("compiled" if result.ok else f"{len(result.errors)} errors")
+            color = "text-rose-400" if not result.ok else "text-emerald-400"
+            with ui.row().classes("w-full items-center gap-2"):
+                ui.label(result.source).classes("font-mono text-slate-200")
+                ui.label(status).classes(f"text-sm {color}")
+            if not result.ok:
+                ui.code("\n".join(result.errors)).classes("w-full text-xs")
+        ui.button("Close", icon="close", on_click=dialog.close).props("flat color=grey").classes("mt-4 w-full")
+    dialog.open()
+
 async def upload_agent_dialog():
     with ui.dialog() as dialog, ui.card().classes("glass-card min-w-[550px] p-6"):
         # Header
@@ -636,44 +1219,57 @@ async def upload_agent_dialog():
         
         ui.separator().classes("bg-slate-700/50 mb-4")
         
-        ui.label("Upload .ex5 or .mq5 files to all active instances").classes("text-slate-400 mb-4")
+        ui.label("Upload an EA to all active instances (.mq5 sources are compiled once on the builder), optionally with its .mqh includes, .dll libraries and .set presets, or a .zip bundle with MQL5 folders").classes("text-slate-400 mb-4")
         
         with ui.card().classes("bg-slate-700/20 border-2 border-dashed border-slate-600 w-full p-8"):
             async def handle_upload(e):
-                import tempfile
-                import os
-                
-                fname = e.name
-                if not (fname.endswith('.ex5') or fname.endswith('.mq5')):
-                    ui.notify("Invalid file type. Must be .ex5 or .mq5", type='warning', position='top')
-                    return
-
+                folder = None
                 try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{fname}") as tmp:
-                        tmp.write(e.content.read())
-                        tmp_path = tmp.name
+                    # Disk I/O stays off the event loop; files are copied and later streamed in chunks
+                    folder, paths = await executors.run("io", save_uploads, e.contents, e.names)
+                    try:
+                        entries = await executors.run("io", bundle_entries, paths)
+                    except (ValueError, zipfile.BadZipFile) as err:
+                        ui.notify(f"Invalid bundle: {err}", type='warning', position='top', timeout=5000)
+                        return
                     
                     dialog.close()
-                    ui.notify("Uploading to containers...", type='info', position='top', spinner=True, timeout=0)
+                    built = ""
+                    if any(name.lower().endswith(".mq5") for name, *_ in entries):
+                        ui.notify("Compiling sources on the builder...", type='info', position='top', spinner=True, timeout=0)
+                        results, entries = await builder.build(fleet, entries)
+                        ui.notify(None)
+                        if entries is None:
+                            build_errors_dialog(results)
+                            return
+                        compiled = sum(1 for r in results if not r.cached)
+                        built = f" ({compiled} compiled, {len(results) - compiled} from cache)"
+
+                    running = fleet.running()
+                    ui.notify(f"Uploading {len(entries)} files to {len(running)} containers...", type='info', position='top', spinner=True, timeout=0)
                     
-                    success_count = 0
-                    for c in containers:
-                        if "running" in c['status'].lower():
-                            err = await asyncio.to_thread(docker_service.upload_expert, c['id'], tmp_path)
-                            if not err:
-                                success_count += 1
+                    # Concurrent, bounded by the io pool; each upload holds one chunk in memory
+                    errors = await asyncio.gather(*(executors.run("io", docker_service.upload_bundle, c['id'], entries) for c in running))
+                    success_count = sum(1 for err in errors if not err)
                     
                     ui.notify(None)
-                    ui.notify(f"Successfully uploaded to {success_count} containers", type='positive', position='top', timeout=3000)
-                    os.unlink(tmp_path)
+                    if success_count < len(running):
+                        failed = [f"{c['name']}: {err}" for c, err in zip(running, errors) if err]
+                        ui.notify(f"Uploaded to {success_count}/{len(running)} containers. " + "; ".join(failed[:3]), type='warning', position='top', timeout=8000, multi_line=True)
+                    else:
+                        ui.notify(f"Successfully uploaded to {success_count} containers{built}", type='positive', position='top', timeout=3000)
 
                 except Exception as err:
                     ui.notify(None)
                     ui.notify(f"Upload error: {err}", type='negative', position='top', timeout=5000)
+                finally:
+                    if folder is not None:
+                        await executors.run("io", shutil.rmtree, folder, True)
 
             with ui.column().classes("w-full items-center gap-3"):
                 ui.icon("cloud_upload").classes("text-slate-500 text-6xl")
-                ui.upload(on_upload=handle_upload, auto_upload=True).props("accept=.ex5,.mq5 dark").classes("w-full")
+                accept = ",".join([*BUNDLE_FOLDERS, ".zip"])
+                ui.upload(on_multi_upload=handle_upload, multiple=True).props(f"accept={accept} dark").classes("w-full")
         
         ui.button("Close", icon="close", on_click=dialog.close).props("flat color=grey").classes("mt-4 w-full")
     
@@ -695,7 +1291,7 @@ async def kill_switch():
                 dialog.close()
                 ui.notify("Executing Kill Switch...", type='negative', position='top', spinner=True, timeout=0)
                 
-                errors = await asyncio.to_thread(docker_service.kill_all_mt5_containers)
+                errors = await executors.run("interactive", docker_service.kill_all_mt5_containers)
                 ui.notify(None)
                 
                 if errors:
@@ -703,7 +1299,7 @@ async def kill_switch():
                 else:
                     ui.notify("All containers terminated", type='positive', position='top', timeout=3000)
                 
-                await refresh_containers()
+                await fleet.refresh()
             
             with ui.row().classes("w-full justify-center gap-4 mt-4"):
                 ui.button("CANCEL", icon="close", on_click=dialog.close).props("size=lg flat color=white")
@@ -713,100 +1309,334 @@ async def kill_switch():
 
 # --- Layout ---
 
-# Logs Drawer with improved styling
-log_drawer = ui.right_drawer(fixed=False).classes("glass-header w-[700px] p-6 scrollbar-thin").props("overlay")
+ALERT_TYPES = {"critical": "negative", "warning": "warning"}
 
-# Trading Drawer for MT5 account/positions/history
-trading_drawer = ui.right_drawer(fixed=False).classes("glass-header w-[800px] p-6 scrollbar-thin").props("overlay")
+def show_alerts(anchor):
+    """Pops up alerts from the alert engine on this client while it is connected."""
+    def notify(alert):
+        if anchor.is_deleted:
+            ui_sink.unsubscribe(notify)
+            return
+        with anchor:
+            if alert.resolved:
+                ui.notify(f"Resolved: {alert.message}", type="positive", position="top-right", timeout=5000)
+            else:
+                ui.notify(alert.message, type=ALERT_TYPES.get(alert.severity, "info"), position="top-right",
+                          timeout=0 if alert.severity == "critical" else 10000, close_button=True)
+    
+    ui_sink.subscribe(notify)
+    ui.context.client.on_disconnect(lambda: ui_sink.unsubscribe(notify))
 
-# Header with glass effect
-with ui.header(elevated=True).classes("glass-header h-20 items-center px-6"):
-    with ui.row().classes("w-full max-w-7xl mx-auto items-center"):
-        with ui.row().classes("items-center gap-3"):
-            ui.icon("show_chart").classes("text-cyan-400 text-3xl")
-            ui.label("MT5 Manager").classes("text-2xl font-bold gradient-text")
-        
-        ui.space()
-        
-        with ui.row().classes("gap-2"):
-            ui.button("New Instance", icon="add_circle", on_click=create_instance_dialog).props("color=green flat").classes("font-medium")
-            ui.button("Upload EA", icon="upload_file", on_click=upload_agent_dialog).props("flat").classes("text-cyan-400 font-medium")
-            
-            ui.separator().props("vertical dark").classes("mx-2 h-10")
+@ui.page('/')
+def index():
+    """Main dashboard. Each tab gets its own view subscribed to the shared fleet state."""
+    ui.dark_mode().enable()
+    ui.add_head_html(CUSTOM_STYLES)
+    
+    # Logs Drawer with improved styling
+    log_drawer = ui.right_drawer(fixed=False).classes("glass-header w-[700px] p-6 scrollbar-thin").props("overlay")
+    
+    # Trading Drawer for MT5 account/positions/history
+    trading_drawer = ui.right_drawer(fixed=False).classes("glass-header w-[800px] p-6 scrollbar-thin").props("overlay")
+    
+    for drawer in (log_drawer, trading_drawer):
+        # Hidden until opened; open state is mirrored server-side so live panels stop when it closes
+        drawer.props["model-value"] = False
+        drawer.props.pop("show-if-above", None)
+        drawer.close_handlers = []  # see release_drawer
+        drawer.on("update:modelValue", lambda e, d=drawer: set_drawer(d, bool(e.args)))
+    
+    # Header with glass effect
+    with ui.header(elevated=True).classes("glass-header h-20 items-center px-6"):
+        with ui.row().classes("w-full max-w-7xl mx-auto items-center"):
+            with ui.row().classes("items-center gap-3"):
+                ui.icon("show_chart").classes("text-cyan-400 text-3xl")
+                ui.label("MT5 Manager").classes("text-2xl font-bold gradient-text")
             
-            ui.button("Emergency Stop", icon="dangerous", on_click=kill_switch).props("flat").classes("text-red-400 font-bold hover:bg-red-500/20")
-
-# Main Content
-with ui.column().classes("w-full min-h-screen bg-gradient-to-br from-slate-900 via-slate-800 to-slate-900 p-6"):
-    with ui.column().classes("w-full max-w-7xl mx-auto gap-6"):
-        # Stats Row
-        stats_container = ui.row().classes("w-full gap-4 mb-2")
-        
-        # Title and Controls
-        with ui.row().classes("w-full items-center justify-between mb-4"):
-            with ui.column().classes("gap-1"):
-                ui.label("Trading Instances").classes("text-3xl text-slate-100 font-bold")
-                ui.label(f"Last updated: {datetime.now().strftime('%H:%M:%S')}").classes("text-sm text-slate-500")
+            ui.space()
             
             with ui.row().classes("gap-2"):
-                ui.button(icon="refresh", on_click=refresh_containers).props("round flat size=lg").classes("text-slate-400 hover:text-cyan-400 hover:bg-cyan-500/10").tooltip("Refresh")
-                ui.button(icon="filter_list").props("round flat size=lg").classes("text-slate-400 hover:text-blue-400 hover:bg-blue-500/10").tooltip("Filter")
-
-        # Search/Filter Row
-        with ui.row().classes("w-full gap-4 mb-4"):
-            search_input = ui.input(placeholder="Search instances...").props("outlined dense dark").classes("flex-1")
-            search_input.on('keyup', lambda e: filter_containers(e.sender.value))
-        
-        # Container Grid
-        container_grid = ui.grid(columns=1).classes("w-full gap-5 sm:grid-cols-2 xl:grid-cols-3")
-
-# Dynamic timestamp update
-last_updated_label = None
-
-async def update_timestamp():
-    global last_updated_label
-    # Find and update the timestamp label
-    pass  # NiceGUI handles this in refresh_containers
-
-# Filter function
-def filter_containers(query):
-    """Filters container cards based on search query."""
-    query = query.lower().strip()
-    container_grid.clear()
-    
-    if not containers:
-        with container_grid:
-            create_empty_state()
-        return
+                ui.button("Portfolio", icon="pie_chart", on_click=lambda: ui.open('/portfolio')).props("flat").classes("text-cyan-400 font-medium")
+                ui.button("New Instance", icon="add_circle", on_click=create_instance_dialog).props("color=green flat").classes("font-medium")
+                ui.button("Upload EA", icon="upload_file", on_click=upload_agent_dialog).props("flat").classes("text-cyan-400 font-medium")
+                
+                ui.separator().props("vertical dark").classes("mx-2 h-10")
+                
+                ui.button("Emergency Stop", icon="dangerous", on_click=kill_switch).props("flat").classes("text-red-400 font-bold hover:bg-red-500/20")
+    
+    # Main Content
+    with ui.column().classes("w-full min-h-screen bg-gradient-to-br from-slate-900 via-slate-800 to-slate-900 p-6"):
+        with ui.column().classes("w-full max-w-7xl mx-auto gap-6"):
+            # Stats Row
+            stats_container = ui.row().classes("w-full gap-4 mb-2")
+            
+            # Title and Controls
+            with ui.row().classes("w-full items-center justify-between mb-4"):
+                with ui.column().classes("gap-1"):
+                    ui.label("Trading Instances").classes("text-3xl text-slate-100 font-bold")
+                    last_updated_label = ui.label("Last updated: --").classes("text-sm text-slate-500")
+                
+                with ui.row().classes("gap-2"):
+                    ui.button(icon="refresh", on_click=fleet.refresh).props("round flat size=lg").classes("text-slate-400 hover:text-cyan-400 hover:bg-cyan-500/10").tooltip("Refresh")
+                    ui.button(icon="balance", on_click=rebalance_dialog).props("round flat size=lg").classes("text-slate-400 hover:text-amber-400 hover:bg-amber-500/10").tooltip("Rebalance Resources")
+                    ui.button(icon="inventory_2", on_click=snapshots_dialog).props("round flat size=lg").classes("text-slate-400 hover:text-cyan-400 hover:bg-cyan-500/10").tooltip("Config Snapshots")
+                    ui.button(icon="filter_list").props("round flat size=lg").classes("text-slate-400 hover:text-blue-400 hover:bg-blue-500/10").tooltip("Filter")
+                    ui.toggle({"cards": "Cards", "table": "Compact"}, value="cards", on_change=lambda e: view.set_mode(e.value)).props("dense no-caps toggle-color=cyan").classes("self-center")
+            
+            # Search/Filter Row
+            with ui.row().classes("w-full gap-4 mb-4"):
+                # Debounced in the browser; filtering only re-pages existing records
+                search_input = ui.input(placeholder="Search: name status:running port:3001 tag:group=eu server:demo" + (" host:eu1" if MULTI_HOST else "")).props("outlined dense dark clearable debounce=300").classes("flex-1")
+                host_filter = None
+                if MULTI_HOST:
+                    host_filter = ui.select({None: "All hosts"} | {name: name for name in docker_service.hosts}, value=None).props("outlined dense dark").classes("w-48")
+            
+            # Container grid or table, one page at a time
+            fleet_content = ui.column().classes("w-full gap-4")
     
-    filtered = [c for c in containers if query in c['name'].lower()] if query else containers
+    view = FleetView(stats_container, fleet_content, last_updated_label, log_drawer, trading_drawer)
+    search_input.on_value_change(lambda e: view.filter(e.value))
+    if host_filter is not None:
+        host_filter.on_value_change(lambda e: view.set_host(e.value))
+    view.update_stats()
+    view.apply(FleetUpdate(connection_changed=True))
     
-    if not filtered:
-        with container_grid:
-            with ui.column().classes("w-full items-center py-10 col-span-full"):
-                ui.icon("search_off").classes("text-slate-500 text-4xl mb-2")
-                ui.label(f"No instances matching '{query}'").classes("text-slate-400")
-        return
+    fleet.subscribe(view.apply)
+    ui.context.client.on_disconnect(view.close)
+    show_alerts(fleet_content)
     
-    with container_grid:
-        for i, c in enumerate(filtered):
-            create_container_card(c, i)
-
-# Keyboard Shortcuts
-ui.keyboard(on_key=lambda e: handle_keyboard(e))
+    # Keyboard Shortcuts
+    ui.keyboard(on_key=handle_keyboard)
 
 async def handle_keyboard(e):
     """Handle keyboard shortcuts."""
     if e.action.keydown:
         if e.key.lower() == 'r' and not e.modifiers.ctrl:
-            await refresh_containers()
+            await fleet.refresh()
         elif e.key.lower() == 'n' and not e.modifiers.ctrl:
             await create_instance_dialog()
 
-# Initial Load
-ui.timer(0.1, refresh_containers, once=True)
-# Auto-refresh every 10 seconds
-ui.timer(10.0, refresh_containers)
+# --- Portfolio ---
+
+EXPOSURE_COLUMNS = [
+    {"name": "symbol", "label": "Symbol", "field": "symbol", "align": "left", "sortable": True},
+    {"name": "long", "label": "Long lots", "field": "long", "align": "right", "sortable": True},
+    {"name": "short", "label": "Short lots", "field": "short", "align": "right", "sortable": True},
+    {"name": "net", "label": "Net lots", "field": "net", "align": "right", "sortable": True},
+    {"name": "profit", "label": "P/L", "field": "profit", "align": "right", "sortable": True},
+    {"name": "positions", "label": "Positions", "field": "positions", "align": "right", "sortable": True},
+    {"name": "accounts", "label": "Accounts", "field": "accounts", "align": "right", "sortable": True},
+]
+
+ACCOUNT_COLUMNS = [
+    {"name": "instance", "label": "Instance", "field": "instance", "align": "left", "sortable": True},
+    {"name": "server", "label": "Server", "field": "server", "align": "left", "sortable": True},
+    {"name": "balance", "label": "Balance", "field": "balance", "align": "right", "sortable": True},
+    {"name": "equity", "label": "Equity", "field": "equity", "align": "right", "sortable": True},
+    {"name": "profit", "label": "P/L", "field": "profit", "align": "right", "sortable": True},
+    {"name": "margin_level", "label": "Margin %", "field": "margin_level", "align": "right", "sortable": True},
+    {"name": "positions", "label": "Positions", "field": "positions", "align": "right", "sortable": True},
+    {"name": "status", "label": "Status", "field": "status", "align": "left", "sortable": True},
+]
+
+class PortfolioView:
+    """Per-tab portfolio page; renders the shared aggregates, never polls itself."""
+    
+    def __init__(self):
+        self.labels = {}
+        with ui.row().classes("w-full gap-4"):
+            self.labels["accounts"] = create_stat_card("Accounts", "--", "account_balance", "blue")
+            self.labels["equity"] = create_stat_card("Equity", "--", "savings", "green")
+            self.labels["profit"] = create_stat_card("Floating P/L", "--", "trending_up", "cyan")
+            self.labels["margin_level"] = create_stat_card("Margin Level", "--", "speed", "red")
+        with ui.row().classes("w-full items-center gap-4 text-sm text-slate-400"):
+            self.detail_label = ui.label()
+            ui.space()
+            self.updated_label = ui.label("Last updated: --").classes("text-slate-500")
+        
+        ui.label("Net Exposure").classes("text-xl text-slate-100 font-bold mt-4")
+        self.exposure_table = ui.table(columns=EXPOSURE_COLUMNS, rows=[], row_key="symbol", pagination=15).props("dense flat dark").classes("glass-card w-full")
+        
+        ui.label("Accounts").classes("text-xl text-slate-100 font-bold mt-4")
+        self.accounts_table = ui.table(columns=ACCOUNT_COLUMNS, rows=[], row_key="id", pagination=20).props("dense flat dark").classes("glass-card w-full")
+    
+    @tracer.traced("portfolio.render")
+    def update(self):
+        if self.exposure_table.is_deleted:
+            self.close()
+            return
+        totals = portfolio.totals
+        if not totals:
+            return
+        
+        self.labels["accounts"].set_text(str(totals["accounts"]))
+        self.labels["equity"].set_text(f"${totals['equity']:,.2f}")
+        self.labels["profit"].set_text(f"${totals['profit']:,.2f}")
+        level = totals["margin_level"]
+        self.labels["margin_level"].set_text(f"{level:,.0f}%" if level is not None else "--")
+        self.detail_label.set_text(f"Balance ${totals['balance']:,.2f} · Margin ${totals['margin']:,.2f} · "
+                                   f"{totals['positions']} positions · {totals['errors']} unreachable · {totals['stale']} stale")
+        self.updated_label.set_text(f"Last updated: {portfolio.last_updated.strftime('%H:%M:%S')}")
+        
+        self.exposure_table.rows = [{
+            "symbol": e.symbol,
+            "long": round(e.long_volume, 2),
+            "short": round(e.short_volume, 2),
+            "net": round(e.net_volume, 2),
+            "profit": round(e.profit, 2),
+            "positions": e.positions,
+            "accounts": e.accounts,
+        } for e in portfolio.exposure]
+        self.accounts_table.rows = [{
+            "id": s.container_id,
+            "instance": s.instance,
+            "server": s.server,
+            "balance": round(s.balance, 2),
+            "equity": round(s.equity, 2),
+            "profit": round(s.profit, 2),
+            "margin_level": round(s.margin_level) if s.margin_level is not None else None,
+            "positions": len(s.positions.records),
+            "status": s.error or "OK",
+        } for s in portfolio.accounts.values()]
+    
+    def close(self):
+        portfolio.unsubscribe(self.update)
+
+@ui.page('/portfolio')
+def portfolio_page():
+    """Fleet-wide balance, equity and exposure."""
+    ui.dark_mode().enable()
+    ui.add_head_html(CUSTOM_STYLES)
+    
+    with ui.header(elevated=True).classes("glass-header h-20 items-center px-6"):
+        with ui.row().classes("w-full max-w-7xl mx-auto items-center"):
+            with ui.row().classes("items-center gap-3"):
+                ui.icon("pie_chart").classes("text-cyan-400 text-3xl")
+                ui.label("Portfolio").classes("text-2xl font-bold gradient-text")
+            ui.space()
+            ui.button("Instances", icon="dns", on_click=lambda: ui.open('/')).props("flat").classes("text-cyan-400 font-medium")
+    
+    with ui.column().classes("w-full min-h-screen bg-gradient-to-br from-slate-900 via-slate-800 to-slate-900 p-6"):
+        with ui.column().classes("w-full max-w-7xl mx-auto gap-4"):
+            view = PortfolioView()
+    
+    view.update()
+    portfolio.subscribe(view.update)
+    ui.context.client.on_disconnect(view.close)
+    show_alerts(view.exposure_table)
+
+async def close_docker():
+    """Closes the Docker clients on the event loop that owns their sessions, then the worker
+    pools. NiceGUI only schedules async shutdown handlers, so the order is kept here; the
+    sessions' sockets close in the handler's first step, before the loop stops."""
+    try:
+        await docker_service.close()
+    finally:
+        executors.shutdown()
+
+# Saved state first so pages render immediately, then the refresh loops reconcile it
+app.on_startup(lambda: state_store.restore(fleet, portfolio))
+app.on_startup(lambda: state_store.start(fleet, portfolio))
+app.on_shutdown(state_store.stop)
+
+# Shared fleet refresh loop and portfolio poll; the alert engine listens to both
+app.on_startup(lambda: alert_engine.attach(fleet, portfolio))
+app.on_startup(fleet.start)
+app.on_shutdown(fleet.stop)
+app.on_startup(portfolio.start)
+app.on_shutdown(portfolio.stop)
+app.on_startup(lambda: hibernator.start(fleet, portfolio))
+app.on_shutdown(hibernator.stop)
+app.on_startup(lambda: supervisor.start(fleet, portfolio))
+app.on_shutdown(supervisor.stop)
+app.on_shutdown(close_docker)
+
+# Event loop lag monitor and blocking watchdog
+app.on_startup(loop_monitor.start)
+app.on_shutdown(loop_monitor.stop)
+
+# Metrics
+app.get('/metrics')(metrics.metrics_response)
+app.on_startup(lambda: metrics.watch_default_executor(asyncio.get_running_loop()))
+
+# --- Debug: Traces ---
+
+@app.get('/debug/traces.json')
+def export_traces():
+    """Exports recorded spans as OTLP/JSON."""
+    return tracer.export_otlp()
+
+@app.get('/debug/loop.json')
+def export_loop_stats():
+    """Current event loop lag and the most recent blocking stalls."""
+    return {"lag_ms": round(loop_monitor.lag * 1000, 2), "blocks": loop_monitor.recent_blocks()}
+
+@app.get('/debug/history.json')
+async def export_history(instance: str, since: float = 0.0):
+    """Saved balance and equity samples of one instance."""
+    return await executors.run("interactive", state_store.history, instance, since)
+
+@app.get('/debug/alerts.json')
+def export_alerts():
+    """Alerts currently firing and the most recent alert notifications."""
+    return {
+        "active": [a.to_dict() for a in alert_engine.active()],
+        "recent": [a.to_dict() for a in ui_sink.recent],
+    }
+
+@ui.page('/debug/traces')
+def traces_page():
+    """Waterfall view of the most recent traces."""
+    ui.dark_mode().enable()
+    
+    def render():
+        traces_column.clear()
+        with traces_column:
+            traces = tracer.traces(limit=30)
+            if not traces:
+                ui.label("No spans recorded. Enable tracing and use the dashboard.").classes("text-slate-400")
+                return
+            for spans in traces:
+                create_trace_waterfall(spans)
+    
+    with ui.column().classes("w-full min-h-screen bg-slate-900 p-6 gap-4"):
+        with ui.row().classes("w-full items-center justify-between"):
+            with ui.row().classes("items-center gap-3"):
+                ui.icon("timeline").classes("text-cyan-400 text-3xl")
+                ui.label("Traces").classes("text-2xl font-bold text-slate-100")
+            with ui.row().classes("items-center gap-2"):
+                ui.switch("Tracing enabled").bind_value(tracer, "enabled").classes("text-slate-300")
+                ui.button(icon="refresh", on_click=lambda: render()).props("round flat").classes("text-slate-400").tooltip("Refresh")
+                ui.button(icon="delete_sweep", on_click=lambda: (tracer.clear(), render())).props("round flat").classes("text-slate-400").tooltip("Clear")
+                ui.button(icon="download", on_click=lambda: ui.download('/debug/traces.json')).props("round flat").classes("text-slate-400").tooltip("Export OTLP JSON")
+        traces_column = ui.column().classes("w-full gap-3")
+    
+    render()
+
+def create_trace_waterfall(spans):
+    """Renders one trace as a waterfall of span bars."""
+    start = spans[0].start_ns
+    end = max(s.end_ns for s in spans)
+    total = max(end - start, 1)
+    
+    depths = {}
+    for s in spans:
+        depths[s.span_id] = depths.get(s.parent_id, -1) + 1
+    
+    with ui.card().classes("bg-slate-800/60 border border-slate-700 w-full p-3"):
+        with ui.row().classes("w-full justify-between mb-2"):
+            ui.label(spans[0].name).classes("text-sm font-bold text-slate-200")
+            ui.label(f"{total / 1e6:.1f} ms · {len(spans)} spans").classes("text-xs text-slate-400")
+        for s in spans:
+            left = (s.start_ns - start) / total * 100
+            width = max((s.end_ns - s.start_ns) / total * 100, 0.5)
+            color = "bg-red-500" if s.error else "bg-cyan-500"
+            with ui.row().classes("w-full items-center gap-2 no-wrap"):
+                ui.label(s.name).classes("text-xs font-mono text-slate-300 w-72 truncate").style(f"padding-left: {depths[s.span_id] * 12}px").tooltip(str(s.attributes or s.error or ""))
+                with ui.element('div').classes("flex-1 h-3 relative bg-slate-700/50 rounded"):
+                    ui.element('div').classes(f"absolute h-3 rounded {color}").style(f"left: {left:.2f}%; width: {width:.2f}%")
+                ui.label(f"{s.duration_ms:.1f} ms").classes("text-xs text-slate-400 w-20 text-right")
+
 
 # Run
-ui.run(title="MT5 Manager", port=8080, favicon="📈", dark=True, reload=False)
\ No newline at end of file
+ui.run(title="MT5 Manager", port=int(os.environ.get("MT5_MANAGER_PORT", "8080")), favicon="📈", dark=True, reload=False)
\ No newline at end of file
@@ -1,120 +1,525 @@
-import docker
 import tarfile
 import io
 import os
-from typing import List, Dict, Optional
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, List, Dict, Optional, Tuple
 
-class DockerService:
-    def __init__(self):
+MT5_IMAGE = "gmag11/metatrader5_vnc:latest"
+MT5_NETWORK = "trading_network"  # Ensure this matches the existing network
+MT5_ENVIRONMENT = {
+    "CUSTOM_USER": "trader",
+    "PASSWORD": "",
+    "VNCPASSWORD": "",
+    "VNC_DISABLE_AUTH": "true"
+}
+# The terminal's whole state (Wine prefix, MT5 install, profiles, EAs) lives in the mt5_config_<account> volume
+CONFIG_DIR = "/config"
+# Based on research: EAs live in /config/MQL5/Experts/; bundles are extracted below /config/MQL5/
+MQL5_DIR = "/config/MQL5/"
+# Uploaded bundles: single files go to a folder by extension, zip archives keep their layout
+BUNDLE_FOLDERS = {".ex5": "Experts", ".mq5": "Experts", ".mqh": "Include", ".dll": "Libraries", ".set": "Presets"}
+MQL5_FOLDERS = ("Experts", "Indicators", "Scripts", "Include", "Libraries", "Presets", "Files")
+UPLOAD_CHUNK = 256 * 1024
+# Experts: /config/MQL5/Logs/, Journal: /config/Logs/
+LOG_DIRS = {"experts": "/config/MQL5/Logs/", "journal": "/config/Logs/"}
+STOPPED_STATS = {"cpu_percent": 0.0, "memory_mb": 0, "memory_percent": 0.0, "uptime": "Stopped"}
+CPU_PERIOD = 100_000  # µs; the CPU quota is set as a share of this period
+# HostConfig fields of scheduler limits and the matching docker-py argument names
+LIMIT_KWARGS = {"CpuPeriod": "cpu_period", "CpuQuota": "cpu_quota", "CpusetCpus": "cpuset_cpus",
+                "CpuShares": "cpu_shares", "Memory": "mem_limit", "MemorySwap": "memswap_limit"}
+JOURNAL_TAIL_LINES = 50
+
+
+def restart_policy(spec: str) -> Dict:
+    """Docker restart policy from "unless-stopped", "no" or "on-failure:3"."""
+    name, _, retries = spec.strip().partition(":")
+    policy = {"Name": name}
+    if retries:
+        policy["MaximumRetryCount"] = int(retries)
+    return policy
+
+
+# For new instances. With "no" or "on-failure:N", recovery beyond Docker's own
+# retries is left to the supervisor's backoff.
+RESTART_POLICY = restart_policy(os.environ.get("MT5_RESTART_POLICY", "unless-stopped"))
+
+
+def container_record(attrs: Dict, host: str = "local", address: str = "localhost") -> Dict:
+    """Builds the dashboard's container dict from inspect data. host names the Docker engine,
+    address is where the container's published ports are reachable."""
+    ports = attrs['NetworkSettings']['Ports']
+    vnc_port = "N/A"
+    api_port = "N/A"
+    
+    if ports:
+        # 3000/tcp -> VNC
+        vnc_data = ports.get('3000/tcp')
+        if vnc_data:
+            vnc_port = vnc_data[0]['HostPort']
+        
+        # 8001/tcp -> API
+        api_data = ports.get('8001/tcp')
+        if api_data:
+            api_port = api_data[0]['HostPort']
+    
+    host_config = attrs.get("HostConfig") or {}
+    cpu_limit = None
+    if host_config.get("CpuQuota", 0) > 0:
+        cpu_limit = round(host_config["CpuQuota"] / (host_config.get("CpuPeriod") or CPU_PERIOD), 2)
+    elif host_config.get("NanoCpus"):
+        cpu_limit = round(host_config["NanoCpus"] / 1e9, 2)
+    return {
+        "id": attrs["Id"][:12],
+        "name": attrs["Name"].lstrip("/"),
+        "status": attrs["State"]["Status"],
+        "vnc_port": vnc_port,
+        "api_port": api_port,
+        "labels": attrs["Config"].get("Labels") or {},
+        "restart_count": attrs.get("RestartCount", 0),
+        "exit_code": attrs["State"].get("ExitCode", 0),
+        "oom_killed": bool(attrs["State"].get("OOMKilled")),
+        "host": host,
+        "address": address,
+        "cpu_limit": cpu_limit,
+        "cpuset": host_config.get("CpusetCpus") or "",
+        "cpu_shares": host_config.get("CpuShares") or None,
+        "memory_limit_mb": host_config["Memory"] // (1024 * 1024) if host_config.get("Memory") else None,
+    }
+
+def format_uptime(attrs: Dict) -> str:
+    """Uptime of a running container from its inspect data."""
+    started_at = attrs.get('State', {}).get('StartedAt', '')
+    if not started_at or attrs.get('State', {}).get('Status') != 'running':
+        return "N/A"
+    # Parse ISO format with timezone
+    started_at = started_at.replace('Z', '+00:00')
+    try:
+        start_time = datetime.fromisoformat(started_at[:26] + '+00:00')
+    except ValueError:
+        return "N/A"
+    delta = datetime.now(timezone.utc) - start_time
+    
+    days = delta.days
+    hours, remainder = divmod(delta.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+    
+    if days > 0:
+        return f"{days}d {hours}h"
+    elif hours > 0:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+def usage_stats(stats: Dict, uptime: str) -> Dict:
+    """CPU% and memory from a one-shot Docker stats sample."""
+    cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
+               stats['precpu_stats']['cpu_usage']['total_usage']
+    system_delta = stats['cpu_stats'].get('system_cpu_usage', 0) - \
+                  stats['precpu_stats'].get('system_cpu_usage', 0)
+    
+    cpu_percent = 0.0
+    if system_delta > 0:
+        num_cpus = stats['cpu_stats'].get('online_cpus', 1) or 1
+        cpu_percent = (cpu_delta / system_delta) * num_cpus * 100.0
+    
+    memory_usage = stats['memory_stats'].get('usage', 0)
+    memory_limit = stats['memory_stats'].get('limit', 1)
+    memory_mb = memory_usage / (1024 * 1024)
+    memory_percent = (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0
+    
+    return {
+        "cpu_percent": round(cpu_percent, 1),
+        "memory_mb": round(memory_mb, 0),
+        "memory_percent": round(memory_percent, 1),
+        "uptime": uptime
+    }
+
+def stats_error(e: Exception) -> Dict:
+    return {"cpu_percent": 0.0, "memory_mb": 0, "memory_percent": 0.0, "uptime": "Error", "error": str(e)}
+
+def limits_host_config(limits: Optional[Dict]) -> Dict:
+    """HostConfig fields for scheduler limits. The quota is set as CpuPeriod/CpuQuota, not
+    NanoCpus, because docker-py's update cannot change NanoCpus; swap is disabled."""
+    if not limits:
+        return {}
+    config = {"CpusetCpus": limits.get("cpuset") or None, "CpuShares": limits.get("cpu_shares")}
+    if limits.get("cpus"):
+        config["CpuPeriod"] = CPU_PERIOD
+        config["CpuQuota"] = int(limits["cpus"] * CPU_PERIOD)
+    if limits.get("memory_mb"):
+        config["Memory"] = config["MemorySwap"] = int(limits["memory_mb"]) * 1024 * 1024
+    return {key: value for key, value in config.items() if value is not None}
+
+def log_files(output: bytes) -> List[str]:
+    """Filters `ls` output to .log files, newest first."""
+    files = output.decode('utf-8').splitlines()
+    log_files = [f for f in files if f.endswith('.log')]
+    log_files.sort(reverse=True)
+    return log_files
+
+def decode_log(raw_data: bytes) -> str:
+    # MT5 logs are typically UTF-16 LE (often with a \xff\xfe BOM), but can be
+    # plain ASCII/UTF-8 depending on the Wine setup: try UTF-16 first.
+    try:
+        return raw_data.decode('utf-16')
+    except UnicodeDecodeError:
         try:
-            self.client = docker.from_env()
-        except docker.errors.DockerException as e:
-            print(f"Error connecting to Docker: {e}")
-            self.client = None
+            return raw_data.decode('utf-8')
+        except UnicodeDecodeError:
+            return raw_data.decode('utf-8', errors='replace')
+
+def journal_files(days: int = 2) -> List[str]:
+    """Journal log names of the last days, newest first (MT5 starts one file per day)."""
+    now = time.time()
+    return [datetime.fromtimestamp(now - day * 86400, timezone.utc).strftime("%Y%m%d.log") for day in range(days)]
+
+def archive_file(data: bytes) -> bytes:
+    """Content of the first file in a tar archive from get_archive."""
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        for member in tar:
+            if member.isfile():
+                return tar.extractfile(member).read()
+    return b""
+
+def tail_lines(text: str, lines: int) -> str:
+    return "\n".join(text.splitlines()[-lines:])
+
+# (name below MQL5_DIR, source file, zip member or None, size)
+BundleEntry = Tuple[str, str, Optional[str], int]
+
+def bundle_entries(file_paths: List[str]) -> List[BundleEntry]:
+    """The files of an upload bundle. An .ex5, .mq5, .mqh, .dll or .set file goes to its
+    MQL5 folder; a .zip adds its files under their own MQL5 folders (an MQL5/ prefix is
+    dropped). Raises ValueError for anything else."""
+    entries = []
+    for path in file_paths:
+        name = os.path.basename(path)
+        extension = os.path.splitext(name)[1].lower()
+        if extension == ".zip":
+            with zipfile.ZipFile(path) as bundle:
+                for info in bundle.infolist():
+                    if not info.is_dir():
+                        entries.append((_bundle_name(info.filename), path, info.filename, info.file_size))
+        elif extension in BUNDLE_FOLDERS:
+            entries.append((f"{BUNDLE_FOLDERS[extension]}/{name}", path, None, os.path.getsize(path)))
+        else:
+            raise ValueError(f"Unsupported file type: {name}")
+    if not entries:
+        raise ValueError("Nothing to upload")
+    return entries
+
+def _bundle_name(member: str) -> str:
+    parts = [part for part in member.replace("\\", "/").split("/") if part not in ("", ".")]
+    if parts and parts[0].lower() == "mql5":
+        parts = parts[1:]
+    folder = next((f for f in MQL5_FOLDERS if parts and f.lower() == parts[0].lower()), None)
+    if folder is None or len(parts) < 2 or ".." in parts:
+        raise ValueError(f"{member}: bundle files must be inside one of {', '.join(MQL5_FOLDERS)}")
+    return "/".join([folder, *parts[1:]])
+
+def tar_stream(entries: List[BundleEntry], chunk_size: int = UPLOAD_CHUNK) -> Iterator[bytes]:
+    """Yields an uncompressed tar of the entries chunk by chunk, reading each file as it
+    goes, so memory stays at one chunk whatever the file sizes."""
+    mtime = time.time()
+    bundles = {}
+    try:
+        for name, source, member, size in entries:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = mtime
+            yield info.tobuf()
+            if member is None:
+                f = open(source, "rb")
+            else:
+                if source not in bundles:
+                    bundles[source] = zipfile.ZipFile(source)
+                f = bundles[source].open(member)
+            with f:
+                remaining = size
+                while remaining:
+                    chunk = f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        raise OSError(f"{name} changed while uploading")
+                    remaining -= len(chunk)
+                    yield chunk
+            if size % tarfile.BLOCKSIZE:
+                yield tarfile.NUL * (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE)
+        yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)  # end of archive
+    finally:
+        for bundle in bundles.values():
+            bundle.close()
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks, e.g. for tarfile's stream mode."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk = memoryview(chunk)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+def next_free_ports(containers: List[Dict], start_vnc=3000, start_api=8001, reserved=()) -> tuple[int, int]:
+    """Lowest VNC and API ports not used by any container or reserved (vnc, api) pair."""
+    used_vnc = {vnc for vnc, _ in reserved}
+    used_api = {api for _, api in reserved}
+    
+    for c in containers:
+        if c['vnc_port'] != "N/A":
+            used_vnc.add(int(c['vnc_port']))
+        if c['api_port'] != "N/A":
+            used_api.add(int(c['api_port']))
+    
+    # Find next free VNC
+    vnc = start_vnc
+    while vnc in used_vnc:
+        vnc += 1
+        
+    # Find next free API
+    api = start_api
+    while api in used_api:
+        api += 1
+        
+    return vnc, api
+
+# Container events that leave the inspect data we cache unchanged
+IGNORED_EVENTS = ("exec_", "health_status", "top", "attach", "detach", "resize", "copy",
+                  "archive-path", "extract-to-dir", "export", "commit")
+
+class HandleCache:
+    """Container handles (docker-py objects or inspect data) by short id. An entry is dropped
+    when Docker reports a change to its container, so while the event stream is `live` the
+    entries stay valid across refreshes and repeated calls skip the inspect round-trip."""
+
+    def __init__(self):
+        self.live = False
+        self._handles: Dict[str, object] = {}
+        self._versions: Dict[str, int] = {}
+
+    def get(self, ref: str):
+        return self._handles.get(ref[:12])
+
+    def version(self, ref: str) -> int:
+        return self._versions.get(ref[:12], 0)
 
-    def list_mt5_containers(self) -> List[Dict]:
-        """Lists all containers with names starting with 'trading_mt5_'."""
+    def put(self, ref: str, handle, version: Optional[int] = None):
+        """Caches a handle; with version (from before the fetch), only if nothing changed meanwhile."""
+        key = ref[:12]
+        if version is None or version == self._versions.get(key, 0):
+            self._handles[key] = handle
+
+    def invalidate(self, ref: str):
+        key = ref[:12]
+        self._handles.pop(key, None)
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def retain(self, refs):
+        """Forgets containers that no longer exist."""
+        keep = {ref[:12] for ref in refs}
+        for key in [k for k in self._handles if k not in keep]:
+            del self._handles[key]
+
+    def clear(self):
+        for key in list(self._handles):
+            self.invalidate(key)
+
+    def on_event(self, event: Dict):
+        if event.get("Type") != "container" or event.get("Action", "").startswith(IGNORED_EVENTS):
+            return
+        ref = event.get("Actor", {}).get("ID") or event.get("id")
+        if ref:
+            self.invalidate(ref)
+
+class DockerService:
+    """Docker access for MT5 containers. The docker package is imported and the daemon
+    contacted on first use, so creating the service never delays startup."""
+    
+    def __init__(self, retry_interval: float = 10.0, base_url: Optional[str] = None, cert_path: Optional[str] = None,
+                 name: str = "local", address: str = "localhost"):
+        self.retry_interval = retry_interval
+        self.base_url = base_url  # None: DOCKER_HOST and friends, like the docker CLI
+        self.cert_path = cert_path
+        self.name = name
+        self.address = address
+        self._client = None
+        self._last_attempt: Optional[float] = None
+        self._connect_lock = threading.Lock()
+        self.handles = HandleCache()
+        self._events = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self.connect()
+        return self._client
+    
+    def connect(self) -> bool:
+        """Connects to the Docker daemon unless already connected; failed attempts are retried after retry_interval."""
+        with self._connect_lock:
+            if self._client is not None:
+                return True
+            if self._last_attempt is not None and time.monotonic() - self._last_attempt < self.retry_interval:
+                return False
+            self._last_attempt = time.monotonic()
+            import docker
+            try:
+                if self.base_url is None:
+                    self._client = docker.from_env()
+                else:
+                    tls = None
+                    if self.cert_path:
+                        tls = docker.tls.TLSConfig(
+                            client_cert=(os.path.join(self.cert_path, "cert.pem"), os.path.join(self.cert_path, "key.pem")),
+                            ca_cert=os.path.join(self.cert_path, "ca.pem"), verify=True)
+                    # ssh:// goes through the ssh binary, so no paramiko is needed
+                    self._client = docker.DockerClient(base_url=self.base_url, tls=tls,
+                                                       use_ssh_client=self.base_url.startswith("ssh://"))
+            except docker.errors.DockerException as e:
+                print(f"Error connecting to Docker ({self.name}): {e}")
+                return False
+            threading.Thread(target=self._watch_events, args=(self._client,), name="docker-events", daemon=True).start()
+            return True
+
+    def close(self):
+        client, self._client = self._client, None
+        if self._events is not None:
+            self._events.close()
+        if client is not None:
+            client.close()
+
+    def _watch_events(self, client):
+        """Drops cached handles of containers Docker reports changes for; reconnects after errors."""
+        while self._client is client:
+            try:
+                self._events = client.events(decode=True, filters={"type": "container"})
+                # Changes before the stream opened were not seen
+                self.handles.clear()
+                self.handles.live = True
+                for event in self._events:
+                    self.handles.on_event(event)
+            except Exception as e:
+                if self._client is client:
+                    print(f"Docker event stream failed: {e}")
+            finally:
+                self.handles.live = False
+            time.sleep(self.retry_interval)
+
+    def _container(self, container_id: str):
+        """The docker-py container, from the handle cache while the event stream keeps it valid."""
+        container = self.handles.get(container_id) if self.handles.live else None
+        if container is None:
+            version = self.handles.version(container_id)
+            container = self.client.containers.get(container_id)
+            self.handles.put(container_id, container, version)
+        return container
+
+    def list_mt5_containers(self) -> Optional[List[Dict]]:
+        """Lists all containers with names starting with 'trading_mt5_'. None if they could
+        not be listed, so callers can tell an unreachable daemon from an empty fleet."""
         if not self.client:
-            return []
+            return None
         
         containers = []
         try:
-            # Filter specifically for our MT5 containers
-            all_containers = self.client.containers.list(all=True)
-            for container in all_containers:
-                if container.name.startswith("trading_mt5_"):
-                    # Extract port mappings
-                    ports = container.attrs['NetworkSettings']['Ports']
-                    vnc_port = "N/A"
-                    api_port = "N/A"
-                    
-                    if ports:
-                        # 3000/tcp -> VNC
-                        vnc_data = ports.get('3000/tcp')
-                        if vnc_data:
-                            vnc_port = vnc_data[0]['HostPort']
-                        
-                        # 8001/tcp -> API
-                        api_data = ports.get('8001/tcp')
-                        if api_data:
-                            api_port = api_data[0]['HostPort']
-
-                    containers.append({
-                        "id": container.short_id,
-                        "name": container.name,
-                        "status": container.status,
-                        "vnc_port": vnc_port,
-                        "api_port": api_port,
-                        "obj": container
-                    })
+            # Filter specifically for our MT5 containers. The sparse list is one request;
+            # only containers without a valid cached handle are inspected.
+            summaries = [c.attrs for c in self.client.containers.list(all=True, sparse=True, filters={"name": "trading_mt5_"})
+                         if any(name.lstrip("/").startswith("trading_mt5_") for name in c.attrs.get("Names") or ())]
+            self.handles.retain(s["Id"] for s in summaries)
+            for summary in summaries:
+                container = self.handles.get(summary["Id"]) if self.handles.live else None
+                if container is None or container.attrs["State"]["Status"] != summary["State"]:
+                    version = self.handles.version(summary["Id"])
+                    container = self.client.containers.get(summary["Id"])
+                    self.handles.put(summary["Id"], container, version)
+                record = container_record(container.attrs, self.name, self.address)
+                record["obj"] = container
+                containers.append(record)
         except Exception as e:
             print(f"Error listing containers: {e}")
+            return None
             
         return containers
 
-    def create_mt5_container(self, account_name: str, vnc_port: int, api_port: int, password: str = "trading") -> Optional[str]:
-        """Creates and starts a new MT5 container."""
+    def create_mt5_container(self, account_name: str, vnc_port: int, api_port: int, password: str = "trading",
+                             limits: Optional[Dict] = None, labels: Optional[Dict[str, str]] = None,
+                             config_archive: Optional[Callable[[], Iterator[bytes]]] = None) -> Optional[str]:
+        """Creates and starts a new MT5 container, with the scheduler's CPU and memory limits if given.
+        config_archive returns the chunks of a /config tar (see snapshots.py) to restore first."""
         if not self.client:
             return "Docker client not connected"
+        from docker.errors import APIError, ImageNotFound
 
         container_name = f"trading_mt5_{account_name}"
         volume_name = f"mt5_config_{account_name}"
         
         try:
-            self.client.containers.run(
-                image="gmag11/metatrader5_vnc:latest",
+            kwargs = dict(
+                image=MT5_IMAGE,
                 name=container_name,
                 ports={
                     '3000/tcp': vnc_port,
                     '8001/tcp': api_port
                 },
-                environment={
-                    "CUSTOM_USER": "trader",
-                    "PASSWORD": "",
-                    "VNCPASSWORD": "",
-                    "VNC_DISABLE_AUTH": "true"
-                },
+                environment=MT5_ENVIRONMENT,
                 volumes={
-                    volume_name: {'bind': '/config', 'mode': 'rw'}
+                    volume_name: {'bind': CONFIG_DIR, 'mode': 'rw'}
                 },
-                detach=True,
-                restart_policy={"Name": "unless-stopped"},
-                network="trading_network" # Ensure this matches the existing network
+                restart_policy=RESTART_POLICY,
+                network=MT5_NETWORK,
+                labels=labels or {},
+                **{LIMIT_KWARGS[key]: value for key, value in limits_host_config(limits).items()}
             )
+            if config_archive is None:
+                self.client.containers.run(detach=True, **kwargs)
+                return None # Success
+            # Created stopped, so the volume holds the snapshot before MT5 first starts
+            try:
+                container = self.client.containers.create(**kwargs)
+            except ImageNotFound:
+                self.client.images.pull(MT5_IMAGE)
+                container = self.client.containers.create(**kwargs)
+            try:
+                container.put_archive("/", config_archive())
+            except Exception:
+                container.remove(force=True)
+                raise
+            container.start()
             return None # Success
-        except docker.errors.APIError as e:
+        except APIError as e:
             return f"Docker API Error: {e}"
         except Exception as e:
             return f"Error creating container: {e}"
 
     def upload_expert(self, container_id: str, file_path: str) -> Optional[str]:
         """Uploads an .ex5 or .mq5 file to the container's Expert folder."""
+        try:
+            return self.upload_bundle(container_id, bundle_entries([file_path]))
+        except Exception as e:
+            return f"Error uploading file: {e}"
+
+    def upload_bundle(self, container_id: str, entries: List[BundleEntry]) -> Optional[str]:
+        """Uploads the files of a bundle (see bundle_entries) below the MQL5 folder.
+        The tar is streamed to Docker in chunks (chunked transfer encoding)."""
         if not self.client:
             return "Docker client not connected"
 
         try:
-            container = self.client.containers.get(container_id)
-            
-            # Create a tar archive in memory
-            file_name = os.path.basename(file_path)
-            file_data = open(file_path, 'rb').read()
-            
-            tar_stream = io.BytesIO()
-            with tarfile.open(fileobj=tar_stream, mode='w') as tar:
-                tar_info = tarfile.TarInfo(name=file_name)
-                tar_info.size = len(file_data)
-                tar.addfile(tar_info, io.BytesIO(file_data))
-            
-            tar_stream.seek(0)
-            
-            # Destination path in the container
-            # Based on research: /config/MQL5/Experts/
-            dest_path = "/config/MQL5/Experts/"
-            
-            container.put_archive(
-                path=dest_path,
-                data=tar_stream
-            )
+            container = self._container(container_id)
+            container.put_archive(path=MQL5_DIR, data=tar_stream(entries))
             
             # Optional: Restart container to load the EA?
             # container.restart() 
@@ -130,9 +535,10 @@ class DockerService:
             return "Docker client not connected"
 
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             container.stop()
             container.remove()
+            self.handles.invalidate(container_id)
             return None
         except Exception as e:
             return f"Error removing container: {e}"
@@ -143,11 +549,12 @@ class DockerService:
             return ["Docker client not connected"]
         
         errors = []
-        containers = self.list_mt5_containers()
+        containers = self.list_mt5_containers() or []
         for c in containers:
             try:
                 # Force kill for immediate stop
                 c['obj'].kill()
+                self.handles.invalidate(c['id'])
             except Exception as e:
                 errors.append(f"Failed to kill {c['name']}: {e}")
         return errors
@@ -158,8 +565,9 @@ class DockerService:
             return "Docker client not connected"
         
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             container.stop(timeout=30)
+            self.handles.invalidate(container_id)
             return None
         except Exception as e:
             return f"Error stopping container: {e}"
@@ -170,103 +578,78 @@ class DockerService:
             return "Docker client not connected"
         
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             container.start()
+            self.handles.invalidate(container_id)
             return None
         except Exception as e:
             return f"Error starting container: {e}"
 
+    def pause_container(self, container_id: str) -> Optional[str]:
+        """Freezes a running container's processes; memory stays allocated."""
+        if not self.client:
+            return "Docker client not connected"
+
+        try:
+            self._container(container_id).pause()
+            self.handles.invalidate(container_id)
+            return None
+        except Exception as e:
+            return f"Error pausing container: {e}"
+
+    def unpause_container(self, container_id: str) -> Optional[str]:
+        if not self.client:
+            return "Docker client not connected"
+
+        try:
+            self._container(container_id).unpause()
+            self.handles.invalidate(container_id)
+            return None
+        except Exception as e:
+            return f"Error unpausing container: {e}"
+
     def restart_container(self, container_id: str) -> Optional[str]:
         """Restarts a container."""
         if not self.client:
             return "Docker client not connected"
         
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             container.restart(timeout=30)
+            self.handles.invalidate(container_id)
             return None
         except Exception as e:
             return f"Error restarting container: {e}"
 
+    def update_container_limits(self, container_id: str, limits: Dict) -> Optional[str]:
+        """Changes the CPU and memory limits of a container in place (no restart)."""
+        if not self.client:
+            return "Docker client not connected"
+
+        try:
+            container = self._container(container_id)
+            container.update(**{LIMIT_KWARGS[key]: value for key, value in limits_host_config(limits).items()})
+            self.handles.invalidate(container_id)
+            return None
+        except Exception as e:
+            return f"Error updating limits: {e}"
+
     def get_container_stats(self, container_id: str) -> Dict:
         """Returns CPU%, Memory usage, and Uptime for a container."""
         if not self.client:
             return {"error": "Docker client not connected"}
         
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             
-            # Get container info for uptime
-            info = container.attrs
-            started_at = info.get('State', {}).get('StartedAt', '')
-            
-            # Calculate uptime
-            uptime_str = "N/A"
-            if started_at and container.status == 'running':
-                from datetime import datetime, timezone
-                # Parse ISO format with timezone
-                started_at = started_at.replace('Z', '+00:00')
-                try:
-                    start_time = datetime.fromisoformat(started_at[:26] + '+00:00')
-                    now = datetime.now(timezone.utc)
-                    delta = now - start_time
-                    
-                    days = delta.days
-                    hours, remainder = divmod(delta.seconds, 3600)
-                    minutes, _ = divmod(remainder, 60)
-                    
-                    if days > 0:
-                        uptime_str = f"{days}d {hours}h"
-                    elif hours > 0:
-                        uptime_str = f"{hours}h {minutes}m"
-                    else:
-                        uptime_str = f"{minutes}m"
-                except:
-                    uptime_str = "N/A"
-            
-            # Get stats (non-streaming for quick snapshot)
             if container.status != 'running':
-                return {
-                    "cpu_percent": 0.0,
-                    "memory_mb": 0,
-                    "memory_percent": 0.0,
-                    "uptime": "Stopped"
-                }
-            
-            stats = container.stats(stream=False)
+                return dict(STOPPED_STATS)
             
-            # Calculate CPU percentage
-            cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
-                       stats['precpu_stats']['cpu_usage']['total_usage']
-            system_delta = stats['cpu_stats']['system_cpu_usage'] - \
-                          stats['precpu_stats']['system_cpu_usage']
-            
-            cpu_percent = 0.0
-            if system_delta > 0:
-                num_cpus = stats['cpu_stats'].get('online_cpus', 1) or 1
-                cpu_percent = (cpu_delta / system_delta) * num_cpus * 100.0
-            
-            # Calculate memory
-            memory_usage = stats['memory_stats'].get('usage', 0)
-            memory_limit = stats['memory_stats'].get('limit', 1)
-            memory_mb = memory_usage / (1024 * 1024)
-            memory_percent = (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0
-            
-            return {
-                "cpu_percent": round(cpu_percent, 1),
-                "memory_mb": round(memory_mb, 0),
-                "memory_percent": round(memory_percent, 1),
-                "uptime": uptime_str
-            }
+            # Non-streaming for a quick snapshot
+            return usage_stats(container.stats(stream=False), format_uptime(container.attrs))
             
         except Exception as e:
-            return {
-                "cpu_percent": 0.0,
-                "memory_mb": 0,
-                "memory_percent": 0.0,
-                "uptime": "Error",
-                "error": str(e)
-            }
+            return stats_error(e)
 
     def get_log_list(self, container_id: str, log_type: str) -> List[str]:
         """
@@ -277,32 +660,20 @@ class DockerService:
             return []
 
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             
-            # Determine path based on type
-            # Experts: /config/MQL5/Logs/
-            # Journal: /config/Logs/
-            if log_type == 'experts':
-                path = "/config/MQL5/Logs/"
-            elif log_type == 'journal':
-                path = "/config/Logs/"
-            else:
+            path = LOG_DIRS.get(log_type)
+            if path is None:
                 return []
             
             # Execute ls command
-            cmd = f"ls -1 {path}"
-            result = container.exec_run(cmd)
+            result = container.exec_run(f"ls -1 {path}")
             
             if result.exit_code != 0:
                 print(f"Error listing logs: {result.output.decode('utf-8')}")
                 return []
-                
-            files = result.output.decode('utf-8').splitlines()
-            # Filter for .log files and sort descending (newest first)
-            log_files = [f for f in files if f.endswith('.log')]
-            log_files.sort(reverse=True)
             
-            return log_files
+            return log_files(result.output)
 
         except Exception as e:
             print(f"Error getting log list: {e}")
@@ -314,65 +685,86 @@ class DockerService:
             return "Docker client not connected"
 
         try:
-            container = self.client.containers.get(container_id)
+            container = self._container(container_id)
             
-            if log_type == 'experts':
-                path = f"/config/MQL5/Logs/{filename}"
-            elif log_type == 'journal':
-                path = f"/config/Logs/{filename}"
-            else:
+            if log_type not in LOG_DIRS:
                 return "Invalid log type"
             
-            # Read file using cat
-            # output is bytes
-            cmd = f"cat {path}"
-            result = container.exec_run(cmd)
+            # Read file using cat; output is bytes
+            result = container.exec_run(f"cat {LOG_DIRS[log_type]}{filename}")
              
             if result.exit_code != 0:
                 return f"Error reading file: {result.output.decode('utf-8', errors='ignore')}"
             
-            # MT5 logs are typically UTF-16 LE, but sometimes they might be simple ASCII/UTF-8 depending on wine/linux Setup.
-            # However, standard MT5 on Windows writes UTF-16.
-            # Let's try attempting to decode as utf-16 first, then utf-8.
-            raw_data = result.output
-            
-            try:
-                # Try UTF-16 first (common for MT5)
-                # UTF-16 logs often start with BOM \xff\xfe
-                content = raw_data.decode('utf-16')
-            except UnicodeDecodeError:
-                try:
-                    content = raw_data.decode('utf-8')
-                except UnicodeDecodeError:
-                    content = raw_data.decode('utf-8', errors='replace')
-            
-            return content
+            return decode_log(result.output)
 
         except Exception as e:
             return f"Error reading log content: {e}"
 
-    def get_next_available_ports(self, start_vnc=3000, start_api=8001) -> tuple[int, int]:
-        """Calculates the next available ports based on existing containers."""
-        containers = self.list_mt5_containers()
-        
-        used_vnc = set()
-        used_api = set()
-        
-        for c in containers:
-            if c['vnc_port'] != "N/A":
-                used_vnc.add(int(c['vnc_port']))
-            if c['api_port'] != "N/A":
-                used_api.add(int(c['api_port']))
-        
-        # Find next free VNC
-        vnc = start_vnc
-        while vnc in used_vnc:
-            vnc += 1
-            
-        # Find next free API
-        api = start_api
-        while api in used_api:
-            api += 1
-            
-        return vnc, api
+    def read_journal_tail(self, container_id: str, lines: int = JOURNAL_TAIL_LINES) -> str:
+        """Last lines of the newest Journal log. Reads through the archive API, which
+        works on stopped containers too (exec does not)."""
+        from docker.errors import NotFound
+
+        if not self.client:
+            return "Docker client not connected"
+        try:
+            container = self._container(container_id)
+            for name in journal_files():
+                try:
+                    bits, _ = container.get_archive(LOG_DIRS["journal"] + name)
+                except NotFound:
+                    continue
+                return tail_lines(decode_log(archive_file(b"".join(bits))), lines)
+            return "No Journal log found"
+        except Exception as e:
+            return f"Error reading journal: {e}"
+
+    def exec_command(self, container_id: str, cmd: List[str], user: str = "") -> Dict:
+        """Runs a command in a running container: {"exit_code", "output"} or {"error"}."""
+        if not self.client:
+            return {"error": "Docker client not connected"}
+        try:
+            result = self._container(container_id).exec_run(cmd, user=user)
+            return {"exit_code": result.exit_code, "output": result.output}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def download_file(self, container_id: str, path: str) -> Dict:
+        """Reads one file through the archive API: {"data"} or {"error"}."""
+        from docker.errors import NotFound
+
+        if not self.client:
+            return {"error": "Docker client not connected"}
+        try:
+            bits, _ = self._container(container_id).get_archive(path)
+            return {"data": archive_file(b"".join(bits))}
+        except NotFound:
+            return {"error": f"{path} not found"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def export_config(self, container_id: str, consume: Callable[[io.RawIOBase], Any]) -> Dict:
+        """Streams a tar of the /config volume into consume(file object), in this thread.
+        Returns {"result": what consume returned} or {"error"}. Works on stopped containers too."""
+        if not self.client:
+            return {"error": "Docker client not connected"}
+        try:
+            chunks, _ = self._container(container_id).get_archive(CONFIG_DIR, chunk_size=UPLOAD_CHUNK)
+            return {"result": consume(ChunkReader(chunks))}
+        except Exception as e:
+            return {"error": f"Error exporting {CONFIG_DIR}: {e}"}
+
+    def get_host_info(self) -> Dict:
+        """CPUs and memory of the Docker host."""
+        if not self.client:
+            return {"error": "Docker client not connected"}
+        try:
+            info = self.client.info()
+            return {"cpus": info.get("NCPU", 0), "memory_bytes": info.get("MemTotal", 0)}
+        except Exception as e:
+            return {"error": str(e)}
 
+    def get_next_available_ports(self, start_vnc=3000, start_api=8001, reserved=()) -> tuple[int, int]:
+        """Calculates the next available ports based on existing containers and reserved (vnc, api) pairs."""
+        return next_free_ports(self.list_mt5_containers() or [], start_vnc, start_api, reserved)
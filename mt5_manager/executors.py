@@ -0,0 +1,129 @@
+"""
+Executors - Bounded worker pools per workload class.
+Blocking calls used to share asyncio's default thread pool, so a wave of slow
+stats calls or a bulk upload could queue ahead of a user's stop/start click.
+Each workload class now has its own pool, and coroutine calls (the asyncio
+Docker client) are bounded by the same sizes, so background work can never
+take every worker or Docker connection:
+
+    interactive  actions started by a user (lifecycle, logs, drawer data)
+    stats        fleet refresh: Docker list and stats
+    io           uploads, file and database writes
+    api          background MT5 API polling
+    snapshot     /config captures, which hold a worker for the whole stream
+
+Sizes are set in WORKLOADS and can be overridden with MT5_EXECUTORS, e.g.
+MT5_EXECUTORS="stats=8,api=64".
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import metrics
+
+WORKLOADS = {"interactive": 8, "stats": 32, "io": 4, "api": 32, "snapshot": 2}
+
+_current: contextvars.ContextVar[Optional["Workload"]] = contextvars.ContextVar("workload", default=None)
+
+
+class Workload:
+    """A thread pool plus an equally sized limit for coroutine calls."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.waiting = 0  # coroutine calls waiting for a slot
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f"mt5-{self.name}")
+        return self._pool
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop; asyncio.run in a loop (benchmarks) makes new ones
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.size), loop
+        return self._slots
+
+    def queue_depth(self) -> int:
+        return self.waiting + (self._pool._work_queue.qsize() if self._pool else 0)
+
+    async def run(self, func, *args):
+        if inspect.iscoroutinefunction(func):
+            self.waiting += 1
+            try:
+                slots = self.slots
+                await slots.acquire()
+            finally:
+                self.waiting -= 1
+            token = _current.set(self)
+            try:
+                return await func(*args)
+            finally:
+                _current.reset(token)
+                slots.release()
+        # Like asyncio.to_thread, the call sees the caller's context (tracing spans)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.pool, functools.partial(context.run, func, *args))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class Executors:
+    """The workload classes by name."""
+
+    def __init__(self, sizes: Dict[str, int]):
+        self.workloads = {name: Workload(name, size) for name, size in sizes.items()}
+        for workload in self.workloads.values():
+            metrics.EXECUTOR_QUEUE_DEPTH.labels(workload.name).set_function(workload.queue_depth)
+
+    async def run(self, workload: str, func, *args):
+        """Runs a sync function in the workload's pool, or awaits a coroutine function within its limit."""
+        return await self.workloads[workload].run(func, *args)
+
+    async def call(self, func, *args):
+        """For services that wrap other services: runs func in the caller's workload class.
+        Coroutine functions are awaited directly (the caller already holds a slot), sync
+        ones run in the caller's pool, or the interactive pool outside any workload."""
+        if inspect.iscoroutinefunction(func):
+            return await func(*args)
+        workload = _current.get() or self.workloads["interactive"]
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            workload.pool, functools.partial(context.run, func, *args))
+
+    def shutdown(self):
+        for workload in self.workloads.values():
+            workload.shutdown()
+
+
+def _sizes_from_env() -> Dict[str, int]:
+    sizes = dict(WORKLOADS)
+    for item in filter(None, os.environ.get("MT5_EXECUTORS", "").split(",")):
+        name, _, size = item.partition("=")
+        name = name.strip()
+        if name not in sizes:
+            print(f"Unknown workload '{name}' in MT5_EXECUTORS; expected one of {', '.join(WORKLOADS)}")
+            continue
+        try:
+            sizes[name] = max(1, int(size))
+        except ValueError:
+            print(f"Invalid size '{size}' for workload '{name}' in MT5_EXECUTORS")
+    return sizes
+
+
+executors = Executors(_sizes_from_env())
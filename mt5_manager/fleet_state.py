@@ -0,0 +1,254 @@
+"""
+Fleet State - Single shared, server-side model of the MT5 fleet.
+The Docker work runs once per tick no matter how many dashboard tabs are open;
+each tab subscribes and receives only the containers and fields that changed.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import metrics
+from executors import executors
+from tracing import tracer
+
+# Fields copied from DockerService results into the shared records
+CONTAINER_FIELDS = ("id", "name", "status", "vnc_port", "api_port", "labels", "restart_count", "host", "address",
+                    "cpu_limit", "cpuset", "cpu_shares", "memory_limit_mb", "exit_code", "oom_killed")
+STATS_FIELDS = ("cpu_percent", "memory_mb", "uptime")
+
+
+@dataclass
+class FleetUpdate:
+    """What changed between two refreshes."""
+    added: List[Dict] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: Dict[str, Dict] = field(default_factory=dict)
+    connection_changed: bool = False
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.connection_changed)
+
+
+class FleetState:
+    """Holds the latest container records and notifies subscribed views of changes."""
+
+    def __init__(self, docker_service, mt5_api=None, interval: float = 10.0):
+        self.docker_service = docker_service
+        self.mt5_api = mt5_api
+        self.interval = interval
+        self.containers: Dict[str, Dict] = {}
+        self.docker_connected = True
+        self.is_loading = False
+        self.restored = False  # showing saved state until the first refresh reconciles it
+        self.last_updated: Optional[datetime] = None
+        self._listeners: List[Callable[[FleetUpdate], None]] = []
+        self._lock = asyncio.Lock()
+        self._pending: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._servers: Dict[str, str] = {}  # container id -> account server, looked up once per start
+        self._watched: Dict[object, Set[str]] = {}  # viewer -> container ids it has on screen
+        self._stats_tasks: Set[asyncio.Task] = set()  # strong references until they finish
+        self._servers_task: Optional[asyncio.Task] = None
+
+    # --- Subscriptions ---
+
+    def subscribe(self, listener: Callable[[FleetUpdate], None]):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[FleetUpdate], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def watch(self, viewer, ids: Iterable[str]):
+        """Sets the containers a viewer has on screen. Stats are only polled for watched containers."""
+        before = self.watched_ids()
+        self._watched[viewer] = set(ids)
+        new = self.watched_ids() - before
+        if new and self.last_updated is not None:
+            # Fill in stats for newly shown cards now rather than on the next tick
+            task = asyncio.get_running_loop().create_task(self._refresh_stats(new))
+            self._stats_tasks.add(task)
+            task.add_done_callback(self._stats_tasks.discard)
+
+    def unwatch(self, viewer):
+        self._watched.pop(viewer, None)
+
+    def watched_ids(self) -> Set[str]:
+        return set().union(*self._watched.values())
+
+    def running(self) -> List[Dict]:
+        return [c for c in self.containers.values() if "running" in c["status"].lower()]
+
+    def restore(self, records: List[Dict], saved_at: float):
+        """Seeds the state from a saved snapshot; the first refresh diffs Docker against it."""
+        if self.last_updated is not None:
+            return
+        for record in records:
+            # Saved before multi-host support
+            record.setdefault("host", "local")
+            record.setdefault("address", "localhost")
+        self.containers = {r["id"]: r for r in records}
+        self._servers = {r["id"]: r["server"] for r in records if r.get("server")}
+        self.last_updated = datetime.fromtimestamp(saved_at)
+        self.restored = True
+
+    # --- Refresh ---
+
+    def start(self):
+        """Starts the periodic refresh loop (call from the running event loop)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing fleet state: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self):
+        """Refreshes the shared state. Calls made while a refresh is running share one follow-up refresh."""
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._refresh_after_current())
+        await asyncio.shield(self._pending)
+
+    async def _refresh_after_current(self):
+        async with self._lock:
+            self._pending = None
+            with metrics.REFRESH_SECONDS.labels("fleet").time(), tracer.span("fleet.refresh"):
+                records = await self._fetch()
+                update = self._apply(records)
+            self.last_updated = datetime.now()
+            if records is not None:
+                self.restored = False
+            # Views are notified even without changes so their "last updated" label moves
+            self._notify(update)
+        if self.mt5_api is not None and self._servers_task is None:
+            # Server names only feed search; look them up after the containers are shown
+            self._servers_task = asyncio.get_running_loop().create_task(self._lookup_servers())
+
+    async def _fetch(self) -> Optional[List[Dict]]:
+        self.is_loading = True
+        try:
+            # A sync DockerService connects by importing docker and pinging; keep that off the loop
+            if not await executors.run("stats", self.docker_service.connect):
+                return None
+            containers = await executors.run("stats", self.docker_service.list_mt5_containers)
+            if containers is None:
+                return None
+            records = []
+            for c in containers:
+                record = {key: c[key] for key in CONTAINER_FIELDS}
+                record.update(dict.fromkeys(STATS_FIELDS))
+                records.append(record)
+            metrics.record_containers(records)
+
+            running = [r for r in records if "running" in r["status"].lower()]
+            watched = self.watched_ids()
+            await self._fetch_stats([r for r in running if r["id"] in watched])
+            for record in running:
+                if record["id"] not in watched:
+                    metrics.forget_container_stats(record["name"])
+
+            running_ids = {r["id"] for r in running}
+            for cid in [cid for cid in self._servers if cid not in running_ids]:
+                del self._servers[cid]
+            for record in records:
+                record["server"] = self._servers.get(record["id"], "")
+            return records
+        except Exception as e:
+            print(f"Error fetching containers: {e}")
+            return None
+        finally:
+            self.is_loading = False
+
+    async def _fetch_stats(self, records: List[Dict]):
+        stats = await asyncio.gather(*(executors.run("stats", self.docker_service.get_container_stats, r["id"])
+                                       for r in records))
+        for record, s in zip(records, stats):
+            metrics.record_container_stats(record["name"], s)
+            for key in STATS_FIELDS:
+                record[key] = s.get(key)
+
+    async def _refresh_stats(self, ids: Set[str]):
+        """Fetches stats for just the given containers and notifies views of the changes."""
+        try:
+            async with self._lock:
+                records = [dict(self.containers[cid]) for cid in ids
+                           if cid in self.containers and "running" in self.containers[cid]["status"].lower()]
+                if not records:
+                    return
+                with tracer.span("fleet.refresh_stats", containers=len(records)):
+                    await self._fetch_stats(records)
+                update = FleetUpdate()
+                for record in records:
+                    previous = self.containers[record["id"]]
+                    changed = {k: v for k, v in record.items() if previous.get(k) != v}
+                    if changed:
+                        self.containers[record["id"]] = record
+                        update.changed[record["id"]] = changed
+                if update:
+                    self._notify(update)
+        except Exception as e:
+            print(f"Error refreshing stats: {e}")
+
+    async def _lookup_servers(self):
+        """Caches the MT5 account server of running instances that have none yet, for search."""
+        try:
+            missing = [r for r in self.running() if r["id"] not in self._servers and r["api_port"] != "N/A"]
+            if not missing:
+                return
+            results = await asyncio.gather(*(executors.run("api", self.mt5_api.get_account_info, r["address"], r["api_port"])
+                                             for r in missing))
+            update = FleetUpdate()
+            async with self._lock:
+                for record, result in zip(missing, results):
+                    if not result.get("success"):
+                        continue
+                    server = self._servers[record["id"]] = result.get("server", "")
+                    current = self.containers.get(record["id"])
+                    if current is not None and current.get("server") != server:
+                        self.containers[record["id"]] = dict(current, server=server)
+                        update.changed[record["id"]] = {"server": server}
+            if update:
+                self._notify(update)
+        finally:
+            self._servers_task = None
+
+    def _apply(self, records: Optional[List[Dict]]) -> FleetUpdate:
+        update = FleetUpdate()
+        connected = records is not None
+        if connected != self.docker_connected:
+            self.docker_connected = connected
+            update.connection_changed = True
+        if records is None:
+            return update  # unreachable: the containers are unknown, not removed
+
+        current = {}
+        for record in records:
+            cid = record["id"]
+            current[cid] = record
+            previous = self.containers.get(cid)
+            if previous is None:
+                update.added.append(record)
+                continue
+            changed = {k: v for k, v in record.items() if previous.get(k) != v}
+            if changed:
+                update.changed[cid] = changed
+        update.removed = [cid for cid in self.containers if cid not in current]
+        self.containers = current
+        return update
+
+    def _notify(self, update: FleetUpdate):
+        for listener in list(self._listeners):
+            try:
+                listener(update)
+            except Exception as e:
+                print(f"Error updating fleet view: {e}")
@@ -0,0 +1,284 @@
+"""
+Hibernation - Puts idle MT5 instances to sleep and wakes them before their session.
+An instance is idle when it has no open positions or pending orders and its
+CPU stayed under idle_cpu for idle_minutes. Idle instances outside their
+trading sessions (or idle at all, with the "idle" policy) are hibernated:
+
+    stop   docker stop; frees CPU and RAM. The terminal's state lives in the
+           /config volume, so waking is a start plus the MT5 login.
+    pause  docker pause; frees CPU only, but wakes almost instantly.
+
+Sleeping instances are woken resume_lead minutes before their next session, or
+on demand from the dashboard. Resume latency (wake call until the MT5 API
+answers) is recorded in mt5_manager_resume_seconds.
+
+The policy comes from container labels, set when the instance is created:
+
+    mt5.sessions   trading windows, e.g. "mon-fri 07:00-21:00; sun 22:00-24:00"
+    mt5.hibernate  "sessions" to sleep outside the sessions only, "idle" to also
+                   sleep on inactivity alone, "off" to never sleep
+
+Without mt5.hibernate, MT5_HIBERNATE applies (default "sessions", so only
+instances with sessions ever sleep). Session times are
+in MT5_SESSION_TZ (default UTC); MT5_HIBERNATE_MODE picks stop or pause.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import metrics
+from executors import executors
+from state_store import state_store
+
+SESSIONS_LABEL = "mt5.sessions"
+POLICY_LABEL = "mt5.hibernate"
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+Window = Tuple[FrozenSet[int], int, int]  # weekdays, start and end minute of the day
+
+
+def parse_sessions(spec: str) -> List[Window]:
+    """Windows from "mon-fri 07:00-21:00; sat 08:00-12:00". Days are optional (every day);
+    a window that ends before it starts runs past midnight."""
+    windows = []
+    for part in filter(None, (p.strip() for p in spec.lower().split(";"))):
+        days_spec, _, times = part.rpartition(" ")
+        days = set()
+        for item in filter(None, days_spec.replace(" ", "").split(",")):
+            first, _, last = item.partition("-")
+            start, end = DAYS.index(first[:3]), DAYS.index((last or first)[:3])
+            days.update(range(start, end + 1) if start <= end else [*range(start, 7), *range(end + 1)])
+        opens, _, closes = times.partition("-")
+        windows.append((frozenset(days or range(7)), _minutes(opens), _minutes(closes)))
+    return windows
+
+
+def _minutes(clock: str) -> int:
+    hours, _, minutes = clock.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def in_session(windows: List[Window], when: datetime) -> bool:
+    minute = when.hour * 60 + when.minute
+    day = when.weekday()
+    for days, start, end in windows:
+        if start < end:
+            if day in days and start <= minute < end:
+                return True
+        elif (day in days and minute >= start) or ((day - 1) % 7 in days and minute < end):
+            return True
+    return False
+
+
+@dataclass
+class Policy:
+    sessions: List[Window]
+    idle: bool  # hibernate on inactivity alone, even without sessions
+
+
+class Hibernator:
+    """Watches the fleet once per interval, hibernating idle instances and waking due ones."""
+
+    def __init__(self, default_policy: str = "sessions", mode: str = "stop", idle_minutes: float = 30.0,
+                 idle_cpu: float = 2.0, resume_lead: float = 10.0, interval: float = 60.0,
+                 resume_timeout: float = 300.0, tz: str = "UTC"):
+        self.default_policy = default_policy
+        self.mode = mode if mode in ("stop", "pause") else "stop"
+        self.idle_minutes = idle_minutes
+        self.idle_cpu = idle_cpu  # percent
+        self.resume_lead = resume_lead  # minutes before a session
+        self.interval = interval
+        self.resume_timeout = resume_timeout
+        self.tz = ZoneInfo(tz)
+        self.sleeping: Dict[str, Dict] = {}  # container id -> hibernation record
+        self.waking: Dict[str, asyncio.Task] = {}
+        self.last_resume: Dict[str, float] = {}  # instance name -> seconds of the last wake
+        self._idle_since: Dict[str, float] = {}
+        self._fleet = None
+        self._portfolio = None
+        self._task: Optional[asyncio.Task] = None
+        metrics.HIBERNATED_INSTANCES.set_function(lambda: len(self.sleeping))
+
+    def start(self, fleet, portfolio):
+        """Loads sleeping instances and starts the watch loop (call from the running event loop)."""
+        self._fleet = fleet
+        self._portfolio = portfolio
+        self.sleeping = {h["container_id"]: h for h in state_store.hibernated()}
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def policy(self, record: Dict) -> Optional[Policy]:
+        labels = record.get("labels") or {}
+        name = labels.get(POLICY_LABEL, self.default_policy)
+        if name == "off":
+            return None
+        sessions = labels.get(SESSIONS_LABEL)
+        try:
+            windows = parse_sessions(sessions) if sessions else []
+        except (ValueError, IndexError):
+            print(f"Invalid {SESSIONS_LABEL} '{sessions}' on {record['name']}")
+            return None
+        if not windows and name != "idle":
+            return None
+        return Policy(windows, name == "idle")
+
+    def is_sleeping(self, container_id: str) -> bool:
+        return container_id in self.sleeping
+
+    # --- Loop ---
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Error in hibernation check: {e}")
+
+    async def tick(self):
+        now = datetime.now(self.tz)
+        soon = now + timedelta(minutes=self.resume_lead)
+        checks = []
+        for record in list(self._fleet.containers.values()):
+            cid = record["id"]
+            status = record["status"].lower()
+            if cid in self.sleeping:
+                if "running" in status:
+                    await self._forget(cid)  # started by someone else
+                    continue
+                policy = self.policy(record)
+                if policy and policy.sessions and in_session(policy.sessions, soon) and cid not in self.waking:
+                    self.wake(cid, "session")
+                continue
+            policy = self.policy(record)
+            if (policy is None or "running" not in status
+                    or in_session(policy.sessions, now) or in_session(policy.sessions, soon)):
+                self._idle_since.pop(cid, None)
+                continue
+            checks.append(self._check(record, "session" if policy.sessions else "idle"))
+        await asyncio.gather(*checks)
+        for cid in [cid for cid in self._idle_since if cid not in self._fleet.containers]:
+            del self._idle_since[cid]
+        if not self._fleet.restored:
+            for cid in [cid for cid in self.sleeping if cid not in self._fleet.containers]:
+                await self._forget(cid)  # removed while asleep
+
+    async def _check(self, record: Dict, reason: str):
+        """Hibernates an instance once it has been idle for idle_minutes."""
+        cid = record["id"]
+        if not await self._quiet(record):
+            self._idle_since.pop(cid, None)
+            return
+        since = self._idle_since.setdefault(cid, time.time())
+        if time.time() - since < self.idle_minutes * 60:
+            return
+        # Confirm with the terminal itself right before sleeping
+        if await self._trading(record):
+            self._idle_since.pop(cid, None)
+            return
+        await self.hibernate(record, reason)
+
+    async def _quiet(self, record: Dict) -> bool:
+        """Low CPU and no open positions in the last portfolio poll."""
+        snapshot = self._portfolio.accounts.get(record["id"])
+        if snapshot is not None and snapshot.positions.records:
+            return False
+        stats = await executors.run("stats", self._fleet.docker_service.get_container_stats, record["id"])
+        return "error" not in stats and (stats.get("cpu_percent") or 0.0) < self.idle_cpu
+
+    async def _trading(self, record: Dict) -> bool:
+        """Whether the terminal has positions or pending orders (or cannot tell)."""
+        mt5_api = self._fleet.mt5_api
+        if record["api_port"] == "N/A":
+            return False
+        positions, orders = await asyncio.gather(
+            executors.run("api", mt5_api.get_positions, record["address"], record["api_port"]),
+            executors.run("api", mt5_api.get_orders, record["address"], record["api_port"]))
+        if not positions.get("success") or not orders.get("success"):
+            return True  # unknown: stay awake
+        return bool(positions["count"] or orders["count"])
+
+    # --- Sleep and wake ---
+
+    async def hibernate(self, record: Dict, reason: str) -> Optional[str]:
+        docker_service = self._fleet.docker_service
+        action = docker_service.pause_container if self.mode == "pause" else docker_service.stop_container
+        err = await executors.run("interactive", action, record["id"])
+        if err:
+            print(f"Error hibernating {record['name']}: {err}")
+            return err
+        entry = {"container_id": record["id"], "name": record["name"], "mode": self.mode,
+                 "reason": reason, "since": time.time()}
+        self.sleeping[record["id"]] = entry
+        self._idle_since.pop(record["id"], None)
+        metrics.HIBERNATIONS.labels(reason).inc()
+        await executors.run("io", state_store.set_hibernated, *entry.values())
+        print(f"Hibernated {record['name']} ({self.mode}, {reason})")
+        await self._fleet.refresh()
+        return None
+
+    def wake(self, container_id: str, reason: str = "manual") -> asyncio.Task:
+        """Wakes a sleeping instance in the background; the task's result is an error or None."""
+        task = self.waking.get(container_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._wake(container_id, reason))
+            self.waking[container_id] = task
+            task.add_done_callback(lambda _: self.waking.pop(container_id, None))
+        return task
+
+    async def _wake(self, container_id: str, reason: str) -> Optional[str]:
+        entry = self.sleeping.get(container_id)
+        if entry is None:
+            return None
+        docker_service = self._fleet.docker_service
+        started = time.perf_counter()
+        action = docker_service.unpause_container if entry["mode"] == "pause" else docker_service.start_container
+        err = await executors.run("interactive", action, container_id)
+        if err:
+            print(f"Error waking {entry['name']}: {err}")
+            return err
+        await self._forget(container_id)
+        await self._fleet.refresh()
+        elapsed = await self._wait_for_api(container_id, started)
+        if elapsed is not None:
+            metrics.RESUME_SECONDS.labels(entry["mode"]).observe(elapsed)
+            self.last_resume[entry["name"]] = elapsed
+            print(f"Woke {entry['name']} ({reason}) in {elapsed:.1f}s")
+        return None
+
+    async def _wait_for_api(self, container_id: str, started: float) -> Optional[float]:
+        """Seconds until the instance's MT5 API answers, or None after resume_timeout."""
+        while time.perf_counter() - started < self.resume_timeout:
+            record = self._fleet.containers.get(container_id)
+            if record is not None and record["api_port"] != "N/A":
+                result = await executors.run("api", self._fleet.mt5_api.get_account_info,
+                                             record["address"], record["api_port"])
+                if result.get("success"):
+                    return time.perf_counter() - started
+            await asyncio.sleep(0.5)
+            if record is None or record["api_port"] == "N/A":
+                await self._fleet.refresh()  # ports are published once the container runs
+        return None
+
+    async def _forget(self, container_id: str):
+        self.sleeping.pop(container_id, None)
+        await executors.run("io", state_store.clear_hibernated, container_id)
+
+
+hibernator = Hibernator(
+    default_policy=os.environ.get("MT5_HIBERNATE", "sessions"),
+    mode=os.environ.get("MT5_HIBERNATE_MODE", "stop"),
+    idle_minutes=float(os.environ.get("MT5_IDLE_MINUTES", "30")),
+    idle_cpu=float(os.environ.get("MT5_IDLE_CPU", "2")),
+    resume_lead=float(os.environ.get("MT5_RESUME_LEAD", "10")),
+    tz=os.environ.get("MT5_SESSION_TZ", "UTC"),
+)
@@ -0,0 +1,329 @@
+"""
+Hosts - The Docker engines the manager drives, as one fleet-wide Docker service.
+Every host gets its own service (the asyncio client for unix:// and tcp://,
+docker-py for ssh://). FleetDockerService fans list, stats and kill-all out
+across hosts concurrently, routes per-container calls to the host that owns
+the container, and places new instances on the least-loaded host that has
+room for their scheduler profile.
+
+Hosts come from MT5_DOCKER_HOSTS: a JSON file with a list of Host fields, or
+an inline list of name=url pairs:
+
+    MT5_DOCKER_HOSTS="local=unix:///var/run/docker.sock,eu1=tcp://10.0.0.5:2376,eu2=ssh://trader@10.0.0.6"
+
+Without it, the engine from DOCKER_HOST is the only host, named "local".
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import orjson
+
+from async_docker import AsyncDockerClient, AsyncDockerService
+from docker_service import JOURNAL_TAIL_LINES, BundleEntry, DockerService, next_free_ports
+from executors import executors
+from scheduler import scheduler
+
+REMOTE_SCHEMES = ("tcp", "ssh", "http", "https")
+
+
+@dataclass
+class Host:
+    name: str
+    url: Optional[str] = None  # None: DOCKER_HOST, like the docker CLI
+    address: str = ""  # where published VNC/API ports are reachable; defaults to the url's hostname
+    cert_path: Optional[str] = None  # TLS client certificates (ca.pem, cert.pem, key.pem) for tcp://
+    max_instances: Optional[int] = None  # placement skips the host once it runs this many
+
+    def __post_init__(self):
+        if not self.address:
+            url = urlparse(self.url or "")
+            self.address = url.hostname if url.scheme in REMOTE_SCHEMES and url.hostname else "localhost"
+
+
+def load_hosts(spec: str) -> List[Host]:
+    """Hosts from a JSON file path or an inline "name=url,name=url" list."""
+    if os.path.isfile(spec):
+        with open(spec, "rb") as f:
+            return [Host(**raw) for raw in orjson.loads(f.read())]
+    hosts = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, url = item.partition("=")
+        if not sep or not name or not url:
+            raise ValueError(f"Expected name=url, got '{item}'")
+        hosts.append(Host(name.strip(), url.strip()))
+    return hosts
+
+
+def hosts_from_env() -> List[Host]:
+    spec = os.environ.get("MT5_DOCKER_HOSTS")
+    if spec:
+        try:
+            hosts = load_hosts(spec)
+            if hosts:
+                return hosts
+        except Exception as e:
+            print(f"Error loading Docker hosts from MT5_DOCKER_HOSTS: {e}; using DOCKER_HOST")
+    return [Host("local")]
+
+
+def service_for(host: Host):
+    """The asyncio service where the engine URL allows it, else the docker-py one."""
+    url = host.url or os.environ.get("DOCKER_HOST")
+    if os.environ.get("MT5_DOCKER_CLIENT", "async") == "sync" or not AsyncDockerClient.supports(url):
+        return DockerService(base_url=host.url, cert_path=host.cert_path, name=host.name, address=host.address)
+    return AsyncDockerService(url, cert_path=host.cert_path, name=host.name, address=host.address)
+
+
+class FleetDockerService:
+    """DockerService's methods across several Docker hosts. Records carry their host's name."""
+
+    def __init__(self, hosts: List[Host]):
+        self.hosts: Dict[str, Host] = {h.name: h for h in hosts}
+        self.services = {h.name: service_for(h) for h in hosts}
+        self.host_connected: Dict[str, bool] = dict.fromkeys(self.hosts, False)
+        self._records: Dict[str, List[Dict]] = {}  # last listed containers per host
+        self._owners: Dict[str, str] = {}  # container id -> host name
+
+    async def connect(self) -> bool:
+        """Connects every host; True if at least one is reachable."""
+        results = await asyncio.gather(*(executors.call(s.connect) for s in self.services.values()))
+        self.host_connected.update(zip(self.services, map(bool, results)))
+        return any(results)
+
+    async def close(self):
+        # One after another in this task: shutdown does not wait for tasks it did not start
+        for service in self.services.values():
+            await executors.call(service.close)
+
+    # --- Listing ---
+
+    async def list_mt5_containers(self) -> List[Dict]:
+        """Lists MT5 containers on all hosts concurrently. An unreachable host keeps its last known containers."""
+        await asyncio.gather(*(self._list_host(name) for name in self.services))
+        self._owners = {r["id"]: name for name, records in self._records.items() for r in records}
+        return [r for records in self._records.values() for r in records]
+
+    async def _list_host(self, name: str):
+        service = self.services[name]
+        records = None
+        if await executors.call(service.connect):
+            records = await executors.call(service.list_mt5_containers)
+        self.host_connected[name] = records is not None
+        if records is not None:
+            self._records[name] = records
+
+    async def _service(self, container_id: str):
+        name = self._owners.get(container_id[:12])
+        if name is None:
+            await self.list_mt5_containers()  # created since the last listing
+            name = self._owners.get(container_id[:12])
+        return self.services.get(name)
+
+    # --- Per-container calls, routed to the owning host ---
+
+    async def upload_expert(self, container_id: str, file_path: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.upload_expert, container_id, file_path)
+
+    async def upload_bundle(self, container_id: str, entries: List[BundleEntry]) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.upload_bundle, container_id, entries)
+
+    async def exec_command(self, container_id: str, cmd: List[str], user: str = "") -> Dict:
+        service = await self._service(container_id)
+        if service is None:
+            return {"error": f"Unknown container {container_id}"}
+        return await executors.call(service.exec_command, container_id, cmd, user)
+
+    async def download_file(self, container_id: str, path: str) -> Dict:
+        service = await self._service(container_id)
+        if service is None:
+            return {"error": f"Unknown container {container_id}"}
+        return await executors.call(service.download_file, container_id, path)
+
+    async def export_config(self, container_id: str, consume) -> Dict:
+        service = await self._service(container_id)
+        if service is None:
+            return {"error": f"Unknown container {container_id}"}
+        return await executors.call(service.export_config, container_id, consume)
+
+    async def remove_container(self, container_id: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.remove_container, container_id)
+
+    async def stop_container(self, container_id: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.stop_container, container_id)
+
+    async def start_container(self, container_id: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.start_container, container_id)
+
+    async def pause_container(self, container_id: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.pause_container, container_id)
+
+    async def unpause_container(self, container_id: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.unpause_container, container_id)
+
+    async def restart_container(self, container_id: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.restart_container, container_id)
+
+    async def update_container_limits(self, container_id: str, limits: Dict) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.update_container_limits, container_id, limits)
+
+    async def get_container_stats(self, container_id: str) -> Dict:
+        service = await self._service(container_id)
+        if service is None:
+            return {"error": f"Unknown container {container_id}"}
+        return await executors.call(service.get_container_stats, container_id)
+
+    async def get_log_list(self, container_id: str, log_type: str) -> List[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return []
+        return await executors.call(service.get_log_list, container_id, log_type)
+
+    async def read_log_content(self, container_id: str, log_type: str, filename: str) -> Optional[str]:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.read_log_content, container_id, log_type, filename)
+
+    async def read_journal_tail(self, container_id: str, lines: int = JOURNAL_TAIL_LINES) -> str:
+        service = await self._service(container_id)
+        if service is None:
+            return f"Unknown container {container_id}"
+        return await executors.call(service.read_journal_tail, container_id, lines)
+
+    # --- Fleet-wide calls ---
+
+    async def kill_all_mt5_containers(self) -> List[str]:
+        """Kills MT5 containers on every host concurrently. Returns the errors of all hosts."""
+        results = await asyncio.gather(*(executors.call(s.kill_all_mt5_containers) for s in self.services.values()))
+        return [f"{name}: {error}" if len(self.services) > 1 else error
+                for name, errors in zip(self.services, results) for error in errors]
+
+    async def create_mt5_container(self, account_name: str, vnc_port: int, api_port: int, password: str = "trading",
+                                   host: Optional[str] = None, profile: Optional[str] = None,
+                                   labels: Optional[Dict[str, str]] = None,
+                                   config_archive: Optional[Callable[[], Iterator[bytes]]] = None) -> Optional[str]:
+        """Creates and starts a new MT5 container on host (the least-loaded one if not given),
+        with the limits of a scheduler profile (the default one if not given), restoring
+        config_archive into its /config volume first if given."""
+        container_name = f"trading_mt5_{account_name}"
+        containers = await self.list_mt5_containers()  # names are unique fleet-wide, not just per host
+        if any(r["name"] == container_name for r in containers):
+            return f"An instance named '{account_name}' already exists"
+        profile = scheduler.profile(profile)
+        host = host or await self.pick_host(profile.name)
+        if host not in self.services:
+            return "No Docker host has room for the new instance"
+        service = self.services[host]
+        info = await executors.call(service.get_host_info)
+        limits = scheduler.limits_for(profile.name, info.get("cpus"), self._records.get(host, []))
+        return await executors.call(service.create_mt5_container, account_name, vnc_port, api_port, password, limits, labels,
+                                    config_archive)
+
+    async def get_next_available_ports(self, start_vnc=3000, start_api=8001, reserved=(), host: Optional[str] = None) -> tuple[int, int]:
+        """Next free ports on host (all hosts if not given) that are not in the reserved (vnc, api) pairs."""
+        containers = await self.list_mt5_containers()
+        if host is not None:
+            containers = [c for c in containers if c["host"] == host]
+        return next_free_ports(containers, start_vnc, start_api, reserved)
+
+    # --- Placement ---
+
+    async def host_loads(self) -> Dict[str, Dict]:
+        """Live load of every reachable host: CPU and memory used by its running MT5 containers
+        (from fresh stats) against the host's capacity. load is the larger of the two shares."""
+        await self.list_mt5_containers()
+        names = [name for name, connected in self.host_connected.items() if connected]
+        loads = await asyncio.gather(*(self._host_load(name) for name in names))
+        return dict(zip(names, loads))
+
+    async def _sample(self, name: str):
+        """Host capacity plus the host's records, running ones merged with fresh stats."""
+        service = self.services[name]
+        records = self._records.get(name, [])
+        running = [r for r in records if "running" in r["status"].lower()]
+        info, *stats = await asyncio.gather(
+            executors.call(service.get_host_info),
+            *(executors.call(service.get_container_stats, r["id"]) for r in running))
+        sampled = {r["id"]: r | s for r, s in zip(running, stats)}
+        return info, [sampled.get(r["id"], r) for r in records]
+
+    async def _host_load(self, name: str) -> Dict:
+        info, records = await self._sample(name)
+        running = [r for r in records if "running" in r["status"].lower()]
+        cpu_percent = sum(r.get("cpu_percent") or 0.0 for r in running)
+        memory_bytes = sum(r.get("memory_mb") or 0 for r in running) * 1024 * 1024
+        load = None
+        if info.get("cpus") and info.get("memory_bytes"):
+            load = max(cpu_percent / (info["cpus"] * 100), memory_bytes / info["memory_bytes"])
+        max_instances = self.hosts[name].max_instances
+        reserved = scheduler.reserved(records)
+        return {
+            "instances": len(records),
+            "running": len(running),
+            "cpus": info.get("cpus"),
+            "memory_bytes": info.get("memory_bytes"),
+            "cpu_percent": round(cpu_percent, 1),
+            "memory_used_bytes": memory_bytes,
+            "reserved_cpus": reserved["cpus"],
+            "reserved_memory_bytes": reserved["memory_bytes"],
+            "load": load,
+            "full": max_instances is not None and len(records) >= max_instances,
+            "error": info.get("error"),
+        }
+
+    async def pick_host(self, profile: Optional[str] = None) -> Optional[str]:
+        """The reachable host with the lowest load (fewest instances on ties) that is not full
+        and has the CPU and memory left for the profile's limits."""
+        profile = scheduler.profile(profile)
+        if len(self.services) == 1:
+            # Nothing to compare: only check that the profile still fits
+            await self.list_mt5_containers()
+            name, service = next(iter(self.services.items()))
+            info = await executors.call(service.get_host_info)
+            return name if scheduler.fits(profile, info, self._records.get(name, [])) else None
+        loads = await self.host_loads()
+        candidates = [(load["load"], load["instances"], name) for name, load in loads.items()
+                      if load["load"] is not None and not load["full"]
+                      and scheduler.fits(profile, load, self._records.get(name, []))]
+        return min(candidates)[2] if candidates else None
+
+    # --- Limits ---
+
+    async def plan_rebalance(self) -> List[Dict]:
+        """Limit changes the scheduler proposes for every reachable host, from fresh stats.
+        Nothing is applied; see update_container_limits."""
+        await self.list_mt5_containers()
+        names = [name for name, connected in self.host_connected.items() if connected]
+        samples = await asyncio.gather(*(self._sample(name) for name in names))
+        return [proposal for name, (info, records) in zip(names, samples)
+                for proposal in scheduler.plan(name, info.get("cpus"), records)]
@@ -0,0 +1,117 @@
+"""
+Loop Monitor - Measures event-loop responsiveness of the dashboard.
+A probe task measures scheduling delay (lag) every interval and exports it as a
+metric; a watchdog thread notices when the loop stops ticking and prints the
+stack of whatever is blocking it, so slow code on the loop gets caught in place.
+
+Thresholds can be set with MT5_LOOP_WARN_MS and MT5_LOOP_BLOCK_MS.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+import metrics
+
+
+class LoopMonitor:
+    """Event-loop lag probe plus a watchdog for blocking calls."""
+
+    def __init__(self, interval: float = 0.25, warn_threshold: float = 0.1,
+                 block_threshold: float = 0.5, window: float = 60.0):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.block_threshold = block_threshold
+        self.window = window
+        self.lag = 0.0
+        self.blocks = deque(maxlen=20)
+        self._max_lag = 0.0
+        self._window_start = time.monotonic()
+        self._heartbeat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Starts the probe and the watchdog (call from the running event loop)."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # --- Lag probe ---
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            self._record(max(0.0, loop.time() - due))
+
+    def _record(self, lag: float):
+        self.lag = lag
+        metrics.EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+        now = time.monotonic()
+        if now - self._window_start > self.window:
+            self._window_start = now
+            self._max_lag = 0.0
+        self._max_lag = max(self._max_lag, lag)
+        metrics.EVENT_LOOP_LAG_MAX_SECONDS.set(self._max_lag)
+
+        if lag >= self.warn_threshold:
+            print(f"Event loop lag: {lag * 1000:.0f} ms")
+
+    # --- Watchdog ---
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.block_threshold or reported == heartbeat:
+                continue
+            # Report each stall once, while the blocking code is still on the stack
+            reported = heartbeat
+            metrics.EVENT_LOOP_BLOCKED.inc()
+            block = self._capture(stalled)
+            self.blocks.append(block)
+            print(f"Event loop blocked for {stalled * 1000:.0f} ms in task {block['task']}:\n{block['stack']}")
+
+    def _capture(self, stalled: float) -> Dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        return {
+            "time": time.time(),
+            "stalled_ms": round(stalled * 1000),
+            "task": task.get_name() if task is not None else None,
+            "stack": stack,
+        }
+
+    def recent_blocks(self) -> List[Dict]:
+        return list(self.blocks)
+
+
+loop_monitor = LoopMonitor(
+    warn_threshold=int(os.environ.get("MT5_LOOP_WARN_MS", "100")) / 1000,
+    block_threshold=int(os.environ.get("MT5_LOOP_BLOCK_MS", "500")) / 1000,
+)
@@ -1,6 +1,5 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-import webbrowser
 import threading
 import time
 from docker_service import DockerService
@@ -8,6 +7,10 @@ from docker_service import DockerService
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+def open_url(url):
+    import webbrowser  # only needed when a VNC link is clicked
+    webbrowser.open(url)
+
 class AnimatedButton(ctk.CTkButton):
     """Button with hover animation effect"""
     def __init__(self, *args, **kwargs):
@@ -279,7 +282,7 @@ class ContainerCard(ctk.CTkFrame):
                 height=32,
                 fg_color="#1f6aa5",
                 hover_color="#1557a0",
-                command=lambda: webbrowser.open(f"http://localhost:{self.container['vnc_port']}"),
+                command=lambda: open_url(f"http://localhost:{self.container['vnc_port']}"),
                 font=ctk.CTkFont(size=12, weight="bold")
             )
             btn_vnc.pack(side="left", padx=5)
@@ -475,7 +478,7 @@ class MT5ManagerApp(ctk.CTk):
         threading.Thread(target=self._fetch_and_update_ui, daemon=True).start()
 
     def _fetch_and_update_ui(self):
-        self.containers = self.docker_service.list_mt5_containers()
+        self.containers = self.docker_service.list_mt5_containers() or []
         time.sleep(0.5)  # Minimum loading time for UX
         self.after(0, self._render_list)
 
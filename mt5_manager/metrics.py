@@ -0,0 +1,217 @@
+"""
+Metrics - Prometheus instrumentation for the manager and the MT5 fleet.
+Served by the dashboard on /metrics in the OpenMetrics/Prometheus text format.
+"""
+import functools
+import inspect
+import time
+from typing import Dict, Iterable
+
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# --- Latency ---
+DOCKER_CALL_SECONDS = Histogram(
+    "mt5_manager_docker_call_seconds",
+    "Latency of DockerService calls",
+    ["method"],
+)
+MT5_API_CALL_SECONDS = Histogram(
+    "mt5_manager_api_call_seconds",
+    "Latency of MT5ApiService calls",
+    ["method"],
+)
+REFRESH_SECONDS = Histogram(
+    "mt5_manager_refresh_seconds",
+    "Duration of dashboard refresh cycles",
+    ["cycle"],
+)
+
+# --- Fleet ---
+INSTANCE_BALANCE = Gauge("mt5_instance_balance", "Account balance", ["instance"])
+INSTANCE_EQUITY = Gauge("mt5_instance_equity", "Account equity", ["instance"])
+INSTANCE_PROFIT = Gauge("mt5_instance_profit", "Floating profit/loss", ["instance"])
+INSTANCE_POSITIONS = Gauge("mt5_instance_positions", "Number of open positions", ["instance"])
+CONTAINER_CPU_PERCENT = Gauge("mt5_container_cpu_percent", "Container CPU usage in percent", ["instance"])
+CONTAINER_MEMORY_BYTES = Gauge("mt5_container_memory_bytes", "Container memory usage in bytes", ["instance"])
+CONTAINERS = Gauge("mt5_containers", "MT5 containers by status", ["status"])
+
+# --- Manager ---
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "mt5_manager_executor_queue_depth",
+    "Calls waiting for a worker thread or workload slot",
+    ["executor"],
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "mt5_manager_event_loop_lag_seconds",
+    "Delay between when the lag probe was due and when the event loop ran it",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_MAX_SECONDS = Gauge(
+    "mt5_manager_event_loop_lag_max_seconds",
+    "Largest event loop lag seen in the last monitor window",
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "mt5_manager_event_loop_blocked",
+    "Times the event loop was blocked longer than the watchdog threshold",
+)
+BUILDS = Counter(
+    "mt5_manager_builds",
+    "MQL5 sources compiled by the builder, by result (compiled, cached, failed)",
+    ["result"],
+)
+BUILD_SECONDS = Histogram(
+    "mt5_manager_build_seconds",
+    "Time to compile one MQL5 source on the builder container",
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+SNAPSHOT_BYTES = Counter(
+    "mt5_manager_snapshot_bytes",
+    "File bytes read into /config snapshots: new content, or deduplicated against stored content",
+    ["kind"],
+)
+SNAPSHOT_SECONDS = Histogram(
+    "mt5_manager_snapshot_seconds",
+    "Time to snapshot an instance's /config volume, or to create a clone from a snapshot",
+    ["operation"],
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+HIBERNATIONS = Counter(
+    "mt5_manager_hibernations",
+    "Instances put to sleep by the hibernator",
+    ["reason"],
+)
+HIBERNATED_INSTANCES = Gauge(
+    "mt5_manager_hibernated_instances",
+    "Instances currently hibernated",
+)
+RESUME_SECONDS = Histogram(
+    "mt5_manager_resume_seconds",
+    "Time from waking a hibernated instance until its MT5 API answers",
+    ["mode"],
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+SUPERVISOR_FAILURES = Counter(
+    "mt5_manager_supervisor_failures",
+    "Instance failures seen by the supervisor",
+    ["cause"],
+)
+SUPERVISED_RESTARTS = Counter(
+    "mt5_manager_supervised_restarts",
+    "Restarts by the supervisor after a backoff",
+    ["cause"],
+)
+CRASH_LOOPS = Counter(
+    "mt5_manager_crash_loops",
+    "Crash loops the supervisor stopped",
+)
+RECOVERY_SECONDS = Histogram(
+    "mt5_manager_recovery_seconds",
+    "Time from an instance failure until its MT5 API answers again",
+    ["cause"],
+    buckets=(5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 3600.0),
+)
+MTTR_SECONDS = Gauge(
+    "mt5_manager_mttr_seconds",
+    "Mean time to recovery over the last recoveries",
+)
+ALERTS_FIRED = Counter(
+    "mt5_manager_alerts_fired",
+    "Alerts fired by the alert engine",
+    ["severity"],
+)
+
+_INSTANCE_GAUGES = (
+    INSTANCE_BALANCE, INSTANCE_EQUITY, INSTANCE_PROFIT, INSTANCE_POSITIONS,
+    CONTAINER_CPU_PERCENT, CONTAINER_MEMORY_BYTES,
+)
+
+
+def _timed(func, histogram: Histogram, name: str):
+    child = histogram.labels(name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - start)
+    return wrapper
+
+
+def instrument(service, histogram: Histogram):
+    """Times every public method of a service instance into the given histogram."""
+    if getattr(service, "_metrics_instrumented", False):
+        return service
+    service._metrics_instrumented = True
+    for name, _ in inspect.getmembers(type(service), callable):
+        if name.startswith("_"):
+            continue
+        setattr(service, name, _timed(getattr(service, name), histogram, name))
+    return service
+
+
+def watch_default_executor(loop):
+    """Exposes the queue depth of the event loop's default thread pool."""
+    def queue_depth():
+        executor = getattr(loop, "_default_executor", None)
+        return executor._work_queue.qsize() if executor else 0
+    EXECUTOR_QUEUE_DEPTH.labels("default").set_function(queue_depth)
+
+
+def record_account(instance: str, result: Dict):
+    if result.get("success"):
+        INSTANCE_BALANCE.labels(instance).set(result.get("balance", 0))
+        INSTANCE_EQUITY.labels(instance).set(result.get("equity", 0))
+        INSTANCE_PROFIT.labels(instance).set(result.get("profit", 0))
+
+
+def record_positions(instance: str, result: Dict):
+    if result.get("success"):
+        INSTANCE_POSITIONS.labels(instance).set(result.get("count", 0))
+
+
+def record_container_stats(instance: str, stats: Dict):
+    if "error" not in stats:
+        CONTAINER_CPU_PERCENT.labels(instance).set(stats.get("cpu_percent", 0))
+        CONTAINER_MEMORY_BYTES.labels(instance).set(stats.get("memory_mb", 0) * 1024 * 1024)
+
+
+def forget_container_stats(instance: str):
+    """Drops resource series for an instance whose stats are no longer polled."""
+    for gauge in (CONTAINER_CPU_PERCENT, CONTAINER_MEMORY_BYTES):
+        if (instance,) in gauge._metrics:
+            gauge.remove(instance)
+
+
+def record_containers(containers: Iterable[Dict]):
+    """Updates status counts and drops per-instance series of removed containers."""
+    running = 0
+    names = set()
+    for c in containers:
+        names.add(c["name"])
+        if "running" in c["status"].lower():
+            running += 1
+    CONTAINERS.labels("running").set(running)
+    CONTAINERS.labels("stopped").set(len(names) - running)
+
+    for gauge in _INSTANCE_GAUGES:
+        for labels in list(gauge._metrics):
+            if labels[0] not in names:
+                gauge.remove(*labels)
+
+
+def metrics_response() -> Response:
+    """FastAPI handler for the /metrics endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
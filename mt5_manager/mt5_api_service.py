@@ -2,9 +2,9 @@
 MT5 API Service - Connects to MT5 instances via REST API (port 8001)
 Provides account info, positions, and trade history.
 """
-import requests
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from mt5_models import Position, Order, Deal, loads
 
 
 class MT5ApiService:
@@ -15,6 +15,8 @@ class MT5ApiService:
     
     def _make_request(self, host: str, port: str, endpoint: str, method: str = "GET", data: dict = None) -> Dict:
         """Makes a request to the MT5 API."""
+        import requests  # deferred: keeps it off the startup path until the first API call
+        
         try:
             url = f"http://{host}:{port}/{endpoint}"
             
@@ -24,7 +26,7 @@ class MT5ApiService:
                 response = requests.post(url, json=data, timeout=self.default_timeout)
             
             if response.status_code == 200:
-                return {"success": True, "data": response.json()}
+                return {"success": True, "data": loads(response.content)}
             else:
                 return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
                 
@@ -62,33 +64,19 @@ class MT5ApiService:
     def get_positions(self, host: str = "localhost", port: str = "8001") -> Dict:
         """
         Gets open positions from MT5.
-        Returns: list of positions with symbol, type, volume, profit, etc.
+        Returns: list of Position records with symbol, type, volume, profit, etc.
         """
         result = self._make_request(host, port, "positions")
         
         if result["success"]:
             positions = result["data"] if isinstance(result["data"], list) else result["data"].get("positions", [])
             
-            formatted = []
-            for pos in positions:
-                formatted.append({
-                    "ticket": pos.get("ticket", 0),
-                    "symbol": pos.get("symbol", ""),
-                    "type": "BUY" if pos.get("type", 0) == 0 else "SELL",
-                    "volume": pos.get("volume", 0),
-                    "price_open": pos.get("price_open", 0),
-                    "price_current": pos.get("price_current", 0),
-                    "profit": pos.get("profit", 0),
-                    "swap": pos.get("swap", 0),
-                    "sl": pos.get("sl", 0),
-                    "tp": pos.get("tp", 0),
-                    "time": pos.get("time", "")
-                })
+            formatted = [Position.from_api(pos) for pos in positions]
             
             return {
                 "success": True,
                 "positions": formatted,
-                "total_profit": sum(p["profit"] for p in formatted),
+                "total_profit": sum(p.profit for p in formatted),
                 "count": len(formatted)
             }
         return result
@@ -99,6 +87,7 @@ class MT5ApiService:
         
         if result["success"]:
             orders = result["data"] if isinstance(result["data"], list) else result["data"].get("orders", [])
+            orders = [Order.from_api(order) for order in orders]
             return {
                 "success": True,
                 "orders": orders,
@@ -109,12 +98,13 @@ class MT5ApiService:
     def get_history(self, host: str = "localhost", port: str = "8001", days: int = 7) -> Dict:
         """
         Gets trade history from MT5.
-        Returns: list of closed deals with profit/loss.
+        Returns: list of closed Deal records with profit/loss.
         """
         result = self._make_request(host, port, f"history?days={days}")
         
         if result["success"]:
             deals = result["data"] if isinstance(result["data"], list) else result["data"].get("deals", [])
+            deals = [Deal.from_api(deal) for deal in deals]
             
             # Calculate summary
             total_profit = 0
@@ -123,8 +113,8 @@ class MT5ApiService:
             losses = 0
             
             for deal in deals:
-                profit = deal.get("profit", 0)
-                if deal.get("entry", 0) == 1:  # Exit deal
+                profit = deal.profit
+                if deal.entry == 1:  # Exit deal
                     total_profit += profit
                     total_trades += 1
                     if profit > 0:
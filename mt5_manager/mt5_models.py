@@ -0,0 +1,129 @@
+"""
+MT5 Models - Compact records for positions, orders and deals.
+Slotted dataclasses keep per-record memory small for accounts with thousands of rows.
+"""
+from dataclasses import dataclass
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib decoder
+    orjson = None
+    import json
+
+
+def loads(data):
+    """Decodes a JSON payload (bytes or str), using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+ORDER_TYPES = (
+    "BUY", "SELL", "BUY_LIMIT", "SELL_LIMIT",
+    "BUY_STOP", "SELL_STOP", "BUY_STOP_LIMIT", "SELL_STOP_LIMIT",
+)
+
+
+def order_type_name(value) -> str:
+    """Maps an MT5 ORDER_TYPE_* integer to its short name."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, int) and 0 <= value < len(ORDER_TYPES):
+        return ORDER_TYPES[value]
+    return str(value)
+
+
+@dataclass(slots=True)
+class Position:
+    ticket: int
+    symbol: str
+    type: str
+    volume: float
+    price_open: float
+    price_current: float
+    profit: float
+    swap: float
+    sl: float
+    tp: float
+    time: object
+
+    @classmethod
+    def from_api(cls, raw: dict) -> "Position":
+        get = raw.get
+        return cls(
+            get("ticket", 0),
+            get("symbol", ""),
+            "BUY" if get("type", 0) == 0 else "SELL",
+            get("volume", 0),
+            get("price_open", 0),
+            get("price_current", 0),
+            get("profit", 0),
+            get("swap", 0),
+            get("sl", 0),
+            get("tp", 0),
+            get("time", ""),
+        )
+
+
+@dataclass(slots=True)
+class Order:
+    ticket: int
+    symbol: str
+    type: str
+    volume: float
+    price_open: float
+    price_current: float
+    sl: float
+    tp: float
+    time: object
+
+    @classmethod
+    def from_api(cls, raw: dict) -> "Order":
+        get = raw.get
+        return cls(
+            get("ticket", 0),
+            get("symbol", ""),
+            order_type_name(get("type", 0)),
+            get("volume_current", get("volume", 0)),
+            get("price_open", 0),
+            get("price_current", 0),
+            get("sl", 0),
+            get("tp", 0),
+            get("time_setup", get("time", "")),
+        )
+
+
+@dataclass(slots=True)
+class Deal:
+    ticket: int
+    order: int
+    position_id: int
+    symbol: str
+    type: int
+    entry: int
+    volume: float
+    price: float
+    profit: float
+    commission: float
+    swap: float
+    time: object
+    comment: str
+
+    @classmethod
+    def from_api(cls, raw: dict) -> "Deal":
+        get = raw.get
+        return cls(
+            get("ticket", 0),
+            get("order", 0),
+            get("position_id", 0),
+            get("symbol", ""),
+            get("type", 0),
+            get("entry", 0),
+            get("volume", 0),
+            get("price", 0),
+            get("profit", 0),
+            get("commission", 0),
+            get("swap", 0),
+            get("time", ""),
+            get("comment", ""),
+        )
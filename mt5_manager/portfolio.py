@@ -0,0 +1,267 @@
+"""
+Portfolio - Balance, equity and exposure aggregated across the MT5 fleet.
+One concurrent poll per tick fetches account info and positions from every
+running instance. Results are cached per instance, so a slow or failing
+account keeps its last good values (flagged stale) instead of blanking totals,
+and every open portfolio tab shares the same aggregates. Positions are diffed
+per account between polls and symbol exposure is adjusted by the changes only.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from executors import executors
+from snapshot_diff import SnapshotDiff, SnapshotTracker
+from tracing import tracer
+
+
+@dataclass(slots=True)
+class AccountSnapshot:
+    """Last polled state of one instance's account."""
+    container_id: str
+    instance: str
+    server: str = ""
+    currency: str = "USD"
+    balance: float = 0.0
+    equity: float = 0.0
+    profit: float = 0.0
+    margin: float = 0.0
+    free_margin: float = 0.0
+    positions: SnapshotTracker = field(default_factory=SnapshotTracker)
+    symbols: Dict[str, int] = field(default_factory=dict)  # open positions per symbol
+    updated: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def margin_level(self) -> Optional[float]:
+        return self.equity / self.margin * 100 if self.margin else None
+
+
+@dataclass(slots=True)
+class SymbolExposure:
+    """Net lots and floating P/L for one symbol across all accounts."""
+    symbol: str
+    long_volume: float = 0.0
+    short_volume: float = 0.0
+    profit: float = 0.0
+    positions: int = 0
+    accounts: int = 0
+
+    @property
+    def net_volume(self) -> float:
+        return self.long_volume - self.short_volume
+
+
+EXPOSURE_FIELDS = frozenset(("symbol", "type", "volume", "profit"))
+
+
+class PortfolioState:
+    """Polls every running instance and keeps fleet-wide aggregates."""
+
+    def __init__(self, fleet, mt5_api, interval: float = 5.0, idle_interval: float = 30.0,
+                 concurrency: int = 32, stale_after: float = 30.0):
+        self.fleet = fleet
+        self.mt5_api = mt5_api
+        self.interval = interval
+        self.idle_interval = idle_interval  # nobody watching; keep metrics reasonably fresh
+        self.stale_after = stale_after
+        self.accounts: Dict[str, AccountSnapshot] = {}
+        self.exposure: List[SymbolExposure] = []
+        self._exposure: Dict[str, SymbolExposure] = {}
+        self.totals: Dict = {}
+        self.last_updated: Optional[datetime] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._listeners: List[Callable[[], None]] = []
+        self._account_listeners: List[Callable[[AccountSnapshot, SnapshotDiff], None]] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    # --- Subscriptions ---
+
+    def subscribe(self, listener: Callable[[], None]):
+        self._listeners.append(listener)
+        self._wake.set()  # switch to the fast interval right away
+
+    def unsubscribe(self, listener: Callable[[], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def subscribe_accounts(self, listener: Callable[[AccountSnapshot, SnapshotDiff], None]):
+        """Receives every polled account with its position changes (e.g. for alerting).
+        Unlike subscribe, this does not switch the poll loop to the fast interval."""
+        self._account_listeners.append(listener)
+
+    def unsubscribe_accounts(self, listener: Callable[[AccountSnapshot, SnapshotDiff], None]):
+        if listener in self._account_listeners:
+            self._account_listeners.remove(listener)
+
+    def restore(self, accounts, saved_at: float):
+        """Seeds accounts from a saved snapshot; they count as stale until polled again."""
+        for cid, instance, account, positions, updated in accounts:
+            snapshot = AccountSnapshot(cid, instance, updated=updated)
+            for key, value in account.items():
+                setattr(snapshot, key, value)
+            self._apply_positions(snapshot, snapshot.positions.update(positions))
+            self.accounts[cid] = snapshot
+        self._aggregate()
+        self.last_updated = datetime.fromtimestamp(saved_at)
+
+    # --- Refresh ---
+
+    def start(self):
+        """Starts the poll loop (call from the running event loop)."""
+        if self._task is None:
+            self.fleet.subscribe(self._on_fleet)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self.fleet.unsubscribe(self._on_fleet)
+            self._task.cancel()
+            self._task = None
+
+    def _on_fleet(self, update):
+        if update.added or update.removed:
+            self._wake.set()  # poll new instances (and the first fleet load) without waiting a full interval
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing portfolio: {e}")
+            self._wake.clear()
+            interval = self.interval if self._listeners else self.idle_interval
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def refresh(self):
+        async with self._lock:
+            with metrics.REFRESH_SECONDS.labels("portfolio").time(), tracer.span("portfolio.refresh"):
+                instances = [r for r in self.fleet.running() if r["api_port"] != "N/A"]
+                await asyncio.gather(*(self._poll(r) for r in instances))
+
+                live = {r["id"] for r in instances}
+                for cid in [cid for cid in self.accounts if cid not in live]:
+                    snapshot = self.accounts.pop(cid)
+                    self._apply_positions(snapshot, snapshot.positions.clear())
+                self._aggregate()
+            self.last_updated = datetime.now()
+        self._notify()
+
+    async def _poll(self, record: Dict):
+        async with self._semaphore:
+            snapshot = self.accounts.get(record["id"]) or AccountSnapshot(record["id"], record["name"])
+            self.accounts[record["id"]] = snapshot
+            diff = SnapshotDiff()
+
+            account = await executors.run("api", self.mt5_api.get_account_info, record["address"], record["api_port"])
+            if not account.get("success"):
+                snapshot.error = account.get("error", "Unknown error")
+                self._notify_account(snapshot, diff)
+                return
+            positions = await executors.run("api", self.mt5_api.get_positions, record["address"], record["api_port"])
+            metrics.record_account(record["name"], account)
+            metrics.record_positions(record["name"], positions)
+
+            snapshot.server = account.get("server", "")
+            snapshot.currency = account.get("currency", "USD")
+            snapshot.balance = account.get("balance", 0)
+            snapshot.equity = account.get("equity", 0)
+            snapshot.profit = account.get("profit", 0)
+            snapshot.margin = account.get("margin", 0)
+            snapshot.free_margin = account.get("free_margin", 0)
+            if positions.get("success"):
+                diff = snapshot.positions.update(positions["positions"])
+                self._apply_positions(snapshot, diff)
+                snapshot.error = None
+            else:
+                snapshot.error = positions.get("error", "Failed to load positions")
+            snapshot.updated = time.time()
+            self._notify_account(snapshot, diff)
+
+    def _apply_positions(self, snapshot: AccountSnapshot, diff: SnapshotDiff):
+        """Adjusts symbol exposure by one account's position changes."""
+        if not diff:
+            return
+        for pos in diff.removed:
+            self._add_exposure(snapshot, pos, -1)
+        for change in diff.modified:
+            if change.fields & EXPOSURE_FIELDS:
+                self._add_exposure(snapshot, change.previous, -1)
+                self._add_exposure(snapshot, change.current, 1)
+        for pos in diff.added:
+            self._add_exposure(snapshot, pos, 1)
+
+    def _add_exposure(self, snapshot: AccountSnapshot, pos, sign: int):
+        entry = self._exposure.get(pos.symbol)
+        if entry is None:
+            entry = self._exposure[pos.symbol] = SymbolExposure(pos.symbol)
+        if pos.type == "BUY":
+            entry.long_volume += sign * pos.volume
+        else:
+            entry.short_volume += sign * pos.volume
+        entry.profit += sign * pos.profit
+        entry.positions += sign
+
+        held = snapshot.symbols.get(pos.symbol, 0) + sign
+        if held:
+            snapshot.symbols[pos.symbol] = held
+        else:
+            del snapshot.symbols[pos.symbol]
+        if sign > 0 and held == 1:
+            entry.accounts += 1
+        elif held == 0:
+            entry.accounts -= 1
+        if not entry.positions:
+            del self._exposure[pos.symbol]
+
+    def _aggregate(self):
+        balance = equity = profit = margin = 0.0
+        open_positions = 0
+        stale = 0
+        now = time.time()
+
+        for snapshot in self.accounts.values():
+            if not snapshot.updated:
+                continue  # never answered; nothing to add
+            if now - snapshot.updated > self.stale_after:
+                stale += 1
+            balance += snapshot.balance
+            equity += snapshot.equity
+            profit += snapshot.profit
+            margin += snapshot.margin
+            open_positions += len(snapshot.positions.records)
+
+        self.exposure = sorted(self._exposure.values(), key=lambda e: abs(e.net_volume), reverse=True)
+        self.totals = {
+            "accounts": len(self.accounts),
+            "errors": sum(1 for s in self.accounts.values() if s.error),
+            "stale": stale,
+            "balance": balance,
+            "equity": equity,
+            "profit": profit,
+            "margin": margin,
+            "margin_level": equity / margin * 100 if margin else None,
+            "positions": open_positions,
+        }
+
+    def _notify_account(self, snapshot: AccountSnapshot, diff: SnapshotDiff):
+        for listener in list(self._account_listeners):
+            try:
+                listener(snapshot, diff)
+            except Exception as e:
+                print(f"Error handling account update: {e}")
+
+    def _notify(self):
+        for listener in list(self._listeners):
+            try:
+                listener()
+            except Exception as e:
+                print(f"Error updating portfolio view: {e}")
@@ -0,0 +1,146 @@
+"""
+Position Stream - Live open-position and pending-order updates for one MT5 instance.
+The MT5 REST API has no push channel, so each stream polls adaptively: fast
+(sub-second) while positions are moving, backing off while they are quiet or
+the API is failing. Snapshots are diffed by ticket (see snapshot_diff) and
+subscribers receive only the added, removed and modified records. Viewers of
+the same instance share one stream; a stream stops polling when its last
+subscriber leaves, and is then dropped from PositionStreams.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from executors import executors
+from snapshot_diff import SnapshotDiff, SnapshotTracker
+from tracing import tracer
+
+
+@dataclass
+class PositionDiff:
+    """Changes to one account's positions and pending orders since the last poll."""
+    positions: SnapshotDiff = field(default_factory=SnapshotDiff)
+    orders: SnapshotDiff = field(default_factory=SnapshotDiff)
+    error: Optional[str] = None
+    status_changed: bool = False  # first load, or recovered from an error
+
+    def __bool__(self):
+        return bool(self.positions or self.orders or self.error or self.status_changed)
+
+
+class PositionStream:
+    """Adaptive poller for one instance's positions."""
+
+    def __init__(self, mt5_api, api_port: str, address: str = "localhost", min_interval: float = 0.5,
+                 max_interval: float = 5.0, on_idle: Optional[Callable[["PositionStream"], None]] = None):
+        self.mt5_api = mt5_api
+        self.api_port = api_port
+        self.address = address
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.position_tracker = SnapshotTracker()
+        self.order_tracker = SnapshotTracker()
+        self.error: Optional[str] = None
+        self._listeners: List[Callable[[PositionDiff], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.on_idle = on_idle  # called when the last subscriber leaves
+
+    @property
+    def loaded(self) -> bool:
+        return self.position_tracker.loaded
+
+    @property
+    def positions(self) -> Dict[int, object]:
+        return self.position_tracker.records
+
+    @property
+    def orders(self) -> Dict[int, object]:
+        return self.order_tracker.records
+
+    @property
+    def total_profit(self) -> float:
+        return sum(p.profit for p in self.positions.values())
+
+    def subscribe(self, listener: Callable[[PositionDiff], None]):
+        self._listeners.append(listener)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def unsubscribe(self, listener: Callable[[PositionDiff], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+        if not self._listeners and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            if self.on_idle is not None:
+                self.on_idle(self)
+
+    async def refresh(self) -> PositionDiff:
+        """Polls now and notifies subscribers; used for manual refreshes."""
+        diff = await self.poll()
+        if diff:
+            self._notify(diff)
+        return diff
+
+    async def _run(self):
+        while True:
+            diff = await self.poll()
+            if diff.error:
+                self.interval = self.max_interval
+            elif diff.positions or diff.orders:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * 1.5, self.max_interval)
+            if diff:
+                self._notify(diff)
+            await asyncio.sleep(self.interval)
+
+    async def poll(self) -> PositionDiff:
+        """Fetches positions and orders once and diffs them against the stream's snapshot."""
+        with tracer.span("positions.poll", port=self.api_port):
+            result, orders = await asyncio.gather(
+                # Someone is watching the drawer: poll on the interactive pool
+                executors.run("interactive", self.mt5_api.get_positions, self.address, self.api_port),
+                executors.run("interactive", self.mt5_api.get_orders, self.address, self.api_port),
+            )
+        if not result.get("success"):
+            error = result.get("error", "Failed to load positions")
+            changed = error != self.error
+            self.error = error
+            return PositionDiff(error=error if changed else None)
+
+        diff = PositionDiff(status_changed=not self.loaded or self.error is not None)
+        self.error = None
+        diff.positions = self.position_tracker.update(result["positions"])
+        if orders.get("success"):
+            # A failing orders call keeps the last known orders rather than blanking them
+            diff.orders = self.order_tracker.update(orders["orders"])
+        return diff
+
+    def _notify(self, diff: PositionDiff):
+        for listener in list(self._listeners):
+            try:
+                listener(diff)
+            except Exception as e:
+                print(f"Error updating positions view: {e}")
+
+
+class PositionStreams:
+    """One shared stream per instance API endpoint, kept while it has subscribers."""
+
+    def __init__(self, mt5_api):
+        self.mt5_api = mt5_api
+        self._streams: Dict[Tuple[str, str], PositionStream] = {}
+
+    def get(self, api_port: str, address: str = "localhost") -> PositionStream:
+        stream = self._streams.get((address, api_port))
+        if stream is None:
+            stream = self._streams[(address, api_port)] = PositionStream(
+                self.mt5_api, api_port, address, on_idle=self._drop)
+        return stream
+
+    def _drop(self, stream: PositionStream):
+        # A viewer that resubscribes a dropped stream keeps using it; get() hands out a new one
+        if self._streams.get((stream.address, stream.api_port)) is stream:
+            del self._streams[(stream.address, stream.api_port)]
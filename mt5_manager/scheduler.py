@@ -0,0 +1,270 @@
+"""
+Scheduler - CPU and memory limits for MT5 instances.
+Every new instance gets the limits of a profile: a CPU quota, a relative CPU
+weight under contention, a hard memory limit without swap, and a set of cores.
+Instances of less than one CPU are packed onto shared cores (best fit), larger
+ones get the least-allocated cores to themselves, so one busy terminal cannot
+spread over every core and starve the rest of the host.
+
+plan() reads live stats for hot spots (cores busier than hot_threshold, or
+instances close to their memory limit) and proposes limit changes. Nothing is
+applied until an operator approves the proposals; Docker then updates the
+limits of the running containers in place.
+
+Up to MT5_CPU_OVERCOMMIT (default 4) CPUs of quota are allocated per core, and
+hard memory limits never add up to more than the host's memory.
+
+Profiles can be replaced with MT5_PROFILES, a JSON file of
+{"name": {"cpus": 1.0, "memory_mb": 2048, "cpu_shares": 1024}}; MT5_PROFILE
+names the default one.
+"""
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import orjson
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    cpus: float  # CPU quota in cores
+    memory_mb: int  # hard limit; swap is disabled
+    cpu_shares: int = 1024  # weight when cores are contended
+
+    def limits(self, cpuset: str = "") -> Dict:
+        return {"profile": self.name, "cpus": self.cpus, "cpuset": cpuset,
+                "memory_mb": self.memory_mb, "cpu_shares": self.cpu_shares}
+
+
+PROFILES = {
+    "light": Profile("light", 0.5, 1536, 512),
+    "standard": Profile("standard", 1.0, 2048, 1024),
+    "heavy": Profile("heavy", 2.0, 4096, 2048),
+}
+
+
+def parse_cpuset(cpuset: str) -> List[int]:
+    """Core numbers of a Docker cpuset such as "0-2,5"."""
+    cores = []
+    for part in filter(None, (cpuset or "").split(",")):
+        first, _, last = part.partition("-")
+        cores.extend(range(int(first), int(last or first) + 1))
+    return cores
+
+
+def format_cpuset(cores) -> str:
+    return ",".join(str(core) for core in sorted(cores))
+
+
+class Scheduler:
+    """Turns profiles into per-host limits and live stats into rebalancing proposals."""
+
+    def __init__(self, profiles: Dict[str, Profile], default: str = "standard", cpu_overcommit: float = 4.0,
+                 hot_threshold: float = 0.9, memory_threshold: float = 0.9, max_moves: int = 10):
+        self.profiles = profiles
+        self.default = default if default in profiles else next(iter(profiles))
+        # Quotas are caps, not reservations: idle terminals leave most of them unused
+        self.cpu_overcommit = cpu_overcommit  # allocated cores per physical core
+        self.hot_threshold = hot_threshold  # busy share of a core that counts as a hot spot
+        self.memory_threshold = memory_threshold  # share of its memory limit an instance may use
+        self.max_moves = max_moves
+
+    def profile(self, name: Optional[str] = None) -> Profile:
+        return self.profiles.get(name or self.default) or self.profiles[self.default]
+
+    def profile_name(self, record: Dict) -> Optional[str]:
+        """The profile whose limits an instance has; None without limits, "custom" if none matches.
+        Matched rather than labelled, as docker update cannot change labels."""
+        if record.get("cpu_limit") is None and record.get("memory_limit_mb") is None:
+            return None
+        for profile in self.profiles.values():
+            if record.get("cpu_limit") == profile.cpus and record.get("memory_limit_mb") == profile.memory_mb:
+                return profile.name
+        return "custom"
+
+    def current_limits(self, record: Dict) -> Dict:
+        """An instance's limits from its record, in the form limits_for returns."""
+        return {"profile": self.profile_name(record), "cpus": record.get("cpu_limit"), "cpuset": record.get("cpuset") or "",
+                "memory_mb": record.get("memory_limit_mb"), "cpu_shares": record.get("cpu_shares")}
+
+    def describe(self, record: Dict) -> str:
+        """Short text for an instance's current limits."""
+        name = self.profile_name(record)
+        if name is None:
+            return "no limits"
+        parts = [name]
+        if record.get("cpu_limit") is not None:
+            parts.append(f"{record['cpu_limit']:g} CPU")
+        if record.get("cpuset"):
+            parts.append(f"cores {record['cpuset']}")
+        if record.get("memory_limit_mb") is not None:
+            parts.append(f"{record['memory_limit_mb']} MB")
+        return " · ".join(parts)
+
+    # --- Placement ---
+
+    def allocation(self, cpus: int, records: List[Dict]) -> List[float]:
+        """CPU quota allocated to each core by the instances pinned to it."""
+        allocated = [0.0] * cpus
+        for r in records:
+            cores = [core for core in parse_cpuset(r.get("cpuset")) if core < cpus]
+            if cores and r.get("cpu_limit"):
+                for core in cores:
+                    allocated[core] += r["cpu_limit"] / len(cores)
+        return allocated
+
+    def reserved(self, records: List[Dict]) -> Dict:
+        """CPU and memory promised to the instances on a host (limited ones only)."""
+        return {
+            "cpus": sum(r.get("cpu_limit") or 0.0 for r in records),
+            "memory_bytes": sum(r.get("memory_limit_mb") or 0 for r in records) * 1024 * 1024,
+        }
+
+    def fits(self, profile: Profile, info: Dict, records: List[Dict]) -> bool:
+        """Whether a host has the CPU and memory left for another instance of profile."""
+        if not info.get("cpus") or not info.get("memory_bytes"):
+            return True  # capacity unknown
+        reserved = self.reserved(records)
+        return (reserved["cpus"] + profile.cpus <= info["cpus"] * self.cpu_overcommit
+                and reserved["memory_bytes"] + profile.memory_mb * 1024 * 1024 <= info["memory_bytes"])
+
+    def pick_cores(self, cpus: float, host_cpus: int, allocated: List[float], exclude=()) -> List[int]:
+        """Cores for a quota of cpus: under one CPU, the fullest core it still fits on whole
+        (best fit, so fractional instances share cores), else the least-allocated cores."""
+        candidates = [core for core in range(host_cpus) if core not in exclude] or list(range(host_cpus))
+        if cpus < 1:
+            fitting = [core for core in candidates if allocated[core] + cpus <= 1.0]
+            if fitting:
+                return [max(fitting, key=lambda core: (allocated[core], -core))]
+            return [min(candidates, key=lambda core: (allocated[core], core))]
+        count = min(math.ceil(cpus), len(candidates))
+        return sorted(sorted(candidates, key=lambda core: (allocated[core], core))[:count])
+
+    def limits_for(self, profile: Optional[str], host_cpus: Optional[int], records: List[Dict]) -> Dict:
+        """Limits for a new instance on a host with host_cpus cores running records."""
+        profile = self.profile(profile)
+        if not host_cpus:
+            return profile.limits()
+        cores = self.pick_cores(profile.cpus, host_cpus, self.allocation(host_cpus, records))
+        # A quota above the cores of the host cannot be used anyway
+        return profile.limits(format_cpuset(cores)) | {"cpus": min(profile.cpus, host_cpus)}
+
+    # --- Rebalancing ---
+
+    def core_load(self, cpus: int, records: List[Dict]) -> List[float]:
+        """Measured busy cores per core: each running instance's CPU spread over its cpuset
+        (over all cores when unpinned)."""
+        load = [0.0] * cpus
+        for r in records:
+            if not r.get("cpu_percent"):
+                continue
+            cores = [core for core in parse_cpuset(r.get("cpuset")) if core < cpus] or range(cpus)
+            for core in cores:
+                load[core] += r["cpu_percent"] / 100 / len(cores)
+        return load
+
+    def plan(self, host: str, cpus: Optional[int], records: List[Dict]) -> List[Dict]:
+        """Proposed limit changes for one host, from records that carry fresh stats. Hot cores
+        come first, then instances near their memory limit, then instances without limits."""
+        limited = [r for r in records if r.get("cpu_limit") is not None or r.get("memory_limit_mb") is not None]
+        proposals = self._unload_hot_cores(host, cpus, [r for r in limited if r.get("cpu_limit")]) if cpus else []
+        pinned = {p["container_id"]: p["limits"]["cpuset"] for p in proposals}
+        placed = {r["id"]: r | {"cpuset": pinned[r["id"]]} if r["id"] in pinned else r for r in limited}
+        for r in limited:
+            if r.get("memory_limit_mb") and r.get("memory_mb") and r["memory_mb"] >= r["memory_limit_mb"] * self.memory_threshold:
+                larger = self._larger_profile(r)
+                if larger is not None:
+                    # One change per instance: a resize replaces a pin proposal, and keeps off
+                    # the hot cores the pin moved it from
+                    proposals = [p for p in proposals if p["container_id"] != r["id"]]
+                    limits = self._resized(larger, r, cpus, [p for cid, p in placed.items() if cid != r["id"]],
+                                           exclude=parse_cpuset(r.get("cpuset")) if r["id"] in pinned else ())
+                    placed[r["id"]] = r | {"cpuset": limits["cpuset"], "cpu_limit": limits["cpus"]}
+                    proposals.append(self._proposal(
+                        r, host, "resize", f"uses {r['memory_mb']:.0f} of {r['memory_limit_mb']} MB", limits))
+        placed = list(placed.values())
+        for r in records:
+            if r.get("cpu_limit") is not None or r.get("memory_limit_mb") is not None:
+                continue
+            limits = self.limits_for(None, cpus, placed)
+            placed.append({"cpuset": limits["cpuset"], "cpu_limit": limits["cpus"]})
+            proposals.append(self._proposal(r, host, "limit", "runs without CPU or memory limits", limits))
+        return proposals[:self.max_moves]
+
+    def _unload_hot_cores(self, host: str, cpus: int, records: List[Dict]) -> List[Dict]:
+        """Moves the busiest pinned instance off each hot core while that lowers the peak."""
+        records = [dict(r) for r in records]
+        load = self.core_load(cpus, records)
+        moves = []
+        moved = set()
+        while len(moves) < self.max_moves:
+            hot = max(range(cpus), key=lambda core: load[core])
+            if load[hot] <= self.hot_threshold:
+                break
+            on_core = [r for r in records if hot in parse_cpuset(r.get("cpuset")) and r["id"] not in moved
+                       and r.get("cpu_percent")]
+            if not on_core:
+                break
+            r = max(on_core, key=lambda r: r["cpu_percent"] / len(parse_cpuset(r["cpuset"])))
+            current = parse_cpuset(r["cpuset"])
+            share = r["cpu_percent"] / 100 / len(current)
+            without = list(load)
+            for core in current:
+                without[core] -= share
+            target = self.pick_cores(r["cpu_limit"], cpus, without, exclude=current)
+            after = list(without)
+            for core in target:
+                after[core] += r["cpu_percent"] / 100 / len(target)
+            if max(after) >= load[hot]:
+                break  # nowhere cooler to go
+            moves.append(self._proposal(
+                r, host, "pin", f"core {hot} at {load[hot] * 100:.0f}%",
+                self.current_limits(r) | {"cpuset": format_cpuset(target)}))
+            moved.add(r["id"])
+            r["cpuset"] = format_cpuset(target)
+            load = after
+        return moves
+
+    def _resized(self, profile: Profile, record: Dict, cpus: Optional[int], others: List[Dict], exclude=()) -> Dict:
+        """Limits of profile for a running instance: cores picked for the new quota next to
+        the others' allocation, like limits_for. Keeps its cores when the host's are unknown."""
+        if not cpus:
+            return profile.limits(record.get("cpuset") or "")
+        cores = self.pick_cores(profile.cpus, cpus, self.allocation(cpus, others), exclude=exclude)
+        return profile.limits(format_cpuset(cores)) | {"cpus": min(profile.cpus, cpus)}
+
+    def _larger_profile(self, record: Dict) -> Optional[Profile]:
+        larger = [p for p in self.profiles.values() if p.memory_mb > (record.get("memory_limit_mb") or 0)]
+        return min(larger, key=lambda p: p.memory_mb) if larger else None
+
+    def _proposal(self, record: Dict, host: str, kind: str, reason: str, limits: Dict) -> Dict:
+        return {
+            "container_id": record["id"],
+            "name": record["name"],
+            "host": host,
+            "kind": kind,
+            "reason": reason,
+            "current": self.describe(record),
+            "proposed": self.describe({"cpu_limit": limits["cpus"], "cpuset": limits["cpuset"],
+                                       "memory_limit_mb": limits["memory_mb"]}),
+            "limits": limits,
+        }
+
+
+def profiles_from_env() -> Dict[str, Profile]:
+    path = os.environ.get("MT5_PROFILES")
+    if not path:
+        return dict(PROFILES)
+    try:
+        with open(path, "rb") as f:
+            raw = orjson.loads(f.read())
+        return {name: Profile(name, float(p["cpus"]), int(p["memory_mb"]), int(p.get("cpu_shares", 1024)))
+                for name, p in raw.items()}
+    except Exception as e:
+        print(f"Error loading profiles from MT5_PROFILES: {e}; using the built-in ones")
+        return dict(PROFILES)
+
+
+scheduler = Scheduler(profiles_from_env(), os.environ.get("MT5_PROFILE", "standard"),
+                      float(os.environ.get("MT5_CPU_OVERCOMMIT", "4.0")))
@@ -0,0 +1,54 @@
+"""
+Search - Query parsing and matching for the instance search box.
+Plain words match the container name or ID; prefixed terms narrow further:
+
+    status:running   status:stopped   port:3001   tag:group=eu   server:icmarkets   host:eu1
+
+All terms must match. Matching works on the shared fleet records only, so
+typing never triggers Docker or MT5 API calls.
+"""
+from typing import Dict, Tuple
+
+Query = Tuple[Tuple[str, str], ...]
+
+FIELDS = ("status", "port", "tag", "server", "host")
+
+
+def parse_query(text: str) -> Query:
+    """Splits a search string into (field, value) terms; plain words use the 'name' field."""
+    terms = []
+    for word in text.lower().split():
+        field, sep, value = word.partition(":")
+        if sep and field in FIELDS:
+            if value:
+                terms.append((field, value))
+        else:
+            terms.append(("name", word))
+    return tuple(terms)
+
+
+def matches(record: Dict, query: Query) -> bool:
+    return all(_match_term(record, field, value) for field, value in query)
+
+
+def _match_term(record: Dict, field: str, value: str) -> bool:
+    if field == "name":
+        return value in record["name"].lower() or record["id"].startswith(value)
+    if field == "status":
+        status = record["status"].lower()
+        if value == "stopped":
+            return "running" not in status
+        return value in status
+    if field == "port":
+        return value in (str(record.get("vnc_port")), str(record.get("api_port")))
+    if field == "tag":
+        key, sep, expected = value.partition("=")
+        for label, label_value in (record.get("labels") or {}).items():
+            if key in label.lower() and (not sep or expected in str(label_value).lower()):
+                return True
+        return False
+    if field == "server":
+        return value in (record.get("server") or "").lower()
+    if field == "host":
+        return value in (record.get("host") or "").lower()
+    return False
@@ -0,0 +1,89 @@
+"""
+Snapshot Diff - Ticket-keyed deltas between successive MT5 snapshots.
+get_positions / get_orders always return the full list; a SnapshotTracker keeps
+the previous snapshot and turns each new one into added, removed and modified
+records (with the set of fields that changed), so the UI, the portfolio
+aggregates and alerting only do work proportional to what actually changed.
+"""
+import operator
+from dataclasses import dataclass, field, fields
+from typing import Dict, FrozenSet, Iterable, List
+
+_getters: Dict[type, tuple] = {}
+
+
+@dataclass(slots=True)
+class Change:
+    """A record present in both snapshots whose fields differ."""
+    previous: object
+    current: object
+    fields: FrozenSet[str]
+
+
+@dataclass
+class SnapshotDiff:
+    added: List = field(default_factory=list)
+    removed: List = field(default_factory=list)
+    modified: List[Change] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+    @property
+    def count(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+
+def _field_getter(cls) -> tuple:
+    # One attrgetter per record type: comparing a whole record is a single C call
+    cached = _getters.get(cls)
+    if cached is None:
+        names = tuple(f.name for f in fields(cls))
+        cached = _getters[cls] = (names, operator.attrgetter(*names))
+    return cached
+
+
+def changed_fields(previous, current) -> FrozenSet[str]:
+    """Names of the dataclass fields that differ between two records of the same type."""
+    names, getter = _field_getter(type(current))
+    before, after = getter(previous), getter(current)
+    if before == after:
+        return frozenset()
+    return frozenset(name for name, a, b in zip(names, before, after) if a != b)
+
+
+class SnapshotTracker:
+    """Holds the last snapshot of one record stream and diffs new snapshots against it."""
+
+    def __init__(self, key: str = "ticket"):
+        self.key = operator.attrgetter(key)
+        self.records: Dict = {}
+        self.loaded = False
+
+    def update(self, snapshot: Iterable) -> SnapshotDiff:
+        """Replaces the stored snapshot and returns what changed."""
+        diff = SnapshotDiff()
+        previous = self.records
+        current = {}
+        for record in snapshot:
+            key = self.key(record)
+            current[key] = record
+            before = previous.get(key)
+            if before is None:
+                diff.added.append(record)
+                continue
+            changed = changed_fields(before, record)
+            if changed:
+                diff.modified.append(Change(before, record, changed))
+        if len(current) - len(diff.added) != len(previous):
+            diff.removed = [record for key, record in previous.items() if key not in current]
+        self.records = current
+        self.loaded = True
+        return diff
+
+    def clear(self) -> SnapshotDiff:
+        """Forgets the snapshot; everything previously held is reported as removed."""
+        diff = SnapshotDiff(removed=list(self.records.values()))
+        self.records = {}
+        self.loaded = False
+        return diff
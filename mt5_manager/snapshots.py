@@ -0,0 +1,281 @@
+"""
+Snapshots - Content-deduplicated snapshots of /config volumes, for cloning instances.
+Setting up an instance like an existing one (templates, EAs, settings) meant
+doing it all again by hand. A snapshot streams a tar of the instance's
+mt5_config_<account> volume from Docker and stores every file once, under the
+SHA-256 of its content, so the Wine prefix and MT5 install that all instances
+share cost their size once across every snapshot. The snapshot itself is a
+manifest: the tar metadata of each entry plus its content hash.
+
+Cloning creates the new container stopped, streams the manifest back as a tar
+into its fresh volume and then starts it, so the clone boots configured. It is
+logged into the source's account until its login is changed.
+
+Files whose path, size and modification time match the instance's previous
+snapshot are not hashed again (like rsync's quick check); their bytes are
+skipped in the stream. Logs and downloaded price history (EXCLUDE, or the
+MT5_SNAPSHOT_EXCLUDE regex) are left out; the terminal downloads history
+again. Snapshots are stored in MT5_SNAPSHOT_DIR (default
+~/.mt5_manager/snapshots). Deleting a snapshot removes the objects no other
+snapshot refers to.
+"""
+import asyncio
+import functools
+import hashlib
+import os
+import re
+import tarfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+
+import metrics
+from executors import executors
+
+EXCLUDE = r"/(Logs|MQL5/Logs|Bases/[^/]+/(history|ticks))/"
+READ_CHUNK = 256 * 1024
+SMALL_FILE = 1024 * 1024  # hashed in memory; larger files go through a temporary file
+TAR_FIELDS = ("mode", "uid", "gid", "uname", "gname", "mtime", "linkname")
+
+
+class SnapshotStore:
+    """Manifests plus a content-addressed object store, on local disk."""
+
+    def __init__(self, root: str, exclude: Optional[str] = EXCLUDE):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.manifests = os.path.join(root, "manifests")
+        self.exclude = re.compile(exclude) if exclude else None
+        self._summaries: Optional[Dict[str, Dict]] = None  # snapshot id -> manifest without entries
+        self._lock = threading.RLock()
+        self._capturing = 0  # objects are only collected while no capture runs
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.manifests, f"{snapshot_id}.json")
+
+    # --- Reading ---
+
+    def list(self) -> List[Dict]:
+        """Snapshot summaries, newest first."""
+        with self._lock:
+            if self._summaries is None:
+                self._summaries = {}
+                names = os.listdir(self.manifests) if os.path.isdir(self.manifests) else []
+                for name in filter(lambda n: n.endswith(".json"), names):
+                    manifest = self.load(name[:-5])
+                    if manifest is not None:
+                        self._summaries[manifest["id"]] = _summary(manifest)
+            return sorted(self._summaries.values(), key=lambda s: s["created"], reverse=True)
+
+    def load(self, snapshot_id: str) -> Optional[Dict]:
+        try:
+            with open(self._manifest_path(snapshot_id), "rb") as f:
+                return orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def usage(self) -> Dict:
+        """Bytes the snapshots hold (logical) and take on disk (stored)."""
+        stored = 0
+        for folder, _, files in os.walk(self.objects):
+            stored += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+        return {"snapshots": len(self.list()), "logical": sum(s["bytes"] for s in self.list()), "stored": stored}
+
+    def archive(self, snapshot_id: str, chunk_size: int = READ_CHUNK) -> Iterator[bytes]:
+        """Yields a tar of the snapshot chunk by chunk, for put_archive at /."""
+        manifest = self.load(snapshot_id)
+        if manifest is None:
+            raise ValueError(f"Unknown snapshot {snapshot_id}")
+        for entry in manifest["entries"]:
+            info = tarfile.TarInfo(entry["name"])
+            info.type = entry["type"].encode()
+            for key in TAR_FIELDS:
+                setattr(info, key, entry[key])
+            info.size = entry["size"]
+            yield info.tobuf()
+            if not entry["size"]:
+                continue
+            with open(self.object_path(entry["hash"]), "rb") as f:
+                remaining = entry["size"]
+                while remaining:
+                    chunk = f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        raise OSError(f"Object of {entry['name']} is truncated")
+                    remaining -= len(chunk)
+                    yield chunk
+            if entry["size"] % tarfile.BLOCKSIZE:
+                yield tarfile.NUL * (tarfile.BLOCKSIZE - entry["size"] % tarfile.BLOCKSIZE)
+        yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)  # end of archive
+
+    # --- Writing ---
+
+    def capture(self, fileobj, instance: str, host: str = "local") -> Dict:
+        """Stores a /config tar stream (see export_config) as a new snapshot. Returns its summary."""
+        started = time.perf_counter()
+        known = self._known(instance)
+        entries = []
+        logical = stored = reused = 0
+        with self._lock:
+            self._capturing += 1
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+                for member in tar:
+                    if not member.isdir() and self.exclude and self.exclude.search("/" + member.name):
+                        continue
+                    entry = {"name": member.name, "type": member.type.decode(), "size": 0,
+                             **{key: getattr(member, key) for key in TAR_FIELDS}}
+                    if member.isfile():
+                        digest = known.get((member.name, member.size, member.mtime))
+                        if digest is not None and os.path.exists(self.object_path(digest)):
+                            reused += 1  # not read: the tar stream skips the member's bytes
+                        else:
+                            digest, new = self._store(tar.extractfile(member), member.size)
+                            stored += member.size if new else 0
+                        # Sparse and contiguous files come back as regular ones
+                        entry.update(type=tarfile.REGTYPE.decode(), size=member.size, hash=digest)
+                        logical += member.size
+                    entries.append(entry)
+            manifest = {
+                "id": self._new_id(instance), "instance": instance, "host": host, "created": time.time(),
+                "files": sum(1 for e in entries if "hash" in e), "bytes": logical, "new_bytes": stored,
+                "unchanged": reused, "seconds": round(time.perf_counter() - started, 3), "entries": entries,
+            }
+            os.makedirs(self.manifests, exist_ok=True)
+            self._write(self._manifest_path(manifest["id"]), [orjson.dumps(manifest)])
+        finally:
+            with self._lock:
+                self._capturing -= 1
+        with self._lock:
+            if self._summaries is not None:
+                self._summaries[manifest["id"]] = _summary(manifest)
+        metrics.SNAPSHOT_BYTES.labels("new").inc(stored)
+        metrics.SNAPSHOT_BYTES.labels("deduplicated").inc(logical - stored)
+        return _summary(manifest)
+
+    def delete(self, snapshot_id: str) -> int:
+        """Removes a snapshot and the objects only it used. Returns the bytes freed."""
+        with self._lock:
+            os.remove(self._manifest_path(snapshot_id))
+            if self._summaries is not None:
+                self._summaries.pop(snapshot_id, None)
+            if self._capturing:
+                return 0  # a running capture may use objects no manifest lists yet; collected next time
+            # Captures wait for the lock, so none can start using an object while it is collected
+            referenced = set()
+            for summary in self.list():
+                manifest = self.load(summary["id"]) or {"entries": []}
+                referenced.update(e["hash"] for e in manifest["entries"] if "hash" in e)
+            freed = 0
+            for folder, _, files in os.walk(self.objects):
+                for name in files:
+                    if name not in referenced:
+                        path = os.path.join(folder, name)
+                        freed += os.path.getsize(path)
+                        os.remove(path)
+            return freed
+
+    def _known(self, instance: str) -> Dict:
+        """(name, size, mtime) -> content hash of the files in the instance's latest snapshot."""
+        latest = next((s for s in self.list() if s["instance"] == instance), None)
+        manifest = self.load(latest["id"]) if latest else None
+        if manifest is None:
+            return {}
+        return {(e["name"], e["size"], e["mtime"]): e["hash"] for e in manifest["entries"] if "hash" in e}
+
+    def _store(self, f, size: int):
+        """Stores a file's content unless an identical one is stored. Returns (hash, whether new)."""
+        if size <= SMALL_FILE:
+            data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if os.path.exists(self.object_path(digest)):
+                return digest, False
+            os.makedirs(os.path.dirname(self.object_path(digest)), exist_ok=True)
+            self._write(self.object_path(digest), [data])
+            return digest, True
+        os.makedirs(self.objects, exist_ok=True)
+        temporary = os.path.join(self.objects, f".{uuid.uuid4().hex}")
+        hasher = hashlib.sha256()
+        try:
+            with open(temporary, "wb") as out:
+                while chunk := f.read(READ_CHUNK):
+                    hasher.update(chunk)
+                    out.write(chunk)
+            digest = hasher.hexdigest()
+            if os.path.exists(self.object_path(digest)):
+                return digest, False
+            os.makedirs(os.path.dirname(self.object_path(digest)), exist_ok=True)
+            os.replace(temporary, self.object_path(digest))
+            return digest, True
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def _write(self, path: str, chunks: List[bytes]):
+        # Written under a temporary name first: a half-written file must never look complete
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temporary, path)
+
+    def _new_id(self, instance: str) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        snapshot_id, n = f"{instance}-{stamp}", 1
+        while os.path.exists(self._manifest_path(snapshot_id)):
+            n += 1
+            snapshot_id = f"{instance}-{stamp}-{n}"
+        return snapshot_id
+
+    # --- Fleet operations ---
+
+    async def take(self, docker_service, record: Dict) -> Dict:
+        """Snapshots an instance's /config volume. Returns the summary or {"error"}."""
+        started = time.perf_counter()
+        capture = functools.partial(self.capture, instance=record["name"].removeprefix("trading_mt5_"),
+                                    host=record.get("host", "local"))
+        result = await executors.run("snapshot", docker_service.export_config, record["id"], capture)
+        if "error" in result:
+            print(f"Error snapshotting {record['name']}: {result['error']}")
+            return result
+        summary = result["result"]
+        metrics.SNAPSHOT_SECONDS.labels("snapshot").observe(time.perf_counter() - started)
+        print(f"Snapshot {summary['id']}: {summary['files']} files, {summary['bytes'] / 2**20:.1f} MB "
+              f"({summary['new_bytes'] / 2**20:.1f} MB new) in {summary['seconds']:.1f}s")
+        return summary
+
+    async def take_many(self, docker_service, records: List[Dict]) -> List[Dict]:
+        """Snapshots several instances concurrently (bounded by the snapshot workload, so
+        uploads and writes keep the io pool); files they share are stored once."""
+        return await asyncio.gather(*(self.take(docker_service, record) for record in records))
+
+    async def clone(self, docker_service, snapshot_id: str, account_name: str, vnc_port: int, api_port: int,
+                    host: Optional[str] = None, profile: Optional[str] = None,
+                    labels: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Creates an instance whose /config volume starts as the snapshot."""
+        if await executors.run("io", self.load, snapshot_id) is None:
+            return f"Unknown snapshot {snapshot_id}"
+        started = time.perf_counter()
+        err = await executors.run("interactive", docker_service.create_mt5_container, account_name, vnc_port,
+                                  api_port, "trading", host, profile, labels,
+                                  functools.partial(self.archive, snapshot_id))
+        if not err:
+            metrics.SNAPSHOT_SECONDS.labels("clone").observe(time.perf_counter() - started)
+            print(f"Cloned {snapshot_id} into {account_name} in {time.perf_counter() - started:.1f}s")
+        return err
+
+
+def _summary(manifest: Dict) -> Dict:
+    return {key: value for key, value in manifest.items() if key != "entries"}
+
+
+snapshot_store = SnapshotStore(
+    os.environ.get("MT5_SNAPSHOT_DIR", os.path.expanduser("~/.mt5_manager/snapshots")),
+    exclude=os.environ.get("MT5_SNAPSHOT_EXCLUDE", EXCLUDE),
+)
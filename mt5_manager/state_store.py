@@ -0,0 +1,234 @@
+"""
+State Store - Local SQLite persistence for the dashboard's shared state.
+The container registry, last-known account snapshots, an equity history and
+port reservations are saved periodically and on shutdown; hibernated
+instances are recorded as they go to sleep. On startup the fleet
+and portfolio are restored from the store so pages render at once from the
+last known state, while the first refresh reconciles with Docker and MT5.
+
+The database path can be set with MT5_STATE_DB.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from executors import executors
+from mt5_models import Position
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    id TEXT PRIMARY KEY,
+    record BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    container_id TEXT PRIMARY KEY,
+    instance TEXT NOT NULL,
+    account BLOB NOT NULL,
+    positions BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS account_history (
+    instance TEXT NOT NULL,
+    time REAL NOT NULL,
+    balance REAL,
+    equity REAL,
+    profit REAL,
+    positions INTEGER
+);
+CREATE INDEX IF NOT EXISTS account_history_instance ON account_history (instance, time);
+CREATE TABLE IF NOT EXISTS port_reservations (
+    name TEXT PRIMARY KEY,
+    vnc_port INTEGER NOT NULL,
+    api_port INTEGER NOT NULL,
+    reserved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hibernation (
+    container_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    since REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+ACCOUNT_FIELDS = ("server", "currency", "balance", "equity", "profit", "margin", "free_margin", "error")
+POSITION_FIELDS = tuple(f.name for f in fields(Position))
+
+
+class StateStore:
+    """SQLite-backed snapshot of fleet and portfolio state. Writes run on the io pool."""
+
+    def __init__(self, path: str, save_interval: float = 30.0, history_retention: float = 30 * 86400,
+                 reservation_ttl: float = 600.0):
+        self.path = path
+        self.save_interval = save_interval
+        self.history_retention = history_retention
+        self.reservation_ttl = reservation_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._fleet = None
+        self._portfolio = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    # --- Startup ---
+
+    def restore(self, fleet, portfolio):
+        """Loads the last saved state into the fleet and portfolio (a few ms; runs before the first page)."""
+        try:
+            with self._db_lock:
+                db = self._db()
+                saved = db.execute("SELECT value FROM meta WHERE key = 'saved_at'").fetchone()
+                if saved is None:
+                    return
+                containers = [orjson.loads(row[0]) for row in db.execute("SELECT record FROM containers")]
+                rows = db.execute("SELECT container_id, instance, account, positions, updated FROM accounts").fetchall()
+            # A corrupt row, or one saved with another Position layout, means a cold start
+            accounts = [
+                (cid, instance, orjson.loads(account), [Position(*p) for p in orjson.loads(positions)], updated)
+                for cid, instance, account, positions, updated in rows
+            ]
+        except Exception as e:
+            print(f"Error restoring saved state: {e}")
+            return
+
+        fleet.restore(containers, saved[0])
+        portfolio.restore(accounts, saved[0])
+
+    def start(self, fleet, portfolio):
+        """Starts periodic saving (call from the running event loop)."""
+        self._fleet = fleet
+        self._portfolio = portfolio
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stops periodic saving and writes a final snapshot. Synchronous on purpose: async
+        shutdown handlers are not awaited before the event loop closes."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._fleet is not None:
+            snapshot = self._snapshot()
+            if snapshot is not None:
+                self._write(*snapshot)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await self.save()
+            except Exception as e:
+                print(f"Error saving state: {e}")
+
+    # --- Saving ---
+
+    async def save(self):
+        """Snapshots fleet and portfolio on the loop, then writes them on the io pool."""
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            await executors.run("io", self._write, *snapshot)
+
+    def _snapshot(self) -> Optional[Tuple]:
+        if self._fleet.last_updated is None or self._fleet.restored:
+            return None  # nothing fresher than what is already stored
+        containers = list(self._fleet.containers.values())
+        accounts = [
+            (s.container_id, s.instance, {k: getattr(s, k) for k in ACCOUNT_FIELDS},
+             list(s.positions.records.values()), s.updated)
+            for s in self._portfolio.accounts.values() if s.updated
+        ]
+        return containers, accounts, time.time()
+
+    def _write(self, containers: List[Dict], accounts: List[Tuple], now: float):
+        container_rows = [(c["id"], orjson.dumps(c)) for c in containers]
+        account_rows = [
+            (cid, instance, orjson.dumps(account), orjson.dumps([[getattr(p, f) for f in POSITION_FIELDS] for p in positions]), updated)
+            for cid, instance, account, positions, updated in accounts
+        ]
+        history_rows = [
+            (instance, updated, account["balance"], account["equity"], account["profit"], len(positions))
+            for _, instance, account, positions, updated in accounts
+            if now - updated < self.save_interval  # one sample per poll that happened since the last save
+        ]
+        with self._db_lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM containers")
+                db.executemany("INSERT INTO containers VALUES (?, ?)", container_rows)
+                db.execute("DELETE FROM accounts")
+                db.executemany("INSERT INTO accounts VALUES (?, ?, ?, ?, ?)", account_rows)
+                db.executemany("INSERT INTO account_history VALUES (?, ?, ?, ?, ?, ?)", history_rows)
+                db.execute("DELETE FROM account_history WHERE time < ?", (now - self.history_retention,))
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('saved_at', ?)", (now,))
+
+    # --- History ---
+
+    def history(self, instance: str, since: float = 0.0) -> List[Dict]:
+        """Saved balance/equity samples of one instance, oldest first."""
+        with self._db_lock:
+            rows = self._db().execute(
+                "SELECT time, balance, equity, profit, positions FROM account_history "
+                "WHERE instance = ? AND time >= ? ORDER BY time", (instance, since)).fetchall()
+        return [dict(zip(("time", "balance", "equity", "profit", "positions"), row)) for row in rows]
+
+    # --- Port reservations ---
+
+    def reserve_ports(self, name: str, pick: Callable[[List[Tuple[int, int]]], Tuple[int, int]]) -> Tuple[int, int]:
+        """Picks free ports with pick(reserved) and reserves them for name until release_ports.
+        Holding the lock across pick and insert keeps concurrent creates from getting the same ports."""
+        with self._db_lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM port_reservations WHERE reserved_at < ?", (time.time() - self.reservation_ttl,))
+                reserved = db.execute("SELECT vnc_port, api_port FROM port_reservations WHERE name != ?", (name,)).fetchall()
+                vnc, api = pick(reserved)
+                db.execute("INSERT OR REPLACE INTO port_reservations VALUES (?, ?, ?, ?)", (name, vnc, api, time.time()))
+        return vnc, api
+
+    def release_ports(self, name: str):
+        with self._db_lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM port_reservations WHERE name = ?", (name,))
+
+    # --- Hibernation ---
+
+    def hibernated(self) -> List[Dict]:
+        """Instances put to sleep by the hibernator and not woken yet."""
+        with self._db_lock:
+            rows = self._db().execute("SELECT container_id, name, mode, reason, since FROM hibernation").fetchall()
+        return [dict(zip(("container_id", "name", "mode", "reason", "since"), row)) for row in rows]
+
+    def set_hibernated(self, container_id: str, name: str, mode: str, reason: str, since: float):
+        with self._db_lock:
+            db = self._db()
+            with db:
+                db.execute("INSERT OR REPLACE INTO hibernation VALUES (?, ?, ?, ?, ?)", (container_id, name, mode, reason, since))
+
+    def clear_hibernated(self, container_id: str):
+        with self._db_lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM hibernation WHERE container_id = ?", (container_id,))
+
+
+state_store = StateStore(os.environ.get("MT5_STATE_DB", os.path.expanduser("~/.mt5_manager/state.db")))
@@ -0,0 +1,308 @@
+"""
+Supervisor - Restarts failed MT5 instances with backoff and stops crash loops.
+Docker's restart policy restarts a broken terminal blindly, however often it
+fails. The supervisor watches container exits and restarts in the fleet
+refreshes and API health in the portfolio polls. Both already run
+concurrently across the fleet, so nothing extra is polled. Failures by cause:
+
+    exit     the container exited with an error code or was OOM-killed; it is
+             started again after the backoff
+    restart  Docker's restart policy restarted it; only counted
+    api      the container runs but its MT5 API failed for unhealthy_after
+             seconds (after the startup grace); restarted after the backoff
+
+The backoff starts at backoff_base seconds and doubles with every supervised
+restart up to backoff_max. It resets once the instance stays healthy for
+stable_after seconds. max_failures failures within failure_window seconds are
+a crash loop: the container is stopped, which also ends Docker's own restarts,
+and the crash_loop alert fires. It is then only retried on the backoff. After
+max_attempts supervised restarts without recovery, the instance stays stopped
+until an operator starts it.
+
+The tail of the Journal log is captured at every failure. An instance has
+recovered once its MT5 API kept answering for recovery_confirm seconds, so a
+terminal that crashes again right after login is still one outage. Time to
+recovery (failure until the API answered) goes to mt5_manager_recovery_seconds;
+mt5_manager_mttr_seconds is the mean over the last recoveries.
+
+Hibernating instances, and containers stopped on purpose (exit code 0, 137 or
+143 without an OOM kill), are left alone. MT5_SUPERVISE=0 turns supervision off.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+
+import metrics
+from alerts import alert_engine
+from executors import executors
+from hibernation import hibernator
+
+STOP_EXIT_CODES = (0, 137, 143)  # clean exit, SIGKILL, SIGTERM: docker stop and kill
+
+
+@dataclass
+class Recovery:
+    """Supervision state of one instance."""
+    container_id: str
+    name: str
+    restart_count: int = 0
+    state: str = "healthy"  # healthy, backoff, recovering, crash-loop, gave-up
+    cause: str = ""
+    error: str = ""
+    failures: Deque[float] = field(default_factory=deque)
+    attempts: int = 0  # supervised restarts since the instance was last stable
+    failed_at: Optional[float] = None  # start of the current outage
+    retry_at: Optional[float] = None
+    started_at: float = field(default_factory=time.time)
+    unhealthy_since: Optional[float] = None
+    healthy_since: Optional[float] = None
+    acting: bool = False  # the supervisor itself is stopping or starting the container
+    journal: str = ""  # Journal tail at the last failure
+    journal_at: Optional[float] = None
+
+
+class Supervisor:
+    """Turns fleet and portfolio updates into supervised restarts."""
+
+    def __init__(self, backoff_base: float = 10.0, backoff_max: float = 600.0, max_failures: int = 3,
+                 failure_window: float = 600.0, max_attempts: int = 8, unhealthy_after: float = 90.0,
+                 startup_grace: float = 120.0, recovery_confirm: float = 30.0, stable_after: float = 600.0,
+                 interval: float = 5.0,
+                 journal_lines: int = 50, enabled: bool = True):
+        self.enabled = enabled
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        self.max_attempts = max_attempts
+        self.unhealthy_after = unhealthy_after
+        self.startup_grace = startup_grace  # MT5 logs in after a start; its API may fail until then
+        self.recovery_confirm = recovery_confirm
+        self.stable_after = stable_after
+        self.interval = interval
+        self.journal_lines = journal_lines
+        self.instances: Dict[str, Recovery] = {}
+        self.recoveries: Deque[float] = deque(maxlen=50)
+        self._fleet = None
+        self._portfolio = None
+        self._task: Optional[asyncio.Task] = None
+        metrics.MTTR_SECONDS.set_function(
+            lambda: sum(self.recoveries) / len(self.recoveries) if self.recoveries else 0.0)
+
+    def start(self, fleet, portfolio):
+        """Subscribes to the fleet and portfolio and starts the retry loop (call from the running event loop)."""
+        if self._task is not None or not self.enabled:
+            return
+        self._fleet = fleet
+        self._portfolio = portfolio
+        for record in fleet.containers.values():
+            self._track(record)
+        fleet.subscribe(self.on_fleet)
+        portfolio.subscribe_accounts(self.on_account)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._fleet.unsubscribe(self.on_fleet)
+            self._portfolio.unsubscribe_accounts(self.on_account)
+            self._task.cancel()
+            self._task = None
+
+    def state(self, container_id: str) -> Optional[Recovery]:
+        """The instance's supervision state, or None while it is healthy."""
+        entry = self.instances.get(container_id)
+        return entry if entry is not None and entry.state != "healthy" else None
+
+    def _track(self, record: Dict) -> Recovery:
+        entry = self.instances.get(record["id"])
+        if entry is None:
+            entry = Recovery(record["id"], record["name"], restart_count=record.get("restart_count", 0))
+            self.instances[record["id"]] = entry
+        return entry
+
+    # --- Inputs ---
+
+    def on_fleet(self, update):
+        now = time.time()
+        for record in update.added:
+            self._track(record)
+        for cid, fields in update.changed.items():
+            record = self._fleet.containers.get(cid)
+            if record is None or hibernator.is_sleeping(cid):
+                continue
+            entry = self._track(record)
+            if "restart_count" in fields:
+                restarts = fields["restart_count"] - entry.restart_count
+                entry.restart_count = fields["restart_count"]
+                if restarts > 0:
+                    entry.started_at = now
+                    self._failure(entry, "restart", f"restarted by Docker {restarts}x", restarts)
+            if "status" not in fields or entry.acting:
+                continue
+            status = fields["status"].lower()
+            if "running" in status:
+                entry.started_at = now
+                if entry.state in ("backoff", "crash-loop", "gave-up"):
+                    entry.retry_at = None  # started by someone else
+                    entry.state = "recovering"
+            elif status in ("exited", "dead"):
+                if record.get("oom_killed") or record.get("exit_code") not in STOP_EXIT_CODES:
+                    oom = " (out of memory)" if record.get("oom_killed") else ""
+                    self._failure(entry, "exit", f"exited with code {record.get('exit_code')}{oom}")
+                elif entry.state in ("backoff", "recovering"):
+                    self._reset(entry)  # stopped by an operator: nothing to recover
+        for cid in update.removed:
+            self.instances.pop(cid, None)  # the alert engine forgets the instance's alerts itself
+
+    def on_account(self, snapshot, diff):
+        entry = self.instances.get(snapshot.container_id)
+        if entry is None or entry.acting:
+            return
+        now = time.time()
+        if not snapshot.error:
+            entry.unhealthy_since = None
+            entry.healthy_since = entry.healthy_since or now
+            if entry.failed_at is not None and now - entry.healthy_since >= self.recovery_confirm:
+                self._recovered(entry)
+            return
+        entry.healthy_since = None
+        if entry.retry_at is not None or entry.state == "gave-up" or now - entry.started_at < self.startup_grace:
+            return
+        since = entry.unhealthy_since = entry.unhealthy_since or now
+        if now - since >= self.unhealthy_after:
+            entry.unhealthy_since = None
+            self._failure(entry, "api", f"MT5 API failing for {now - since:.0f}s: {snapshot.error}")
+
+    # --- Failure and recovery ---
+
+    def _failure(self, entry: Recovery, cause: str, error: str, count: int = 1):
+        now = time.time()
+        entry.failures.extend([now] * count)
+        while entry.failures and entry.failures[0] < now - self.failure_window:
+            entry.failures.popleft()
+        if entry.failed_at is None:
+            entry.failed_at = now
+            entry.cause = cause
+        entry.error = error
+        entry.healthy_since = None
+        metrics.SUPERVISOR_FAILURES.labels(cause).inc(count)
+        print(f"{entry.name} failed ({cause}): {error}")
+        loop = asyncio.get_running_loop()
+        loop.create_task(self._capture_journal(entry))
+        if entry.state == "crash-loop" or len(entry.failures) >= self.max_failures:
+            loop.create_task(self._stop_crash_loop(entry))
+        elif cause == "restart":
+            if entry.state == "healthy":
+                entry.state = "recovering"
+        else:
+            self._schedule(entry)
+
+    def _schedule(self, entry: Recovery):
+        """Sets the next retry, or gives up after max_attempts."""
+        if entry.attempts >= self.max_attempts:
+            entry.state = "gave-up"
+            entry.retry_at = None
+            print(f"Gave up restarting {entry.name} after {entry.attempts} attempts")
+            return
+        delay = min(self.backoff_base * 2 ** entry.attempts, self.backoff_max)
+        entry.retry_at = time.time() + delay
+        if entry.state != "crash-loop":
+            entry.state = "backoff"
+
+    async def _stop_crash_loop(self, entry: Recovery):
+        """Stops a crash-looping container so that only the backoff restarts it."""
+        if entry.state != "crash-loop":
+            entry.state = "crash-loop"
+            metrics.CRASH_LOOPS.inc()
+            alert_engine.observe("crash_loop", entry.name, 1)
+            print(f"{entry.name} is crash-looping ({len(entry.failures)} failures in "
+                  f"{self.failure_window / 60:.0f} min); stopping it")
+        record = self._fleet.containers.get(entry.container_id)
+        if record is not None and record["status"].lower() in ("running", "restarting"):
+            await self._act(entry, self._fleet.docker_service.stop_container)
+        self._schedule(entry)
+
+    def _recovered(self, entry: Recovery):
+        elapsed = max(0.0, entry.healthy_since - entry.failed_at)
+        metrics.RECOVERY_SECONDS.labels(entry.cause).observe(elapsed)
+        self.recoveries.append(elapsed)
+        alert_engine.observe("crash_loop", entry.name, 0)
+        print(f"{entry.name} recovered from {entry.cause} failure in {elapsed:.1f}s")
+        entry.failed_at = None
+        entry.retry_at = None
+        entry.state = "healthy"
+
+    def _reset(self, entry: Recovery):
+        entry.failed_at = None
+        entry.retry_at = None
+        entry.state = "healthy"
+
+    async def _capture_journal(self, entry: Recovery):
+        journal = await executors.run("stats", self._fleet.docker_service.read_journal_tail,
+                                      entry.container_id, self.journal_lines)
+        entry.journal = journal
+        entry.journal_at = time.time()
+
+    # --- Loop ---
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Error in supervisor check: {e}")
+
+    async def tick(self):
+        now = time.time()
+        retries = []
+        for entry in list(self.instances.values()):
+            if entry.healthy_since and now - entry.healthy_since >= self.stable_after and entry.attempts:
+                entry.attempts = 0  # stable again: the next failure starts with the short backoff
+                entry.failures.clear()
+            if entry.retry_at is not None and entry.retry_at <= now:
+                entry.retry_at = None
+                retries.append(self._retry(entry))
+        await asyncio.gather(*retries)
+
+    async def _retry(self, entry: Recovery):
+        record = self._fleet.containers.get(entry.container_id)
+        if record is None or hibernator.is_sleeping(entry.container_id):
+            self._reset(entry)
+            return
+        docker_service = self._fleet.docker_service
+        entry.attempts += 1
+        metrics.SUPERVISED_RESTARTS.labels(entry.cause).inc()
+        print(f"Restarting {entry.name} (attempt {entry.attempts}, {entry.cause})")
+        # stop and start rather than restart: Docker counts only its own restarts
+        if "running" in record["status"].lower():
+            await self._act(entry, docker_service.stop_container)
+        err = await self._act(entry, docker_service.start_container)
+        if err:
+            print(f"Error restarting {entry.name}: {err}")
+            self._schedule(entry)
+            return
+        entry.started_at = time.time()
+        if entry.state != "crash-loop":
+            entry.state = "recovering"
+
+    async def _act(self, entry: Recovery, action) -> Optional[str]:
+        """Runs a lifecycle action and refreshes, ignoring the resulting fleet changes."""
+        entry.acting = True
+        try:
+            err = await executors.run("interactive", action, entry.container_id)
+            await self._fleet.refresh()
+            return err
+        finally:
+            entry.acting = False
+
+
+supervisor = Supervisor(
+    backoff_base=float(os.environ.get("MT5_RESTART_BACKOFF", "10")),
+    backoff_max=float(os.environ.get("MT5_RESTART_BACKOFF_MAX", "600")),
+    unhealthy_after=float(os.environ.get("MT5_UNHEALTHY_AFTER", "90")),
+    enabled=os.environ.get("MT5_SUPERVISE", "1") != "0",
+)
@@ -0,0 +1,204 @@
+"""
+Tracing - Lightweight per-operation spans for the manager's hot paths.
+Spans are kept in an in-memory ring buffer and can be exported as OTLP/JSON.
+Enable with MT5_TRACING=1 (or at runtime from the debug page); when disabled,
+span() and traced() only cost a flag check.
+"""
+import contextvars
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+_current_span = contextvars.ContextVar("mt5_current_span", default=None)
+
+
+class Span:
+    """A single timed operation."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "error", "thread")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.span_id = random.getrandbits(64)
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        else:
+            self.trace_id = random.getrandbits(128)
+            self.parent_id = None
+        self.attributes = attributes
+        self.error = None
+        self.thread = threading.current_thread().name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "attributes", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.name, _current_span.get(), self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        self.tracer._buffer.append(span)
+        return False
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Records spans into a bounded ring buffer."""
+
+    def __init__(self, capacity: int = 5000, enabled: bool = False):
+        self.enabled = enabled
+        self._buffer = deque(maxlen=capacity)
+
+    def span(self, name: str, **attributes):
+        """Context manager timing the enclosed block."""
+        if not self.enabled:
+            return _NOOP
+        return _SpanContext(self, name, attributes)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator recording a span for every call of a sync or async function."""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with _SpanContext(self, span_name, _call_attributes(args)):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _SpanContext(self, span_name, _call_attributes(args)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument(self, service, prefix: str):
+        """Wraps every public method of a service instance in a span named prefix.method."""
+        if getattr(service, "_tracing_instrumented", False):
+            return service
+        service._tracing_instrumented = True
+        for name, _ in inspect.getmembers(type(service), callable):
+            if name.startswith("_"):
+                continue
+            setattr(service, name, self.traced(f"{prefix}.{name}")(getattr(service, name)))
+        return service
+
+    def spans(self) -> List[Span]:
+        return list(self._buffer)
+
+    def clear(self):
+        self._buffer.clear()
+
+    def traces(self, limit: int = 50) -> List[List[Span]]:
+        """Groups finished spans by trace, newest trace first."""
+        grouped: Dict[int, List[Span]] = {}
+        for span in self._buffer:
+            grouped.setdefault(span.trace_id, []).append(span)
+        traces = sorted(grouped.values(), key=lambda spans: min(s.start_ns for s in spans), reverse=True)
+        for spans in traces:
+            spans.sort(key=lambda s: s.start_ns)
+        return traces[:limit]
+
+    def export_otlp(self, service_name: str = "mt5-manager") -> Dict:
+        """Exports the buffer in the OTLP/JSON trace format."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "mt5_manager.tracing"},
+                    "spans": [_otlp_span(span) for span in self._buffer],
+                }],
+            }]
+        }
+
+
+def _call_attributes(args) -> Dict:
+    # Keep scalar arguments only (container ids, ports, names)
+    values = [a for a in args if isinstance(a, (str, int, float))]
+    return {"args": ", ".join(str(v) for v in values)[:120]} if values else {}
+
+
+def _otlp_attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _otlp_span(span: Span) -> Dict:
+    attributes = dict(span.attributes)
+    attributes["thread.name"] = span.thread
+    data = {
+        "traceId": f"{span.trace_id:032x}",
+        "spanId": f"{span.span_id:016x}",
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_otlp_attribute(k, v) for k, v in attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id is not None:
+        data["parentSpanId"] = f"{span.parent_id:016x}"
+    return data
+
+
+# Singleton instance
+tracer = Tracer(
+    capacity=int(os.environ.get("MT5_TRACING_BUFFER", "5000")),
+    enabled=os.environ.get("MT5_TRACING", "0") == "1",
+)